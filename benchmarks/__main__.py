@@ -0,0 +1,32 @@
+"""
+Runs a benchmark suite by name, passing the remaining arguments to it.
+
+    python -m benchmarks                 # list suites
+    python -m benchmarks asgi --help
+"""
+
+import runpy
+import sys
+
+# Suite name -> module. Each module also runs on its own with python -m benchmarks.<module>.
+SUITES = {
+    "asgi": "benchmarks.asgi_stack",
+    "middleware": "benchmarks.middleware",
+    "portal-load": "benchmarks.portal_load",
+    "portal-scale": "benchmarks.portal_scale",
+    "utils": "benchmarks.utils_helpers",
+}
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in SUITES:
+        print(f"usage: python -m benchmarks <suite> [args...]\n\nsuites: {', '.join(SUITES)}")
+        return 2
+    module = SUITES[sys.argv[1]]
+    sys.argv = [module, *sys.argv[2:]]
+    runpy.run_module(module, run_name="__main__", alter_sys=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+"""
+Shared plumbing for benchmark suites that save machine-readable results and check them against a baseline.
+
+A suite produces results as {case: {metric: value}} and declares which metrics are compared and in which
+direction ("higher" or "lower" is better). Other metrics are reported but never fail a run. finish() prints the
+table, writes --output, compares against --baseline and returns the exit code, so a CI job can run:
+
+    python -m benchmarks asgi --output results.json --baseline benchmarks/baselines/asgi.json
+
+Baselines are only meaningful on the machine that recorded them. Record one on the CI box with --output and
+commit or cache it there.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import typing
+
+from muforge.utils.misc import utcnow
+
+Results = dict[str, dict[str, float]]
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--output", help="Write the results to this JSON file.")
+    parser.add_argument(
+        "--baseline", help="Compare against results previously saved with --output."
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.15,
+        help="Fraction a compared metric may worsen by before the run fails. Default 0.15.",
+    )
+
+
+def environment() -> dict[str, typing.Any]:
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def save(path: str, suite: str, results: Results, directions: dict[str, str]):
+    data = {
+        "suite": suite,
+        "created_at": utcnow().isoformat(),
+        "environment": environment(),
+        "directions": directions,
+        "results": results,
+    }
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+
+
+def load(path: str) -> dict[str, typing.Any]:
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(
+    results: Results,
+    baseline: Results,
+    directions: dict[str, str],
+    threshold: float,
+) -> list[str]:
+    """
+    Finds compared metrics that got worse than the baseline by more than threshold.
+
+    Args:
+        results: This run's results.
+        baseline: The baseline's results.
+        directions: {metric: "higher" or "lower"}, the metrics to compare and which way is better.
+        threshold: The allowed fraction of change in the bad direction.
+
+    Returns:
+        A description of each regression. Cases or metrics missing from either side are skipped.
+    """
+    out = list()
+    for case, metrics in results.items():
+        if (old_metrics := baseline.get(case, None)) is None:
+            continue
+        for metric, direction in directions.items():
+            new, old = metrics.get(metric, None), old_metrics.get(metric, None)
+            if new is None or not old:
+                continue
+            change = (new - old) / abs(old)
+            worse = -change if direction == "higher" else change
+            if worse > threshold:
+                out.append(
+                    f"{case} {metric}: {old:,.4g} -> {new:,.4g} ({change:+.1%})"
+                )
+    return out
+
+
+def format_value(value: float, width: int) -> str:
+    # Whole numbers for large values, so nothing is shown in scientific notation.
+    if abs(value) >= 1000:
+        return f"{value:>{width},.0f}"
+    return f"{value:>{width},.4g}"
+
+
+def print_table(results: Results):
+    metrics = list(dict.fromkeys(m for values in results.values() for m in values))
+    width = max([len("case")] + [len(case) for case in results])
+    widths = [max(len(m), 10) + 2 for m in metrics]
+    print("case".ljust(width) + "".join(f"{m:>{w}}" for m, w in zip(metrics, widths)))
+    for case, values in results.items():
+        cells = "".join(
+            format_value(values[m], w) if m in values else " " * w
+            for m, w in zip(metrics, widths)
+        )
+        print(case.ljust(width) + cells)
+
+
+def finish(
+    args: argparse.Namespace, suite: str, results: Results, directions: dict[str, str]
+) -> int:
+    """
+    Prints, saves and checks a suite's results.
+
+    Returns:
+        The process exit code: 1 if any compared metric regressed past the threshold, else 0.
+    """
+    print_table(results)
+    if args.output:
+        save(args.output, suite, results, directions)
+    if not args.baseline:
+        return 0
+    baseline = load(args.baseline)
+    if baseline.get("suite", suite) != suite:
+        print(f"Baseline is for suite {baseline['suite']!r}, not {suite!r}.", file=sys.stderr)
+        return 1
+    regressions = compare(
+        results, baseline.get("results", dict()), directions, args.threshold
+    )
+    if not regressions:
+        print(f"No regressions past {args.threshold:.0%} against {args.baseline}.")
+        return 0
+    print(f"Regressions past {args.threshold:.0%} against {args.baseline}:", file=sys.stderr)
+    for line in regressions:
+        print(f"  {line}", file=sys.stderr)
+    return 1
@@ -0,0 +1,262 @@
+"""
+Measures the game's HTTP stack as assemble_fastapi builds it: the cost of each middleware, of routing through
+many plugin routers, and of assembling the app, without starting Hypercorn.
+
+The game app is assembled with fake plugins and driven through httpx's in-process ASGI transport. Each
+middleware's overhead is found by removing it from the assembled app and measuring the difference. Two
+requests are timed: a small JSON reply from the last route registered (worst case for routing) and a large,
+compressible JSON reply. Allocations are measured with tracemalloc over a sequential batch of requests.
+
+    python -m benchmarks asgi --plugins 20 --routes 10 --output asgi.json
+"""
+
+import argparse
+import asyncio
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import typing
+from pathlib import Path
+
+import httpx
+from fastapi import APIRouter
+from loguru import logger
+
+from muforge.game import Application
+from muforge.game.fastapi import assemble_fastapi
+from muforge.plugin import BasePlugin
+
+from . import _harness
+
+SUITE = "asgi"
+
+# retained_blocks_per_request and overhead_us are reported but not compared: the first is near zero unless
+# something leaks, and the second is a difference of two noisy measurements.
+DIRECTIONS = {
+    "requests_per_second": "higher",
+    "peak_kib": "lower",
+    "assemble_ms": "lower",
+}
+
+# What a browser behind a reverse proxy sends, so CORS, compression and proxy header handling all do work.
+HEADERS = {
+    "Accept-Encoding": "gzip, deflate, br, zstd",
+    "Origin": "https://play.example.com",
+    "X-Forwarded-For": "203.0.113.9",
+    "X-Forwarded-Proto": "https",
+}
+
+
+class BenchPlugin(BasePlugin):
+    """
+    A plugin announcing one router with a number of parameterized routes, plus a large listing route.
+    """
+
+    def __init__(self, app, index: int, routes: int, payload: list):
+        super().__init__(app, settings=dict())
+        self.index = index
+        self.routes = routes
+        self.payload = payload
+
+    def name(self) -> str:
+        return f"Benchmark Plugin {self.index}"
+
+    def version(self) -> str:
+        return "1.0.0"
+
+    def slug(self) -> str:
+        return f"bench{self.index}"
+
+    def game_routers_v1(self):
+        router = APIRouter()
+        payload = self.payload
+
+        for r in range(self.routes):
+
+            async def item(item_id: int, r=r):
+                return {"id": item_id, "route": r, "name": f"item {item_id}"}
+
+            router.add_api_route(f"/r{r}/{{item_id}}", item, methods=["GET"])
+
+        async def listing():
+            return payload
+
+        router.add_api_route("/listing", listing, methods=["GET"])
+        return {self.slug(): router}
+
+
+def make_payload(size: int) -> list:
+    """
+    Rows of repetitive, compressible JSON totalling roughly size bytes.
+    """
+    row = {"name": "a weathered iron longsword", "kind": "weapon", "weight": 3.5}
+    return [dict(row, id=i) for i in range(max(1, size // 80))]
+
+
+async def build(args, payload: list) -> tuple[Application, typing.Any, float]:
+    settings = {
+        "MUFORGE": {"name": "benchmark", "run_mode": "prod"},
+        "GAME": {"webserver": {"docs": False}},
+    }
+    parent = Application(settings)
+    parent.plugin_load_order = [
+        BenchPlugin(parent, i, args.routes, payload) for i in range(args.plugins)
+    ]
+    started = time.perf_counter()
+    app = await assemble_fastapi(parent, None)
+    return parent, app, time.perf_counter() - started
+
+
+def without(app, name: str):
+    """
+    Removes a middleware from an assembled app. Only works before the app has served a request, since
+    Starlette builds the middleware stack on first use.
+    """
+    app.user_middleware = [m for m in app.user_middleware if m.cls.__name__ != name]
+    return app
+
+
+def without_all(app):
+    app.user_middleware = list()
+    return app
+
+
+async def fetch(client: httpx.AsyncClient, path: str):
+    # Stream so the client doesn't spend time decompressing what the server compressed.
+    async with client.stream("GET", path, headers=HEADERS) as response:
+        response.raise_for_status()
+        async for _ in response.aiter_raw():
+            pass
+
+
+async def requests_per_second(
+    client: httpx.AsyncClient, path: str, requests: int, concurrency: int
+) -> float:
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            await fetch(client, path)
+
+    started = time.perf_counter()
+    async with asyncio.TaskGroup() as tg:
+        for _ in range(concurrency):
+            tg.create_task(worker())
+    return requests / (time.perf_counter() - started)
+
+
+async def allocations(client: httpx.AsyncClient, path: str, requests: int) -> dict:
+    gc.collect()
+    blocks = sys.getallocatedblocks()
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    for _ in range(requests):
+        await fetch(client, path)
+    peak = tracemalloc.get_traced_memory()[1] - start
+    tracemalloc.stop()
+    gc.collect()
+    return {
+        "peak_kib": peak / 1024,
+        "retained_blocks_per_request": (sys.getallocatedblocks() - blocks) / requests,
+    }
+
+
+async def measure(app, paths: dict[str, str], args) -> dict[str, dict[str, float]]:
+    out = dict()
+    transport = httpx.ASGITransport(app=app, client=("127.0.0.1", 50000))
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://game.example.com"
+    ) as client:
+        for kind, path in paths.items():
+            # Warm up routing, metric label children and compression level selection.
+            for _ in range(50):
+                await fetch(client, path)
+            rps = max(
+                [
+                    await requests_per_second(
+                        client, path, args.requests, args.concurrency
+                    )
+                    for _ in range(args.repeat)
+                ]
+            )
+            result = {"requests_per_second": rps, "us_per_request": 1e6 / rps}
+            result.update(await allocations(client, path, args.alloc_requests))
+            out[kind] = result
+    return out
+
+
+async def run(args) -> dict[str, dict[str, float]]:
+    payload = make_payload(args.payload)
+    last = args.plugins - 1
+    paths = {
+        "small": f"/v1/bench{last}/r{args.routes - 1}/7",
+        "large": "/v1/bench0/listing",
+    }
+
+    _parent, app, assemble = await build(args, payload)
+    middleware = [m.cls.__name__ for m in app.user_middleware]
+
+    variants = {"full": lambda a: a, "bare": without_all}
+    for name in middleware:
+        variants[f"-{name}"] = lambda a, name=name: without(a, name)
+
+    results = dict()
+    for variant, modify in variants.items():
+        _parent, app, _ = await build(args, payload)
+        for kind, values in (await measure(modify(app), paths, args)).items():
+            results[f"{variant}/{kind}"] = values
+
+    # The overhead of a middleware is what removing it saves.
+    for kind in paths:
+        full = results[f"full/{kind}"]["us_per_request"]
+        for name in middleware:
+            case = results[f"-{name}/{kind}"]
+            case["overhead_us"] = full - case["us_per_request"]
+        bare = results[f"bare/{kind}"]
+        bare["overhead_us"] = full - bare["us_per_request"]
+
+    results["assemble"] = {
+        "assemble_ms": assemble * 1000,
+        "plugins": args.plugins,
+        "routes": args.plugins * (args.routes + 1),
+    }
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--plugins", type=int, default=20)
+    parser.add_argument("--routes", type=int, default=10, help="Routes per plugin.")
+    parser.add_argument(
+        "--payload", type=int, default=32 * 1024, help="Bytes in the large reply."
+    )
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="Timed runs per case; the best is kept."
+    )
+    parser.add_argument("--alloc-requests", type=int, default=200)
+    _harness.add_arguments(parser)
+    args = parser.parse_args(argv)
+    # assemble_fastapi logs every router it adds, once per variant; keep the report readable.
+    logger.remove()
+
+    # assemble_fastapi serves ./webserver, so run somewhere that has one.
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as root:
+        (Path(root) / "webserver" / "static").mkdir(parents=True)
+        os.chdir(root)
+        try:
+            results = asyncio.run(run(args))
+        finally:
+            os.chdir(cwd)
+    return _harness.finish(args, SUITE, results, DIRECTIONS)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
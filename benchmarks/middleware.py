@@ -0,0 +1,122 @@
+"""
+Compares the request-id and security-header middleware as two @app.middleware("http") functions (the previous
+implementation, which wraps every request in BaseHTTPMiddleware) against the pure ASGI RequestContextMiddleware.
+
+Requests are driven through httpx's in-process ASGI transport, so no server or network is involved.
+
+    python -m benchmarks.middleware --requests 20000 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import time
+import typing
+import uuid
+
+import httpx
+from fastapi import FastAPI, Request, Response
+
+from muforge.game.middleware import RequestContextMiddleware
+
+
+def make_bare_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return {"pong": True}
+
+    return app
+
+
+def make_legacy_app() -> FastAPI:
+    app = make_bare_app()
+
+    @app.middleware("http")
+    async def request_id_middleware(
+        request: Request,
+        call_next: typing.Callable[[Request], typing.Awaitable[Response]],
+    ) -> Response:
+        incoming = request.headers.get("X-Request-ID")
+        request_id = incoming or uuid.uuid4().hex
+        request.state.request_id = request_id
+        response = await call_next(request)
+        response.headers.setdefault("X-Request-ID", request_id)
+        return response
+
+    @app.middleware("http")
+    async def security_headers_middleware(
+        request: Request,
+        call_next: typing.Callable[[Request], typing.Awaitable[Response]],
+    ) -> Response:
+        response = await call_next(request)
+        response.headers.setdefault("X-Content-Type-Options", "nosniff")
+        response.headers.setdefault(
+            "Referrer-Policy", "strict-origin-when-cross-origin"
+        )
+        response.headers.setdefault("X-Frame-Options", "DENY")
+        response.headers.setdefault(
+            "Permissions-Policy", "camera=(), microphone=(), geolocation=()"
+        )
+        response.headers.setdefault(
+            "Strict-Transport-Security", "max-age=63072000; includeSubDomains"
+        )
+        return response
+
+    return app
+
+
+def make_asgi_app() -> FastAPI:
+    app = make_bare_app()
+    app.add_middleware(RequestContextMiddleware)
+    return app
+
+
+VARIANTS = {
+    "none": make_bare_app,
+    "http-middleware": make_legacy_app,
+    "pure-asgi": make_asgi_app,
+}
+
+
+async def requests_per_second(app, requests: int, concurrency: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # Warm up routing and any lazy initialization.
+        for _ in range(50):
+            (await client.get("/ping")).raise_for_status()
+
+        remaining = requests
+
+        async def worker():
+            nonlocal remaining
+            while remaining > 0:
+                remaining -= 1
+                (await client.get("/ping")).raise_for_status()
+
+        start = time.perf_counter()
+        async with asyncio.TaskGroup() as tg:
+            for _ in range(concurrency):
+                tg.create_task(worker())
+        return requests / (time.perf_counter() - start)
+
+
+async def main(args):
+    results = dict()
+    for name, factory in VARIANTS.items():
+        results[name] = await requests_per_second(
+            factory(), args.requests, args.concurrency
+        )
+    baseline = results["none"]
+    print(f"{'variant':<20} {'req/s':>12} {'vs none':>10}")
+    for name, rps in results.items():
+        print(f"{name:<20} {rps:>12.1f} {rps / baseline:>9.1%}")
+    legacy, asgi = results["http-middleware"], results["pure-asgi"]
+    print(f"pure-asgi is {asgi / legacy:.2f}x the throughput of http-middleware")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=10000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    asyncio.run(main(parser.parse_args()))
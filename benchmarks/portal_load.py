@@ -0,0 +1,308 @@
+"""
+Drives the portal under load: many simulated ConnectionLinks, each sending a scripted stream of commands that
+its parser forwards to a stub game API over loopback HTTP, with the replies rendered and sent back out.
+
+The stub game is a small FastAPI app served by Hypercorn in a separate process, so its work doesn't count
+against the portal's event loop. Connections run BaseConnection.run() exactly as a portal service would, with
+a ConnectionRegistry and the connection's own HTTP client. Throughput, p99 command latency and memory per
+connection are checked against --baseline; loop lag is reported only.
+
+    python -m benchmarks portal-load --connections 500 --profiles telnet,web --output load.json --baseline base.json
+"""
+
+import argparse
+import asyncio
+import gc
+import itertools
+import multiprocessing
+import socket
+import sys
+import time
+import tracemalloc
+import uuid
+
+from loguru import logger
+from rich.color import ColorType
+
+from muforge.portal import Application
+from muforge.portal.connections import BaseConnection
+from muforge.portal.connections.link import ClientInfo, ConnectionLink, LinkData
+from muforge.portal.connections.parser import BaseParser
+from muforge.portal.registry import ConnectionRegistry
+from muforge.utils.profiling import percentiles
+
+from . import _harness
+
+SUITE = "portal-load"
+
+DIRECTIONS = {
+    "commands_per_second": "higher",
+    "latency_p99_ms": "lower",
+    "bytes_per_connection": "lower",
+}
+
+# Client capability presets, roughly what the protocol servers negotiate for common clients.
+PROFILES = {
+    "telnet": dict(
+        client_protocol="telnet", encoding="ascii", color=ColorType.STANDARD, width=78
+    ),
+    "mudclient": dict(
+        client_protocol="telnet", encoding="utf-8", color=ColorType.EIGHT_BIT, width=120
+    ),
+    "web": dict(
+        client_protocol="websocket",
+        encoding="utf-8",
+        color=ColorType.TRUECOLOR,
+        width=100,
+    ),
+    "screenreader": dict(
+        client_protocol="telnet",
+        encoding="utf-8",
+        color=ColorType.DEFAULT,
+        width=78,
+        screen_reader=True,
+    ),
+}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def serve_stub_game(port: int, delay: float):
+    """
+    Runs in a child process: a game API with one command endpoint that answers with plain text for speech and
+    Rich markup for everything else, like a room description would.
+    """
+    from fastapi import FastAPI
+    from hypercorn import Config
+    from hypercorn.asyncio import serve
+
+    game = FastAPI()
+
+    @game.post("/commands")
+    async def command(body: dict):
+        if delay:
+            await asyncio.sleep(delay)
+        text = body.get("command", "")
+        verb, _, rest = text.partition(" ")
+        if verb == "say":
+            return {"text": f'You say, "{rest}"', "markup": False}
+        return {
+            "text": f"[bold cyan]The Plaza[/]\n[dim]{verb}:[/] A wide square paved with "
+            f"[yellow]old stone[/]. Exits: [green]north[/], [green]east[/], [green]south[/].",
+            "markup": True,
+        }
+
+    config = Config()
+    config.bind = [f"127.0.0.1:{port}"]
+    config.accesslog = None
+    config.errorlog = None
+    config.backlog = 4096
+    asyncio.run(serve(game, config))
+
+
+async def wait_for_port(port: int, timeout: float = 15.0):
+    end = time.monotonic() + timeout
+    while True:
+        try:
+            _reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        except OSError:
+            if time.monotonic() > end:
+                raise RuntimeError(f"Stub game didn't start on port {port}.")
+            await asyncio.sleep(0.05)
+        else:
+            writer.close()
+            return
+
+
+class GameParser(BaseParser):
+    """
+    Forwards every command to the game API and sends the reply, the way a logged-in parser does.
+    """
+
+    async def execute_command(self, event: str):
+        reply = await self.api_call("POST", "/commands", json={"command": event})
+        if reply["markup"]:
+            await self.connection.send_rich_line(reply["text"])
+        else:
+            await self.send_line(reply["text"])
+
+
+class StubService:
+    """
+    Stands in for the portal service that owns the connections.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.plugin = None
+
+
+def make_app(port: int) -> Application:
+    app = Application({"PORTAL": {"game_url": f"http://127.0.0.1:{port}"}})
+    app.parsers["auth"] = GameParser
+    app.services["connections"] = ConnectionRegistry(app, None)
+    return app
+
+
+def make_connections(
+    service, count: int, profiles: list[str], maxsize: int
+) -> list[BaseConnection]:
+    out = list()
+    cycle = itertools.cycle(profiles)
+    for i in range(count):
+        info = ClientInfo(
+            connection_id=uuid.uuid4(),
+            client_address=f"10.0.{i // 256 % 256}.{i % 256}",
+            **PROFILES[next(cycle)],
+        )
+        out.append(BaseConnection(service, ConnectionLink(info, maxsize)))
+    return out
+
+
+class LagSampler:
+    """
+    Measures how late a short sleep wakes up, in a loop, until stopped.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.samples: list[float] = list()
+        self.running = True
+
+    async def run(self):
+        while self.running:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.samples.append(time.perf_counter() - started - self.interval)
+
+
+async def drive(
+    conn: BaseConnection,
+    script: list[str],
+    commands: int,
+    think: float,
+    latencies: list[float],
+):
+    """
+    Plays a connection's script, waiting for each command's output before sending the next.
+    """
+    link = conn.link
+    for cmd in itertools.islice(itertools.cycle(script), commands):
+        started = time.perf_counter()
+        await link.incoming_queue.put(LinkData("Text.Command", cmd))
+        await link.outgoing_queue.get()
+        latencies.append(time.perf_counter() - started)
+        if think:
+            await asyncio.sleep(think)
+
+
+async def run_load(args) -> _harness.Results:
+    port = free_port()
+    ctx = multiprocessing.get_context("spawn")
+    game = ctx.Process(
+        target=serve_stub_game, args=(port, args.game_delay), daemon=True
+    )
+    game.start()
+    try:
+        await wait_for_port(port)
+        return await run_portal(args, port)
+    finally:
+        game.terminate()
+        game.join(5)
+
+
+async def run_portal(args, port: int) -> _harness.Results:
+    service = StubService(make_app(port))
+    profiles = args.profiles.split(",")
+    for name in profiles:
+        if name not in PROFILES:
+            raise SystemExit(f"Unknown profile {name!r}. Choose from {', '.join(PROFILES)}.")
+    script = args.script.split(",")
+    count = args.connections
+
+    # Memory is measured over startup plus one command each, so every connection has built its HTTP client,
+    # console and parser state, as a connection that has been used would.
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    connections = make_connections(service, count, profiles, args.queue_size)
+    tasks = [asyncio.create_task(conn.run()) for conn in connections]
+    warmup = list()
+    await asyncio.gather(*(drive(c, script, 1, 0.0, warmup) for c in connections))
+    gc.collect()
+    memory = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    latencies = list()
+    sampler = LagSampler()
+    sampler_task = asyncio.create_task(sampler.run())
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(drive(c, script, args.commands, args.think, latencies) for c in connections)
+    )
+    elapsed = time.perf_counter() - started
+    sampler.running = False
+    await sampler_task
+
+    for conn in connections:
+        conn.shutdown_cause = "benchmark"
+        conn.shutdown_event.set()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    latency = percentiles(latencies, (50, 99))
+    lag = percentiles(sampler.samples, (50, 99))
+    # One case per connection count and profile mix, so a baseline is only compared with the same load.
+    case = f"{'+'.join(profiles)}/{count}"
+    return {
+        case: {
+            "commands": len(latencies),
+            "seconds": elapsed,
+            "commands_per_second": len(latencies) / elapsed if elapsed else 0.0,
+            "latency_p50_ms": latency[50] * 1000,
+            "latency_p99_ms": latency[99] * 1000,
+            "bytes_per_connection": memory / count if count else 0.0,
+            "loop_lag_p50_ms": lag[50] * 1000,
+            "loop_lag_p99_ms": lag[99] * 1000,
+        }
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--connections", type=int, default=200)
+    parser.add_argument(
+        "--commands", type=int, default=20, help="Commands each connection sends."
+    )
+    parser.add_argument(
+        "--script",
+        default="look,say hello there,look north,score",
+        help="Comma-separated commands each connection cycles through.",
+    )
+    parser.add_argument(
+        "--profiles",
+        default="telnet,mudclient,web,screenreader",
+        help=f"Comma-separated client profiles assigned round-robin: {', '.join(PROFILES)}.",
+    )
+    parser.add_argument(
+        "--think", type=float, default=0.0, help="Seconds each connection waits between commands."
+    )
+    parser.add_argument(
+        "--game-delay", type=float, default=0.0, help="Seconds the stub game takes per command."
+    )
+    parser.add_argument(
+        "--queue-size", type=int, default=0, help="ConnectionLink queue bound. 0 is unbounded."
+    )
+    _harness.add_arguments(parser)
+    args = parser.parse_args(argv)
+    # Connection shutdown logs a line each; keep the report readable.
+    logger.remove()
+    results = asyncio.run(run_load(args))
+    return _harness.finish(args, SUITE, results, DIRECTIONS)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,171 @@
+"""
+Measures what a portal connection costs: memory per BaseConnection (with its ConnectionLink and a parser) and
+the event loop overhead of many idle connections.
+
+Connections are created in-process around simulated ConnectionLinks, with no protocol server or game behind
+them, and started with BaseConnection.run() exactly as a portal service would. Memory per connection and the
+command round trip are checked against --baseline; loop lag is reported only.
+
+    python -m benchmarks portal-scale --connections 10000 --output scale.json --baseline scale-baseline.json
+"""
+
+import argparse
+import asyncio
+import gc
+import sys
+import time
+import tracemalloc
+import uuid
+
+from loguru import logger
+
+from muforge.portal import Application
+from muforge.portal.connections import BaseConnection
+from muforge.portal.connections.link import ClientInfo, ConnectionLink, LinkData
+from muforge.portal.connections.parser import BaseParser
+from muforge.utils.profiling import percentiles
+
+from . import _harness
+
+SUITE = "portal-scale"
+
+DIRECTIONS = {
+    "created_bytes_per_connection": "lower",
+    "running_bytes_per_connection": "lower",
+    "round_trip_us_per_connection": "lower",
+}
+
+
+class EchoParser(BaseParser):
+    async def execute_command(self, event: str):
+        await self.send_line(event)
+
+
+class StubService:
+    """
+    Stands in for the portal service that owns the connections.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.plugin = None
+
+
+def make_app() -> Application:
+    app = Application({"PORTAL": {"game_url": "http://127.0.0.1:1"}})
+    app.parsers["auth"] = EchoParser
+    return app
+
+
+def make_connections(service, count: int, console: bool) -> list[BaseConnection]:
+    out = list()
+    for i in range(count):
+        info = ClientInfo(
+            connection_id=uuid.uuid4(), client_address=f"10.0.{i // 256 % 256}.{i % 256}"
+        )
+        conn = BaseConnection(service, ConnectionLink(info))
+        if console:
+            conn.console
+        out.append(conn)
+    return out
+
+
+def measure(func):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = func()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+
+async def loop_lag(duration: float, interval: float = 0.001) -> dict:
+    samples = list()
+    end = time.perf_counter() + duration
+    while time.perf_counter() < end:
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(time.perf_counter() - started - interval)
+    return percentiles(samples)
+
+
+async def round_trip(connections: list[BaseConnection]) -> float:
+    """
+    Sends one command to every connection and waits for every echo. Returns the seconds taken.
+    """
+    started = time.perf_counter()
+    for conn in connections:
+        conn.link.incoming_queue.put_nowait(LinkData("Text.Command", "look"))
+    for conn in connections:
+        await conn.link.outgoing_queue.get()
+    return time.perf_counter() - started
+
+
+async def run(args) -> _harness.Results:
+    app = make_app()
+    service = StubService(app)
+    count = args.connections
+
+    idle_before = await loop_lag(args.lag_seconds)
+
+    connections, created = measure(
+        lambda: make_connections(service, count, args.console)
+    )
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    tasks = [asyncio.create_task(conn.run()) for conn in connections]
+    # Let every connection start its TaskGroup and push its first parser.
+    for _ in range(5):
+        await asyncio.sleep(0)
+    gc.collect()
+    running = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    idle_after = await loop_lag(args.lag_seconds)
+    # A single round trip is noisy; keep the best of a few.
+    elapsed = min([await round_trip(connections) for _ in range(args.rounds)])
+
+    for conn in connections:
+        conn.shutdown_event.set()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    case = f"{'console' if args.console else 'plain'}/{count}"
+    return {
+        case: {
+            "created_bytes_per_connection": created / count,
+            "running_bytes_per_connection": (created + running) / count,
+            "round_trip_ms": elapsed * 1000,
+            "round_trip_us_per_connection": elapsed / count * 1e6,
+            "lag_empty_p50_ms": idle_before[50] * 1000,
+            "lag_empty_p99_ms": idle_before[99] * 1000,
+            "lag_idle_p50_ms": idle_after[50] * 1000,
+            "lag_idle_p99_ms": idle_after[99] * 1000,
+        }
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--connections", type=int, default=10000)
+    parser.add_argument(
+        "--console",
+        action="store_true",
+        help="Create every connection's Rich console up front, as if each had received output.",
+    )
+    parser.add_argument("--lag-seconds", type=float, default=1.0)
+    parser.add_argument(
+        "--rounds", type=int, default=5, help="Command round trips timed; the best is kept."
+    )
+    _harness.add_arguments(parser)
+    args = parser.parse_args(argv)
+    # Connection shutdown logs a line each; keep the report readable.
+    logger.remove()
+    results = asyncio.run(run(args))
+    return _harness.finish(args, SUITE, results, DIRECTIONS)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
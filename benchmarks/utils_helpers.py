@@ -0,0 +1,315 @@
+"""
+Micro-benchmarks for the helpers in muforge.utils.misc and muforge.utils.responses that sit on per-command
+paths: partial_match (over a list and over a PrefixIndex), validate_name, to_str, inherits_from, lazy_property,
+Broadcaster.broadcast and json_array_generator.
+
+Every helper is run at each dataset size: candidates to match, name length, inputs per batch, subscribers, or
+rows streamed. The report has the time per call and the peak traced memory of one call.
+
+    python -m benchmarks utils --sizes 100,1000,10000,100000 --output utils.json --baseline utils-baseline.json
+"""
+
+import argparse
+import asyncio
+import gc
+import inspect
+import random
+import string
+import sys
+import time
+import tracemalloc
+import typing
+from dataclasses import dataclass
+
+import pydantic
+
+from muforge.utils.misc import (
+    Broadcaster,
+    inherits_from,
+    lazy_property,
+    partial_match,
+    to_str,
+    validate_name,
+)
+from muforge.utils.prefix import PrefixIndex
+from muforge.utils.responses import json_array_generator
+
+from . import _harness
+
+SUITE = "utils"
+
+DIRECTIONS = {"us_per_call": "lower", "peak_kib": "lower"}
+
+WORDS = (
+    "ancient", "brass", "crimson", "dusty", "ember", "frost", "gilded", "hollow", "iron", "jade",
+    "knotted", "lunar", "mossy", "northern", "obsidian", "pale", "quiet", "rusted", "silver", "tattered",
+)
+NOUNS = (
+    "lantern", "longsword", "cloak", "amulet", "tome", "gauntlet", "shield", "ring", "dagger", "helm",
+)
+
+
+@dataclass(slots=True)
+class Case:
+    """
+    One benchmark at one size. func is called once per timed loop; reset, if given, runs untimed after each
+    call to put the fixture back in its starting state.
+    """
+
+    name: str
+    size: int
+    func: typing.Callable
+    reset: typing.Optional[typing.Callable] = None
+
+
+def item_names(count: int, rng: random.Random) -> list[str]:
+    """
+    Realistic, often-shared-prefix object names like "rusted iron longsword of the north 1234".
+    """
+    return [
+        f"{rng.choice(WORDS)} {rng.choice(WORDS)} {rng.choice(NOUNS)} of the {rng.choice(WORDS)} {i}"
+        for i in range(count)
+    ]
+
+
+def partial_match_cases(size: int, rng: random.Random) -> list[Case]:
+    names = item_names(size, rng)
+    # A prefix shared by many candidates, like a player typing "get rus".
+    query = names[size // 2].split(" ")[0][:3]
+    index = PrefixIndex(names)
+    return [
+        Case("partial_match_list", size, lambda: partial_match(query, names)),
+        Case(
+            "partial_match_list_many",
+            size,
+            lambda: partial_match(query, names, many_results=True),
+        ),
+        Case("partial_match_index", size, lambda: partial_match(query, index)),
+        Case(
+            "partial_match_index_many",
+            size,
+            lambda: partial_match(query, index, many_results=True),
+        ),
+        Case("prefix_index_build", size, lambda: PrefixIndex(names)),
+    ]
+
+
+def validate_name_cases(size: int, rng: random.Random) -> list[Case]:
+    # A long name of size characters with runs of spaces to squish.
+    words = list()
+    length = 0
+    while length < size:
+        word = rng.choice(WORDS) + " " * rng.randint(1, 4)
+        words.append(word)
+        length += len(word)
+    name = f"  {''.join(words)[:size]}  "
+    return [Case("validate_name", size, lambda: validate_name(name))]
+
+
+def to_str_cases(size: int, rng: random.Random) -> list[Case]:
+    samples = (
+        "already text",
+        b"plain ascii bytes",
+        "café naïve".encode("utf-8"),
+        # Not valid UTF-8, so decoding falls back through the other encodings.
+        "café naïve".encode("latin-1"),
+        12345,
+    )
+    inputs = [samples[i % len(samples)] for i in range(size)]
+
+    def run():
+        for value in inputs:
+            to_str(value)
+
+    return [Case("to_str", size, run)]
+
+
+class Base:
+    pass
+
+
+def make_hierarchy(depth: int) -> list[type]:
+    classes = [Base]
+    for i in range(depth):
+        classes.append(type(f"Level{i}", (classes[-1],), dict()))
+    return classes
+
+
+def inherits_from_cases(size: int, rng: random.Random) -> list[Case]:
+    classes = make_hierarchy(10)
+    leaf = classes[-1]
+    objects = [leaf() if i % 2 else leaf for i in range(size)]
+    # Class, instance and dotted-path parents, as callers pass all three.
+    parents = (classes[3], classes[5](), f"{Base.__module__}.{Base.__name__}")
+
+    def run():
+        for i, obj in enumerate(objects):
+            inherits_from(obj, parents[i % 3])
+
+    return [Case("inherits_from", size, run)]
+
+
+class Holder:
+    @lazy_property
+    def handler(self):
+        return {"owner": self}
+
+
+def lazy_property_cases(size: int, rng: random.Random) -> list[Case]:
+    warmed = [Holder() for _ in range(size)]
+    for obj in warmed:
+        obj.handler
+
+    def first():
+        for _ in range(size):
+            Holder().handler
+
+    def cached():
+        for obj in warmed:
+            obj.handler
+
+    return [
+        Case("lazy_property_first", size, first),
+        Case("lazy_property_cached", size, cached),
+    ]
+
+
+def broadcast_cases(size: int, rng: random.Random) -> list[Case]:
+    broadcaster = Broadcaster()
+    queues = [broadcaster.subscribe() for _ in range(size)]
+    message = {"channel": "ooc", "text": "Hello, everyone!"}
+
+    def drain():
+        for queue in queues:
+            queue.get_nowait()
+
+    return [
+        Case(
+            "broadcaster_broadcast",
+            size,
+            lambda: broadcaster.broadcast(message),
+            reset=drain,
+        )
+    ]
+
+
+class Row(pydantic.BaseModel):
+    id: int
+    name: str
+    description: str
+
+
+def responses_cases(size: int, rng: random.Random) -> list[Case]:
+    rows = [
+        Row(id=i, name=name, description=f"A {name} lies here, waiting to be found.")
+        for i, name in enumerate(item_names(size, rng))
+    ]
+
+    async def rows_source():
+        for row in rows:
+            yield row
+
+    async def run():
+        return "".join([chunk async for chunk in json_array_generator(rows_source())])
+
+    return [Case("json_array_generator", size, run)]
+
+
+CASE_BUILDERS = (
+    partial_match_cases,
+    validate_name_cases,
+    to_str_cases,
+    inherits_from_cases,
+    lazy_property_cases,
+    broadcast_cases,
+    responses_cases,
+)
+
+
+async def call(case: Case):
+    result = case.func()
+    if inspect.isawaitable(result):
+        await result
+
+
+async def time_case(case: Case, min_time: float, repeat: int) -> float:
+    """
+    Returns the best mean seconds per call over repeat runs of at least min_time each.
+    """
+    # The first call warms caches (regexes, PrefixIndex keys, pydantic serializers).
+    await call(case)
+    if case.reset:
+        case.reset()
+
+    best = None
+    for _ in range(repeat):
+        loops = 0
+        elapsed = 0.0
+        while elapsed < min_time:
+            started = time.perf_counter()
+            await call(case)
+            elapsed += time.perf_counter() - started
+            loops += 1
+            if case.reset:
+                case.reset()
+        mean = elapsed / loops
+        best = mean if best is None else min(best, mean)
+    return best
+
+
+async def peak_memory(case: Case) -> float:
+    gc.collect()
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    await call(case)
+    peak = tracemalloc.get_traced_memory()[1] - start
+    tracemalloc.stop()
+    if case.reset:
+        case.reset()
+    return peak
+
+
+async def run(args) -> dict[str, dict[str, float]]:
+    results = dict()
+    for size in args.sizes:
+        for builder in CASE_BUILDERS:
+            for case in builder(size, random.Random(size)):
+                if args.only and not any(o in case.name for o in args.only):
+                    continue
+                seconds = await time_case(case, args.min_time, args.repeat)
+                peak = await peak_memory(case)
+                results[f"{case.name}/{size}"] = {
+                    "us_per_call": seconds * 1e6,
+                    "peak_kib": peak / 1024,
+                }
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--sizes",
+        type=lambda s: [int(x) for x in s.split(",")],
+        default=[100, 1000, 10000, 100000],
+        help="Comma-separated dataset sizes.",
+    )
+    parser.add_argument(
+        "--only",
+        type=lambda s: s.split(","),
+        default=None,
+        help="Comma-separated substrings; only run cases whose name contains one.",
+    )
+    parser.add_argument(
+        "--min-time", type=float, default=0.1, help="Minimum seconds per timed run."
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="Timed runs per case; the best is kept."
+    )
+    _harness.add_arguments(parser)
+    args = parser.parse_args(argv)
+    results = asyncio.run(run(args))
+    return _harness.finish(args, SUITE, results, DIRECTIONS)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,3 +1,5 @@
+from collections import defaultdict
+
 SETTINGS = dict()
 PLUGINS: dict[str, "BasePlugin"] = dict()
 PLUGIN_PATHS = list()
@@ -6,3 +8,5 @@ SSL_CONTEXT = None
 SERVICES = dict()
 EVENTS = dict()
 LOCKFUNCS = dict()
+LISTENERS = dict()
+LISTENERS_TABLE: dict[str, list] = defaultdict(list)
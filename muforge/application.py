@@ -1,4 +1,5 @@
 import asyncio
+import inspect
 import ssl
 import sys
 from pathlib import Path
@@ -7,7 +8,9 @@ import aiodns
 import semver
 from loguru import logger
 
+from .utils.metrics import MetricsRegistry
 from .utils.misc import property_from_module
+from .utils.profiling import StartupTimeline
 
 
 class Service:
@@ -28,6 +31,10 @@ class Service:
         pass
 
     def shutdown(self):
+        """
+        Called once the application is shutting down, in reverse start_priority order, while every service is
+        still running. May be overridden as a coroutine to do async cleanup such as flushing buffers.
+        """
         pass
 
 
@@ -48,11 +55,32 @@ class BaseApplication:
 
         self.resolver = None
         self.tls_context = None
+        self.timeline = StartupTimeline(self.name)
+        self.metrics = MetricsRegistry()
 
         if sys.platform != "win32":
             loop = asyncio.get_event_loop()
             self.resolver = aiodns.DNSResolver(loop=loop)
 
+    @property
+    def scheduler(self):
+        return self.services.get("scheduler", None)
+
+    @property
+    def offload(self):
+        return self.services.get("offload", None)
+
+    @property
+    def ids(self):
+        return self.services.get("ids", None)
+
+    @property
+    def run_mode(self) -> str:
+        """
+        Either "dev" or "prod", from MUFORGE.run_mode. Defaults to "dev".
+        """
+        return self.complete_settings.get("MUFORGE", dict()).get("run_mode", "dev")
+
     async def setup_events(self):
         pass
 
@@ -68,7 +96,8 @@ class BaseApplication:
 
         for k, v in self.plugins.items():
             logger.info(f"Found plugin {k} version {v.version()}.")
-            await v.pre_setup()
+            with self.timeline.phase(f"{k}.pre_setup", category="plugin"):
+                await v.pre_setup()
 
         remaining = self.plugins.copy()
 
@@ -101,7 +130,8 @@ class BaseApplication:
                 remaining.pop(slug)
 
         for k, v in self.plugins.items():
-            await v.post_setup()
+            with self.timeline.phase(f"{k}.post_setup", category="plugin"):
+                await v.post_setup()
 
     async def setup_tls(self):
         cert = self.complete_settings.get("TLS", dict()).get("certificate", None)
@@ -115,11 +145,37 @@ class BaseApplication:
             logger.warning("TLS certificate or key not found, TLS is not available.")
 
     async def setup(self):
-        await self.setup_tls()
-        await self.setup_plugins()
-        await self.setup_classes()
-        await self.setup_events()
-        await self.setup_services()
+        with self.timeline.phase("tls"):
+            await self.setup_tls()
+        with self.timeline.phase("plugins"):
+            await self.setup_plugins()
+        with self.timeline.phase("classes"):
+            await self.setup_classes()
+        with self.timeline.phase("events"):
+            await self.setup_events()
+        with self.timeline.phase("services"):
+            await self.setup_services()
+
+    def report_startup(self):
+        """
+        Logs the startup timeline and saves it as JSON so startup regressions can be tracked across releases.
+        The path comes from MUFORGE.startup_timeline and defaults to logs/<name>.startup.json. Set it to false to
+        disable saving.
+        """
+        self.timeline.log()
+        path = self.complete_settings.get("MUFORGE", dict()).get(
+            "startup_timeline", f"logs/{self.name}.startup.json"
+        )
+        if not path:
+            return
+        try:
+            self.timeline.save(
+                path,
+                python=sys.version,
+                plugins={k: v.version() for k, v in self.plugins.items()},
+            )
+        except OSError as e:
+            logger.warning(f"Could not save startup timeline to {path}: {e}")
 
     async def setup_classes(self):
         temp_classes = dict()
@@ -131,8 +187,25 @@ class BaseApplication:
         for k, (p, cls) in temp_classes.items():
             self.classes[k] = cls
 
+    def core_services(self) -> dict[str, type]:
+        """
+        Services provided by MuForge itself, in [name, service] format. Core services are constructed with
+        plugin=None. A plugin can replace one by announcing a service under the same name.
+        """
+        from .services.ids import IdAllocator
+        from .services.loop_lag import LoopLagMonitor
+        from .services.offload import OffloadService
+        from .services.scheduler import Scheduler
+
+        return {
+            "loop_lag": LoopLagMonitor,
+            "scheduler": Scheduler,
+            "offload": OffloadService,
+            "ids": IdAllocator,
+        }
+
     async def setup_services(self):
-        temp_services = dict()
+        temp_services = {k: (None, v) for k, v in self.core_services().items()}
         for p in self.plugin_load_order:
             if services := getattr(p, f"{self.name}_services")():
                 for k, v in services.items():
@@ -146,11 +219,12 @@ class BaseApplication:
             else:
                 logger.warning(f"Invalid service: {k}, will not be loaded")
 
-        valid_services = list(self.services.values())
-        valid_services.sort(key=lambda x: x.load_priority)
+        valid_services = list(self.services.items())
+        valid_services.sort(key=lambda x: x[1].load_priority)
         logger.info(f"Setting up {len(valid_services)} services...")
-        for srv in valid_services:
-            await srv.setup()
+        for k, srv in valid_services:
+            with self.timeline.phase(k, category="service"):
+                await srv.setup()
         logger.info("Services setup complete.")
 
     async def run(self):
@@ -165,10 +239,21 @@ class BaseApplication:
             tg.create_task(self.start())
 
             await self.shutdown_event.wait()
+            await self.shutdown_services()
             raise asyncio.CancelledError()
 
         logger.info("All services have stopped.")
 
+    async def shutdown_services(self):
+        services = list(self.services.items())
+        services.sort(key=lambda x: x[1].start_priority, reverse=True)
+        for k, srv in services:
+            try:
+                if inspect.isawaitable(result := srv.shutdown()):
+                    await result
+            except Exception as e:
+                logger.error(f"Error shutting down service {k}: {e}")
+
     async def start(self):
         pass
 
@@ -1,6 +1,7 @@
 import asyncio
 from pathlib import Path
 
+import orjson
 from hypercorn import Config
 from hypercorn.asyncio import serve
 from loguru import logger
@@ -9,7 +10,12 @@ import muforge
 from muforge.application import BaseApplication
 from muforge.utils.misc import property_from_module
 
+from .commands import CommandRegistry
+from .database import DatabaseService
+from .entity_cache import EntityCache
 from .fastapi import assemble_fastapi
+from .notifications import NotificationDispatcher, TableChange, dispatch_change
+from .writebehind import WriteBehindService
 
 
 class Application(BaseApplication):
@@ -20,6 +26,31 @@ class Application(BaseApplication):
         self.fastapi_config = None
         self.fastapi_instance = None
 
+    @property
+    def db(self) -> DatabaseService:
+        return self.services.get("db", None)
+
+    @property
+    def entities(self) -> EntityCache:
+        return self.services.get("entities", None)
+
+    @property
+    def writes(self) -> WriteBehindService:
+        return self.services.get("writes", None)
+
+    @property
+    def commands(self) -> CommandRegistry:
+        return self.services.get("commands", None)
+
+    def core_services(self) -> dict[str, type]:
+        services = super().core_services()
+        services["db"] = DatabaseService
+        services["notifications"] = NotificationDispatcher
+        services["entities"] = EntityCache
+        services["writes"] = WriteBehindService
+        services["commands"] = CommandRegistry
+        return services
+
     async def setup_fastapi(self):
         settings = self.settings["webserver"]
         self.fastapi_config = Config()
@@ -37,20 +68,34 @@ class Application(BaseApplication):
             if Path(tls["key"]).exists():
                 self.fastapi_config.keyfile = str(Path(tls["key"]).absolute())
 
-        self.fastapi_instance = await assemble_fastapi(self, self.fastapi_config)
+        with self.timeline.phase("assemble_fastapi", category="fastapi"):
+            self.fastapi_instance = await assemble_fastapi(self, self.fastapi_config)
 
     async def setup(self):
         await super().setup()
-        await self.setup_fastapi()
-        await self.setup_plugins_final()
+        with self.timeline.phase("listeners"):
+            await self.setup_listeners()
+        with self.timeline.phase("fastapi"):
+            await self.setup_fastapi()
+        with self.timeline.phase("plugins_final"):
+            await self.setup_plugins_final()
+
+    async def setup_classes(self):
+        await super().setup_classes()
+        await self.setup_lockfuncs()
+
+    async def setup_lockfuncs(self):
+        for p in self.plugin_load_order:
+            muforge.LOCKFUNCS.update(p.game_lockfuncs())
 
     async def setup_plugins_final(self):
         for p in self.plugin_load_order:
             if hasattr(p, "setup_final"):
-                await p.setup_final()
+                with self.timeline.phase(f"{p.slug()}.setup_final", category="plugin"):
+                    await p.setup_final()
 
     async def setup_listeners(self):
-        for k, v in muforge.SETTINGS["GAME"].get("listeners", dict()).items():
+        for k, v in self.settings.get("listeners", dict()).items():
             listener_class = property_from_module(v)
             listener = listener_class()
             muforge.LISTENERS[k] = listener
@@ -59,32 +104,19 @@ class Application(BaseApplication):
 
     async def handle_postgre_notification(self, conn, pid, channel, payload):
         decoded = orjson.loads(payload)
-        args = [decoded["table"], decoded["id"]]
+        change = TableChange(decoded["table"], decoded["id"], decoded["operation"])
 
-        if not (listeners := muforge.LISTENERS_TABLE.get(decoded["table"], [])):
+        if (dispatcher := self.services.get("notifications", None)) is not None:
+            dispatcher.submit(change)
             return
 
-        match decoded["operation"]:
-            case "UPDATE":
-                for listener in listeners:
-                    await listener.on_update(*args)
-            case "INSERT":
-                for listener in listeners:
-                    await listener.on_insert(*args)
-            case "DELETE":
-                for listener in listeners:
-                    await listener.on_delete(*args)
-
-    async def postgre_listener(self):
-        async with self.db.connection() as conn:
-            await conn.add_listener("table_changes", self.handle_postgre_notification)
-            while True:
-                try:
-                    await asyncio.sleep(10)
-                except asyncio.CancelledError:
-                    break
+        for listener in muforge.LISTENERS_TABLE.get(change.table, []):
+            await dispatch_change(listener, change)
 
     async def start(self):
+        state = self.fastapi_instance.state
+        if openapi_cache := getattr(state, "openapi_cache", None):
+            self.task_group.create_task(openapi_cache.warm())
         await serve(
             self.fastapi_instance,
             self.fastapi_config,
@@ -0,0 +1,377 @@
+import functools
+import hashlib
+import inspect
+import time
+import typing
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from fastapi import Depends, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from fastapi.routing import serialize_response
+
+import muforge
+from muforge.utils.metrics import MetricsRegistry
+
+from .middleware import route_template
+
+# The keyword parameter cached_response adds to resolve the identity dependency.
+IDENTITY_PARAM = "_muforge_identity"
+
+# Headers that are recomputed for every response served from the cache.
+_SKIP_HEADERS = {"content-length", "etag", "cache-control"}
+
+
+@dataclass(slots=True)
+class CachedResponse:
+    body: bytes
+    status_code: int
+    headers: list[tuple[str, str]]
+    etag: str
+    expires: typing.Optional[float]
+    # (table, row id or None) pairs this entry is indexed under, for invalidation.
+    watches: tuple[tuple[str, typing.Optional[str]], ...] = ()
+
+
+class _Render:
+    """
+    A response being computed for the cache. Set stale if a table change it depends on arrives meanwhile, so
+    the result is returned to its caller but not stored.
+    """
+
+    __slots__ = ("watches", "stale")
+
+    def __init__(self, watches: tuple[tuple[str, typing.Optional[str]], ...]):
+        self.watches = watches
+        self.stale = False
+
+
+class ResponseCache:
+    """
+    A bounded in-memory cache of rendered API responses.
+
+    Entries are evicted least-recently-used first once max_entries or max_bytes is exceeded, when their ttl
+    expires, or when a table they depend on changes. The cache registers itself in muforge.LISTENERS_TABLE
+    for every table a cached route depends on, so the table-change notifications dispatched by
+    handle_postgre_notification invalidate it.
+    """
+
+    def __init__(
+        self,
+        registry: MetricsRegistry,
+        max_entries: int = 10000,
+        max_bytes: int = 64 * 1024 * 1024,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries: OrderedDict[tuple, CachedResponse] = OrderedDict()
+        self.size = 0
+        self.tables: set[str] = set()
+        # (table, None) -> keys invalidated by any change to table.
+        # (table, id) -> keys invalidated by changes to that row.
+        self.index: dict[tuple[str, typing.Optional[str]], set[tuple]] = dict()
+        # Renders in progress, by the same watch keys as index.
+        self.rendering: dict[tuple[str, typing.Optional[str]], set[_Render]] = dict()
+        self.requests = registry.counter(
+            "muforge_response_cache_requests",
+            "Response cache lookups.",
+            ("route", "result"),
+        )
+        registry.gauge(
+            "muforge_response_cache_entries", "Responses held in the response cache."
+        ).set_function(lambda: len(self.entries))
+        registry.gauge(
+            "muforge_response_cache_bytes", "Bytes held in the response cache."
+        ).set_function(lambda: self.size)
+
+    def watch(self, table: str):
+        if table in self.tables:
+            return
+        self.tables.add(table)
+        muforge.LISTENERS_TABLE[table].append(self)
+
+    def get(self, key: tuple) -> typing.Optional[CachedResponse]:
+        if (entry := self.entries.get(key, None)) is None:
+            return None
+        if entry.expires is not None and entry.expires <= time.monotonic():
+            self.remove(key)
+            return None
+        self.entries.move_to_end(key)
+        return entry
+
+    def begin(self, watches: tuple[tuple[str, typing.Optional[str]], ...]) -> _Render:
+        """
+        Registers a response about to be computed, so invalidations that arrive before it is stored mark it
+        stale. Pair with end().
+        """
+        render = _Render(watches)
+        for watch in watches:
+            # Listen before computing, or a change to a table never cached before would go unnoticed.
+            self.watch(watch[0])
+            self.rendering.setdefault(watch, set()).add(render)
+        return render
+
+    def end(self, render: _Render):
+        for watch in render.watches:
+            if renders := self.rendering.get(watch, None):
+                renders.discard(render)
+                if not renders:
+                    del self.rendering[watch]
+
+    def put(self, key: tuple, entry: CachedResponse):
+        if len(entry.body) > self.max_bytes:
+            return
+        self.remove(key)
+        self.entries[key] = entry
+        self.size += len(entry.body)
+        for watch in entry.watches:
+            self.watch(watch[0])
+            self.index.setdefault(watch, set()).add(key)
+        while len(self.entries) > self.max_entries or self.size > self.max_bytes:
+            self.remove(next(iter(self.entries)))
+
+    def remove(self, key: tuple):
+        if (entry := self.entries.pop(key, None)) is None:
+            return
+        self.size -= len(entry.body)
+        for watch in entry.watches:
+            if keys := self.index.get(watch, None):
+                keys.discard(key)
+                if not keys:
+                    del self.index[watch]
+
+    def invalidate(self, table: str, id=None):
+        """
+        Drops every entry that depends on the whole table, plus those that depend on the given row.
+        """
+        watches = [(table, None)]
+        if id is not None:
+            watches.append((table, str(id)))
+        keys = set()
+        for watch in watches:
+            keys.update(self.index.get(watch, ()))
+            for render in self.rendering.get(watch, ()):
+                render.stale = True
+        for key in keys:
+            self.remove(key)
+
+    def clear(self):
+        self.entries.clear()
+        self.index.clear()
+        self.size = 0
+        for renders in self.rendering.values():
+            for render in renders:
+                render.stale = True
+
+    async def on_update(self, table: str, id):
+        self.invalidate(table, id)
+
+    async def on_insert(self, table: str, id):
+        self.invalidate(table, id)
+
+    async def on_delete(self, table: str, id):
+        self.invalidate(table, id)
+
+    async def on_batch(self, changes):
+        for change in changes:
+            self.invalidate(change.table, change.id)
+
+    async def on_resync(self):
+        # Table changes may have been missed; nothing cached can be trusted.
+        self.clear()
+
+
+def make_etag(body: bytes) -> str:
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    if not (if_none_match := request.headers.get("if-none-match", None)):
+        return False
+    tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+    return etag in tags or "*" in tags
+
+
+async def render_result(request: Request, result) -> Response:
+    """
+    Turns an endpoint's return value into a response the way FastAPI would, validating and filtering it
+    through the route's response_model (and its include/exclude options) if it has one.
+    """
+    if isinstance(result, Response):
+        return result
+    route = request.scope.get("route", None)
+    content = await serialize_response(
+        field=getattr(route, "response_field", None),
+        response_content=result,
+        include=getattr(route, "response_model_include", None),
+        exclude=getattr(route, "response_model_exclude", None),
+        by_alias=getattr(route, "response_model_by_alias", True),
+        exclude_unset=getattr(route, "response_model_exclude_unset", False),
+        exclude_defaults=getattr(route, "response_model_exclude_defaults", False),
+        exclude_none=getattr(route, "response_model_exclude_none", False),
+    )
+    return JSONResponse(content)
+
+
+def to_cached(result: Response, expires, watches) -> typing.Optional[CachedResponse]:
+    """
+    Captures a rendered response for the cache. Returns None for responses that can't be cached: streams,
+    files, and anything but a 200.
+    """
+    if isinstance(result, (StreamingResponse, FileResponse)):
+        return None
+    if result.status_code != 200:
+        return None
+    headers = [
+        (k.decode("latin-1"), v.decode("latin-1"))
+        for k, v in result.raw_headers
+        if k.decode("latin-1").lower() not in _SKIP_HEADERS
+    ]
+    return CachedResponse(
+        body=result.body,
+        status_code=result.status_code,
+        headers=headers,
+        etag=make_etag(result.body),
+        expires=expires,
+        watches=watches,
+    )
+
+
+def cached_response(
+    *,
+    tables: typing.Iterable[str] | dict[str, str] = (),
+    ttl: typing.Optional[float] = None,
+    vary_auth: bool = True,
+    identity: typing.Optional[typing.Callable] = None,
+    cache_control: str = "private, no-cache",
+):
+    """
+    Decorator for plugin router endpoints that makes their responses conditional and cacheable.
+
+    Place it below the router decorator:
+
+        @router.get("/{character_id}")
+        @cached_response(tables={"characters": "character_id"})
+        async def get_character(character_id: UUID): ...
+
+    Every response gets a strong ETag, and a request whose If-None-Match matches gets a 304. Responses are
+    kept in the application's ResponseCache, keyed by route template, path and query parameters and (with
+    vary_auth) the caller. Pass the router's auth dependency as identity to key on who the caller is; without
+    it, the Authorization and Cookie headers are used, so callers with different sessions never share
+    entries. A table change that arrives while a response is being computed keeps it out of the cache.
+
+    Args:
+        tables: Tables the response is built from. An iterable of names invalidates on any change to those
+            tables. A dict of {table: path_param} only invalidates when the changed row's id equals that
+            path parameter.
+        ttl: Seconds before an entry expires regardless of table changes. None keeps it until invalidated.
+        vary_auth: Whether responses differ per caller. Disable only for public data.
+        identity: A FastAPI dependency resolving the caller, such as the one that authenticates the request.
+            Its result's id attribute (or the result itself) is used in the cache key and must be hashable.
+        cache_control: The Cache-Control header sent with responses.
+
+    Notes:
+        The endpoint's return value is serialized through the route's response_model, as FastAPI would.
+        Streaming responses and non-200 responses are passed through uncached.
+    """
+
+    def decorator(func):
+        sig = inspect.signature(func)
+        request_param = None
+        for p in sig.parameters.values():
+            if p.annotation is Request or p.annotation == "Request":
+                request_param = p.name
+                break
+        injected = request_param is None
+        extra = list()
+        if injected:
+            request_param = "_muforge_request"
+            extra.append(
+                inspect.Parameter(
+                    request_param, inspect.Parameter.KEYWORD_ONLY, annotation=Request
+                )
+            )
+        keyed_identity = vary_auth and identity is not None
+        if keyed_identity:
+            extra.append(
+                inspect.Parameter(
+                    IDENTITY_PARAM,
+                    inspect.Parameter.KEYWORD_ONLY,
+                    default=Depends(identity),
+                )
+            )
+        if extra:
+            params = [p for p in sig.parameters.values() if p.kind != p.VAR_KEYWORD]
+            params.extend(extra)
+            params.extend(
+                p for p in sig.parameters.values() if p.kind == p.VAR_KEYWORD
+            )
+            sig = sig.replace(parameters=params)
+        is_async = inspect.iscoroutinefunction(func)
+        watched = tables if isinstance(tables, dict) else {t: None for t in tables}
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            if injected:
+                request: Request = kwargs.pop(request_param)
+            else:
+                request: Request = kwargs[request_param]
+            cache: ResponseCache = request.app.state.response_cache
+            route = route_template(request.scope)
+            auth = None
+            if keyed_identity:
+                caller = kwargs.pop(IDENTITY_PARAM)
+                auth = getattr(caller, "id", caller)
+            elif vary_auth:
+                credentials = [request.headers.get(h, "") for h in ("authorization", "cookie")]
+                if any(credentials):
+                    auth = hashlib.blake2b(
+                        "\n".join(credentials).encode(), digest_size=16
+                    ).digest()
+            key = (
+                request.method,
+                route,
+                tuple(sorted(request.path_params.items())),
+                tuple(sorted(request.query_params.multi_items())),
+                auth,
+            )
+
+            if (entry := cache.get(key)) is None:
+                cache.requests.labels(route, "miss").inc()
+                watches = tuple(
+                    (table, None if param is None else str(request.path_params[param]))
+                    for table, param in watched.items()
+                )
+                render = cache.begin(watches)
+                try:
+                    if is_async:
+                        result = await func(*args, **kwargs)
+                    else:
+                        result = await run_in_threadpool(func, *args, **kwargs)
+                    response = await render_result(request, result)
+                finally:
+                    cache.end(render)
+                expires = time.monotonic() + ttl if ttl is not None else None
+                if render.stale:
+                    return response
+                if (entry := to_cached(response, expires, watches)) is None:
+                    return response
+                cache.put(key, entry)
+            else:
+                cache.requests.labels(route, "hit").inc()
+
+            headers = {"ETag": entry.etag, "Cache-Control": cache_control}
+            if etag_matches(request, entry.etag):
+                return Response(status_code=304, headers=headers)
+            response = Response(
+                entry.body, status_code=entry.status_code, headers=headers
+            )
+            for k, v in entry.headers:
+                response.headers.append(k, v)
+            return response
+
+        wrapper.__signature__ = sig
+        return wrapper
+
+    return decorator
@@ -0,0 +1,246 @@
+import re
+import typing
+from dataclasses import dataclass, field
+
+from loguru import logger
+
+import muforge
+from muforge.application import Service
+
+
+@dataclass(slots=True, eq=False)
+class CommandEntry:
+    name: str
+    command: type
+    aliases: tuple[str, ...]
+    # Precompiled from the command's `syntax` attribute, matched against the arguments.
+    syntax: typing.Optional[re.Pattern]
+    # Lockfuncs resolved from the command's `locks` attribute; all must pass.
+    locks: tuple[typing.Callable, ...]
+    # Set if a named lock couldn't be found; the command is then unavailable to everyone.
+    broken: bool = False
+
+
+@dataclass(slots=True)
+class CommandMatch:
+    # None if the input was ambiguous; see candidates.
+    command: typing.Optional[type]
+    name: typing.Optional[str]
+    # The command word as typed.
+    word: str
+    args: str
+    # The syntax pattern's match against args, if the command has a syntax.
+    match: typing.Optional[re.Match] = None
+    candidates: list[str] = field(default_factory=list)
+
+    @property
+    def ambiguous(self) -> bool:
+        return self.command is None
+
+    @property
+    def syntax_ok(self) -> bool:
+        return self.match is not None or getattr(self.command, "syntax", None) is None
+
+
+class _Node:
+    __slots__ = ("children", "terminal", "subtree")
+
+    def __init__(self):
+        self.children: dict[str, _Node] = dict()
+        # Entries with a name or alias ending exactly here.
+        self.terminal: list[CommandEntry] = list()
+        # Every entry with a name or alias passing through here, each once, in registration order.
+        self.subtree: dict[CommandEntry, None] = dict()
+
+
+class CommandRegistry(Service):
+    """
+    The game's command table, built from every plugin's game_commands() in plugin load order; a later plugin
+    replaces an earlier plugin's command of the same name.
+
+        found = self.app.commands.resolve("inv", character)
+        if found and not found.ambiguous and found.syntax_ok:
+            ...
+
+    Names and aliases are indexed in a trie, so finding what a player typed costs the length of the command
+    word, not the number of commands. An exact name or alias wins; otherwise an abbreviation resolves if it is
+    the unique prefix of one command the character may use. Resolving an abbreviation stops at the second
+    command the character may use, but skips every command whose locks it fails on the way, so in the worst
+    case (a short prefix and a character locked out of most commands) it costs the number of commands
+    under that prefix.
+
+    Commands may define these class attributes:
+        aliases (iterable[str]): Other names for the command.
+        syntax (str): A regular expression matched in full against the (stripped) arguments. Named groups
+            are available as CommandMatch.match.groupdict().
+        locks (iterable[str | callable]): Lockfuncs, by name from muforge.LOCKFUNCS or as callables, that must
+            all return True for a character to use the command.
+    """
+
+    load_priority = -20
+
+    def __init__(self, app, plugin):
+        super().__init__(app, plugin)
+        self.root = _Node()
+        self.entries: dict[str, CommandEntry] = dict()
+
+    async def setup(self):
+        commands = dict()
+        for p in self.app.plugin_load_order:
+            if found := p.game_commands():
+                commands.update(found)
+        for name, command in commands.items():
+            self.add(name, command)
+        logger.info(f"Registered {len(self.entries)} commands.")
+
+    def make_entry(self, name: str, command: type) -> CommandEntry:
+        locks = list()
+        broken = False
+        for lock in getattr(command, "locks", ()):
+            if callable(lock):
+                locks.append(lock)
+            elif (func := muforge.LOCKFUNCS.get(lock, None)) is not None:
+                locks.append(func)
+            else:
+                logger.warning(
+                    f"Command {name} uses unknown lockfunc {lock}; it will be unavailable."
+                )
+                broken = True
+        syntax = getattr(command, "syntax", None)
+        aliases = dict.fromkeys(a.lower() for a in getattr(command, "aliases", ()))
+        aliases.pop(name, None)
+        return CommandEntry(
+            name=name,
+            command=command,
+            aliases=tuple(aliases),
+            syntax=re.compile(syntax) if syntax else None,
+            locks=tuple(locks),
+            broken=broken,
+        )
+
+    def add(self, name: str, command: type) -> CommandEntry:
+        """
+        Registers a command, replacing any existing command with the same name.
+        """
+        name = name.lower()
+        self.remove(name)
+        entry = self.make_entry(name, command)
+        self.entries[name] = entry
+        for key in (name, *entry.aliases):
+            node = self.root
+            for ch in key:
+                node = node.children.setdefault(ch, _Node())
+                node.subtree[entry] = None
+            node.terminal.append(entry)
+        return entry
+
+    def remove(self, name: str):
+        if (entry := self.entries.pop(name.lower(), None)) is None:
+            return
+        for key in (entry.name, *entry.aliases):
+            # A name and its aliases can share nodes, so a key's path may already be partly pruned.
+            path = [self.root]
+            for ch in key:
+                if (child := path[-1].children.get(ch, None)) is None:
+                    break
+                path.append(child)
+            if len(path) == len(key) + 1 and entry in path[-1].terminal:
+                path[-1].terminal.remove(entry)
+            for node in path[1:]:
+                node.subtree.pop(entry, None)
+            # Prune nodes nothing ends at or passes through any more.
+            for i in range(len(path) - 1, 0, -1):
+                node = path[i]
+                if node.subtree or node.terminal or node.children:
+                    break
+                del path[i - 1].children[key[i - 1]]
+
+    def allowed(self, entry: CommandEntry, character, cache: dict) -> bool:
+        """
+        Whether character passes entry's locks. Lockfunc results are memoized in cache, since many commands
+        share the same locks.
+        """
+        if entry.broken:
+            return False
+        if character is None:
+            return True
+        for lock in entry.locks:
+            if (passed := cache.get(lock, None)) is None:
+                passed = cache[lock] = bool(lock(character))
+            if not passed:
+                return False
+        return True
+
+    def available(self, character) -> list[type]:
+        """
+        Every command character may use.
+        """
+        cache = dict()
+        return [
+            e.command
+            for e in self.entries.values()
+            if self.allowed(e, character, cache)
+        ]
+
+    def split(self, text: str) -> tuple[str, str]:
+        text = text.strip()
+        # Single-character punctuation commands, like ' for say or : for emote, needn't be followed by a space.
+        if text and not text[0].isalnum():
+            node = self.root.children.get(text[0], None)
+            if node and node.terminal and (len(text) == 1 or text[1] not in node.children):
+                return text[0], text[1:].strip()
+        word, _, args = text.partition(" ")
+        return word, args.strip()
+
+    def resolve(
+        self, text: str, character=None, max_candidates: int = 10
+    ) -> typing.Optional[CommandMatch]:
+        """
+        Finds the command a line of input invokes.
+
+        Args:
+            text (str): The input line.
+            character: If given, commands whose locks it fails are ignored.
+            max_candidates (int): How many names to collect when the input is ambiguous.
+
+        Returns:
+            None if nothing matches, otherwise a CommandMatch. If several commands share the typed prefix,
+            the match has command=None and lists them in candidates.
+        """
+        word, args = self.split(text)
+        if not word:
+            return None
+        node = self.root
+        for ch in word.lower():
+            if (node := node.children.get(ch, None)) is None:
+                return None
+
+        cache = dict()
+        found = None
+        for entry in node.terminal:
+            if self.allowed(entry, character, cache):
+                found = entry
+                break
+        else:
+            for entry in node.subtree:
+                if not self.allowed(entry, character, cache):
+                    continue
+                if found is None:
+                    found = entry
+                    continue
+                # Ambiguous: collect a few more names for the error message, then stop.
+                candidates = [found.name, entry.name]
+                for other in node.subtree:
+                    if len(candidates) >= max_candidates:
+                        break
+                    if other.name not in candidates and self.allowed(
+                        other, character, cache
+                    ):
+                        candidates.append(other.name)
+                return CommandMatch(
+                    None, None, word, args, candidates=sorted(candidates)
+                )
+        if found is None:
+            return None
+        match = found.syntax.fullmatch(args) if found.syntax else None
+        return CommandMatch(found.command, found.name, word, args, match)
@@ -0,0 +1,271 @@
+import time
+import typing
+import zlib
+from dataclasses import dataclass
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from muforge.utils.metrics import MetricsRegistry
+
+from .middleware import route_template
+from .static import is_compressible, parse_accept_encoding
+
+try:
+    from compression import zstd
+except ImportError:
+    zstd = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# Preferred first. Only encodings whose module is importable are offered.
+AVAILABLE_ENCODINGS = tuple(
+    name
+    for name, module in (("zstd", zstd), ("br", brotli), ("gzip", zlib))
+    if module is not None
+)
+
+# (fastest, best) levels used as CPU load goes from high to low.
+DEFAULT_LEVELS = {"zstd": (1, 6), "br": (1, 5), "gzip": (1, 6)}
+
+
+@dataclass(slots=True)
+class CompressionPolicy:
+    """
+    How responses from a route prefix are compressed.
+
+    enabled: Whether to compress at all.
+    minimum_size: Single-message bodies smaller than this are sent as-is.
+    stream: Whether to compress streaming (multi-message) bodies, flushing after every chunk.
+    """
+
+    enabled: bool = True
+    minimum_size: int = 1024
+    stream: bool = False
+
+
+class _Encoder:
+    """
+    Incremental compressor for one response. compress() returns everything that can be sent so far.
+    """
+
+    def __init__(self, encoding: str, level: int):
+        self.encoding = encoding
+        match encoding:
+            case "gzip":
+                self._obj = zlib.compressobj(level, zlib.DEFLATED, 31)
+            case "br":
+                self._obj = brotli.Compressor(quality=level)
+            case "zstd":
+                self._obj = zstd.ZstdCompressor(level=level)
+            case _:
+                raise ValueError(f"Unsupported encoding: {encoding}")
+
+    def compress(self, data: bytes) -> bytes:
+        match self.encoding:
+            case "gzip":
+                return self._obj.compress(data) + self._obj.flush(zlib.Z_SYNC_FLUSH)
+            case "br":
+                return self._obj.process(data) + self._obj.flush()
+            case "zstd":
+                return self._obj.compress(data, mode=zstd.ZstdCompressor.FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        match self.encoding:
+            case "gzip":
+                return self._obj.flush(zlib.Z_FINISH)
+            case "br":
+                return self._obj.finish()
+            case "zstd":
+                return self._obj.flush()
+
+
+class CpuLoad:
+    """
+    Tracks the fraction of one core this process has used recently, sampled at most once per interval.
+    """
+
+    def __init__(self, interval: float = 1.0):
+        self.interval = interval
+        self.value = 0.0
+        self._wall = time.monotonic()
+        self._cpu = time.process_time()
+
+    def get(self) -> float:
+        now = time.monotonic()
+        if (elapsed := now - self._wall) >= self.interval:
+            cpu = time.process_time()
+            self.value = (cpu - self._cpu) / elapsed
+            self._wall, self._cpu = now, cpu
+        return self.value
+
+
+class CompressionMiddleware:
+    """
+    Pure ASGI response compression with per-route policy.
+
+    - Responses that already have a Content-Encoding, event streams, and non-compressible media types are
+      never touched.
+    - Streaming bodies are passed through unless the route's policy enables streaming compression.
+    - zstd, brotli or gzip is chosen from the client's Accept-Encoding, in that order of preference.
+    - The compression level drops from the best to the fastest configured level as process CPU load rises
+      from cpu_low to cpu_high.
+    - CPU time spent compressing is recorded per route and encoding.
+    - A strong ETag on a response that gets compressed is made weak.
+    """
+
+    def __init__(
+        self,
+        app,
+        registry: MetricsRegistry,
+        default: CompressionPolicy = None,
+        policies: dict[str, CompressionPolicy] = None,
+        encodings: typing.Iterable[str] = AVAILABLE_ENCODINGS,
+        levels: dict[str, tuple[int, int]] = None,
+        cpu_low: float = 0.25,
+        cpu_high: float = 0.75,
+    ):
+        self.app = app
+        self.default = default or CompressionPolicy()
+        # Longest prefix first.
+        self.policies = sorted(
+            (policies or dict()).items(), key=lambda x: len(x[0]), reverse=True
+        )
+        self._policy_cache: dict[str, CompressionPolicy] = dict()
+        self.encodings = tuple(e for e in encodings if e in AVAILABLE_ENCODINGS)
+        self.levels = {**DEFAULT_LEVELS, **(levels or dict())}
+        self.cpu_low = cpu_low
+        self.cpu_high = cpu_high
+        self.cpu = CpuLoad()
+        self.cpu_seconds = registry.counter(
+            "muforge_http_compression_cpu_seconds",
+            "CPU time spent compressing responses.",
+            ("route", "encoding"),
+        )
+        self.bytes_in = registry.counter(
+            "muforge_http_compression_input_bytes",
+            "Response bytes before compression.",
+            ("route", "encoding"),
+        )
+        self.bytes_out = registry.counter(
+            "muforge_http_compression_output_bytes",
+            "Response bytes after compression.",
+            ("route", "encoding"),
+        )
+
+    def policy_for(self, route: str) -> CompressionPolicy:
+        if (policy := self._policy_cache.get(route, None)) is None:
+            policy = self.default
+            for prefix, p in self.policies:
+                if route == prefix or route.startswith(f"{prefix}/"):
+                    policy = p
+                    break
+            self._policy_cache[route] = policy
+        return policy
+
+    def choose_encoding(self, scope) -> typing.Optional[str]:
+        accepted = parse_accept_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        for encoding in self.encodings:
+            if accepted.get(encoding, 0.0) > 0.0:
+                return encoding
+        return None
+
+    def level_for(self, encoding: str) -> int:
+        fastest, best = self.levels[encoding]
+        load = self.cpu.get()
+        if load <= self.cpu_low:
+            return best
+        if load >= self.cpu_high:
+            return fastest
+        fraction = (load - self.cpu_low) / (self.cpu_high - self.cpu_low)
+        return round(best - (best - fastest) * fraction)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not (encoding := self.choose_encoding(scope)):
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        route = None
+        encoder = None
+        # None until the first body message decides; then True (compressing) or False (passing through).
+        compressing = None
+
+        async def send_wrapper(message):
+            nonlocal start_message, route, encoder, compressing
+            match message["type"]:
+                case "http.response.start":
+                    headers = Headers(raw=message.get("headers", []))
+                    media_type = headers.get("content-type", "")
+                    route = route_template(scope)
+                    policy = self.policy_for(route)
+                    if (
+                        not policy.enabled
+                        or "content-encoding" in headers
+                        or media_type.startswith("text/event-stream")
+                        or not is_compressible(media_type)
+                    ):
+                        compressing = False
+                        await send(message)
+                    else:
+                        start_message = message
+                    return
+                case "http.response.body" if compressing is None:
+                    policy = self.policy_for(route)
+                    body = message.get("body", b"")
+                    more_body = message.get("more_body", False)
+                    if more_body and not policy.stream:
+                        compressing = False
+                    elif not more_body and len(body) < policy.minimum_size:
+                        compressing = False
+                    else:
+                        compressing = True
+                        encoder = _Encoder(encoding, self.level_for(encoding))
+                    headers = MutableHeaders(scope=start_message)
+                    if compressing:
+                        headers["Content-Encoding"] = encoding
+                        headers.add_vary_header("Accept-Encoding")
+                        # The encoded body is a different representation, so it can't share a strong
+                        # validator with the identity body. If-None-Match compares weakly, so revalidation
+                        # still works.
+                        if (etag := headers.get("etag", None)) and not etag.startswith("W/"):
+                            headers["ETag"] = f"W/{etag}"
+                        if more_body:
+                            del headers["Content-Length"]
+                    await self._send_body(
+                        send, start_message, message, encoder, route, encoding, headers
+                    )
+                    return
+                case "http.response.body" if compressing:
+                    await self._send_body(
+                        send, None, message, encoder, route, encoding, None
+                    )
+                    return
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+    async def _send_body(
+        self, send, start_message, message, encoder, route, encoding, headers
+    ):
+        if encoder is None:
+            await send(start_message)
+            await send(message)
+            return
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        started = time.thread_time()
+        out = encoder.compress(body) if body else b""
+        if not more_body:
+            out += encoder.finish()
+        self.cpu_seconds.labels(route, encoding).inc(time.thread_time() - started)
+        self.bytes_in.labels(route, encoding).inc(len(body))
+        self.bytes_out.labels(route, encoding).inc(len(out))
+        if start_message is not None:
+            if not more_body:
+                headers["Content-Length"] = str(len(out))
+            await send(start_message)
+        await send({"type": "http.response.body", "body": out, "more_body": more_body})
@@ -0,0 +1,229 @@
+import asyncio
+import typing
+
+import asyncpg
+import orjson
+from loguru import logger
+
+import muforge
+from muforge.application import Service
+
+
+class DatabaseService(Service):
+    """
+    Owns the game's Postgres connection pool and a dedicated, long-lived connection that LISTENs for
+    table-change notifications and feeds them to the application's handle_postgre_notification.
+
+    Plugins should borrow connections from here rather than building their own pools:
+
+        async with self.app.db.connection() as conn:
+            row = await conn.fetchrow("SELECT * FROM characters WHERE id = $1", character_id)
+
+    Each pooled connection keeps a cache of prepared statements, so repeated queries skip the parse/plan
+    round trip. json and jsonb columns are encoded and decoded with orjson.
+
+    Configured from GAME.database:
+        dsn (str): Required, e.g. postgresql://muforge@localhost/muforge
+        min_size, max_size (int): Pool size. Default 2 and 20.
+        max_inactive_lifetime (float): Seconds before idle pool connections are closed. Default 300.
+        statement_cache_size (int): Prepared statements cached per connection. Default 1024.
+        command_timeout (float): Default query timeout in seconds. Default 60.
+        health_interval (float): Seconds between health checks. Default 30.
+        listen_channels (list[str]): Channels the LISTEN connection subscribes to. Default ["table_changes"].
+        reconnect_max (float): Upper bound of the LISTEN reconnect backoff in seconds. Default 30.
+    """
+
+    load_priority = -50
+    start_priority = -50
+
+    def __init__(self, app, plugin):
+        super().__init__(app, plugin)
+        self.settings = app.settings.get("database", dict())
+        self.dsn = self.settings.get("dsn", None)
+        self.health_interval = self.settings.get("health_interval", 30.0)
+        self.channels = self.settings.get("listen_channels", ["table_changes"])
+        self.reconnect_max = self.settings.get("reconnect_max", 30.0)
+        self.pool: typing.Optional[asyncpg.Pool] = None
+        self.listen_connection: typing.Optional[asyncpg.Connection] = None
+        self.healthy = False
+        self.closing = False
+        self.reconnects = 0
+
+    def is_valid(self) -> bool:
+        return bool(self.dsn)
+
+    async def init_connection(self, conn: asyncpg.Connection):
+        for typename in ("json", "jsonb"):
+            await conn.set_type_codec(
+                typename,
+                encoder=lambda v: orjson.dumps(v).decode(),
+                decoder=orjson.loads,
+                schema="pg_catalog",
+            )
+
+    async def setup(self):
+        self.pool = await asyncpg.create_pool(
+            self.dsn,
+            min_size=self.settings.get("min_size", 2),
+            max_size=self.settings.get("max_size", 20),
+            max_inactive_connection_lifetime=self.settings.get(
+                "max_inactive_lifetime", 300.0
+            ),
+            statement_cache_size=self.settings.get("statement_cache_size", 1024),
+            command_timeout=self.settings.get("command_timeout", 60.0),
+            init=self.init_connection,
+        )
+        await self.check_health()
+        logger.info(
+            f"Database pool ready ({self.pool.get_size()} connections, healthy={self.healthy})."
+        )
+
+        metrics = self.app.metrics
+        metrics.gauge(
+            "muforge_db_pool_size", "Connections currently open in the pool."
+        ).set_function(lambda: self.pool.get_size())
+        metrics.gauge(
+            "muforge_db_pool_idle", "Idle connections in the pool."
+        ).set_function(lambda: self.pool.get_idle_size())
+        metrics.gauge(
+            "muforge_db_healthy", "1 if the last health check succeeded."
+        ).set_function(lambda: int(self.healthy))
+        metrics.gauge(
+            "muforge_db_listen_connected", "1 if the LISTEN connection is up."
+        ).set_function(lambda: int(self.listen_connection is not None))
+        metrics.gauge(
+            "muforge_db_listen_reconnects", "Times the LISTEN connection was re-established."
+        ).set_function(lambda: self.reconnects)
+
+    def connection(self, timeout: typing.Optional[float] = None):
+        """
+        Borrows a connection from the pool. Use as `async with db.connection() as conn:`.
+        """
+        return self.pool.acquire(timeout=timeout)
+
+    def transaction(self):
+        """
+        Borrows a connection and opens a transaction on it. Use as `async with db.transaction() as conn:`.
+        """
+        return _PoolTransaction(self.pool)
+
+    async def check_health(self) -> bool:
+        try:
+            async with self.pool.acquire(timeout=5.0) as conn:
+                await conn.fetchval("SELECT 1", timeout=5.0)
+        except (OSError, asyncpg.PostgresError, asyncpg.InterfaceError, TimeoutError) as e:
+            if self.healthy:
+                logger.error(f"Database health check failed: {e}")
+            self.healthy = False
+        else:
+            if not self.healthy:
+                logger.info("Database health check passed.")
+            self.healthy = True
+        return self.healthy
+
+    async def run_health_checks(self):
+        while not self.closing:
+            await asyncio.sleep(self.health_interval)
+            if not self.closing:
+                await self.check_health()
+
+    async def resync_listeners(self):
+        """
+        Notifications sent while the LISTEN connection was down are lost, so anything caching table data must
+        assume it is stale. Calls on_resync() on every listener that has one.
+        """
+        seen = set()
+        for listeners in list(muforge.LISTENERS_TABLE.values()):
+            for listener in listeners:
+                if id(listener) in seen:
+                    continue
+                seen.add(id(listener))
+                if on_resync := getattr(listener, "on_resync", None):
+                    try:
+                        await on_resync()
+                    except Exception as e:
+                        logger.error(f"Error resyncing listener {listener}: {e}")
+
+    async def run_listener(self):
+        delay = 0.5
+        connected_before = False
+        while not self.closing:
+            try:
+                conn = await asyncpg.connect(self.dsn, statement_cache_size=0)
+            except (OSError, asyncpg.PostgresError, TimeoutError) as e:
+                logger.warning(
+                    f"Could not open LISTEN connection: {e}. Retrying in {delay:.1f}s."
+                )
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.reconnect_max)
+                continue
+
+            lost = asyncio.Event()
+            conn.add_termination_listener(lambda _: lost.set())
+            try:
+                for channel in self.channels:
+                    await conn.add_listener(channel, self.app.handle_postgre_notification)
+                self.listen_connection = conn
+                delay = 0.5
+                logger.info(f"Listening for notifications on {', '.join(self.channels)}.")
+                if connected_before:
+                    self.reconnects += 1
+                    await self.resync_listeners()
+                connected_before = True
+                while not lost.is_set():
+                    try:
+                        await asyncio.wait_for(lost.wait(), self.health_interval)
+                    except TimeoutError:
+                        # Termination listeners only fire on a clean close, so probe for dead sockets.
+                        await conn.fetchval("SELECT 1", timeout=5.0)
+                if not self.closing:
+                    logger.warning("LISTEN connection closed.")
+            except (OSError, asyncpg.PostgresError, asyncpg.InterfaceError, TimeoutError) as e:
+                logger.warning(f"LISTEN connection lost: {e}")
+            finally:
+                self.listen_connection = None
+                conn.terminate()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.reconnect_max)
+
+    async def run(self):
+        async with asyncio.TaskGroup() as tg:
+            tg.create_task(self.run_listener())
+            tg.create_task(self.run_health_checks())
+
+    async def shutdown(self):
+        self.closing = True
+        if self.listen_connection is not None:
+            self.listen_connection.terminate()
+        if self.pool is not None:
+            try:
+                await asyncio.wait_for(self.pool.close(), 10.0)
+            except TimeoutError:
+                logger.warning("Timed out closing the database pool; terminating it.")
+                self.pool.terminate()
+
+
+class _PoolTransaction:
+    def __init__(self, pool: asyncpg.Pool):
+        self.pool = pool
+        self.conn = None
+        self.tx = None
+
+    async def __aenter__(self) -> asyncpg.Connection:
+        self.conn = await self.pool.acquire()
+        try:
+            self.tx = self.conn.transaction()
+            await self.tx.start()
+        except BaseException:
+            await self.pool.release(self.conn)
+            raise
+        return self.conn
+
+    async def __aexit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                await self.tx.commit()
+            else:
+                await self.tx.rollback()
+        finally:
+            await self.pool.release(self.conn)
@@ -0,0 +1,320 @@
+import asyncio
+import sys
+import typing
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+import muforge
+from muforge.application import Service
+
+_missing = object()
+
+Loader = typing.Callable[[typing.Any], typing.Awaitable[typing.Any]]
+
+
+def estimate_size(obj, depth: int = 3) -> int:
+    """
+    A rough estimate of the memory held by obj, following containers a few levels deep.
+    """
+    size = sys.getsizeof(obj)
+    if depth <= 0:
+        return size
+    if isinstance(obj, dict):
+        for k, v in obj.items():
+            size += estimate_size(k, depth - 1) + estimate_size(v, depth - 1)
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        for v in obj:
+            size += estimate_size(v, depth - 1)
+    elif hasattr(obj, "__dict__"):
+        size += estimate_size(obj.__dict__, depth - 1)
+    return size
+
+
+@dataclass(slots=True)
+class _Load:
+    future: asyncio.Future
+    # Set if the row changed while it was being loaded, so the result must not be cached.
+    stale: bool = False
+
+
+@dataclass(slots=True)
+class TableCache:
+    table: str
+    loader: Loader
+    max_entries: int
+    max_bytes: int
+    # id -> (value, size)
+    entries: OrderedDict = field(default_factory=OrderedDict)
+    bytes: int = 0
+    hits: int = 0
+    misses: int = 0
+    coalesced: int = 0
+    evictions: int = 0
+    invalidations: int = 0
+    # Prometheus counter children for hits, misses and evictions, set by EntityCache.bind_metrics.
+    counters: dict = field(default_factory=dict)
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def store(self, key: str, value):
+        self.discard(key)
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+        self.entries[key] = (value, size)
+        self.bytes += size
+        while len(self.entries) > self.max_entries or self.bytes > self.max_bytes:
+            _, (_, evicted) = self.entries.popitem(last=False)
+            self.bytes -= evicted
+            self.evictions += 1
+            if (counter := self.counters.get("evictions", None)) is not None:
+                counter.inc()
+
+    def discard(self, key: str) -> bool:
+        if (found := self.entries.pop(key, None)) is None:
+            return False
+        self.bytes -= found[1]
+        return True
+
+    def clear(self):
+        self.entries.clear()
+        self.bytes = 0
+
+
+class EntityCache(Service):
+    """
+    A read-through, in-process cache of database rows keyed by (table, id).
+
+        character = await self.app.entities.get("characters", character_id)
+
+    Each table has its own LRU bounded by entry count and estimated memory. Entries are invalidated by the
+    INSERT/UPDATE/DELETE notifications that arrive through muforge.LISTENERS_TABLE, and the whole cache is
+    dropped if the LISTEN connection had to reconnect. Concurrent misses on the same key share a single load.
+
+    Rows are loaded with `SELECT * FROM <table> WHERE id = $1` through the db service unless a table is
+    registered with its own loader. ids are compared as strings, matching the notification payloads.
+
+    Configured from GAME.entity_cache:
+        enabled (bool): Default true.
+        max_entries (int): Default per-table entry limit. Default 10000.
+        max_bytes (int): Default per-table memory limit. Default 32 MiB.
+        cache_missing (bool): Whether to cache lookups that found nothing. Default true.
+        tables (dict): {table: {max_entries, max_bytes}} per-table overrides.
+    """
+
+    load_priority = -30
+
+    def __init__(self, app, plugin):
+        super().__init__(app, plugin)
+        self.settings = app.settings.get("entity_cache", dict())
+        self.enabled = self.settings.get("enabled", True)
+        self.cache_missing = self.settings.get("cache_missing", True)
+        self.tables: dict[str, TableCache] = dict()
+        self.loading: dict[tuple[str, str], _Load] = dict()
+        self._metrics = dict()
+
+    def is_valid(self) -> bool:
+        return self.enabled
+
+    async def setup(self):
+        metrics = self.app.metrics
+        labels = ("table",)
+        self._metrics = {
+            "entries": metrics.gauge(
+                "muforge_entity_cache_entries", "Rows held in the entity cache.", labels
+            ),
+            "bytes": metrics.gauge(
+                "muforge_entity_cache_bytes",
+                "Estimated memory held by the entity cache.",
+                labels,
+            ),
+            "hit_ratio": metrics.gauge(
+                "muforge_entity_cache_hit_ratio", "Entity cache hit ratio.", labels
+            ),
+            "hits": metrics.counter(
+                "muforge_entity_cache_hits", "Entity cache hits.", labels
+            ),
+            "misses": metrics.counter(
+                "muforge_entity_cache_misses", "Entity cache misses.", labels
+            ),
+            "evictions": metrics.counter(
+                "muforge_entity_cache_evictions", "Rows evicted to stay in bounds.", labels
+            ),
+        }
+        for cache in self.tables.values():
+            self.bind_metrics(cache)
+
+    def register(
+        self,
+        table: str,
+        loader: typing.Optional[Loader] = None,
+        max_entries: typing.Optional[int] = None,
+        max_bytes: typing.Optional[int] = None,
+    ) -> TableCache:
+        """
+        Sets up caching for a table. Tables are registered with defaults on first use, so this is only needed
+        to supply a custom loader or limits.
+
+        Args:
+            table (str): The table name, as it appears in table-change notifications.
+            loader (callable): async loader(id) returning the entity or None.
+            max_entries (int): Maximum rows cached for this table.
+            max_bytes (int): Maximum estimated bytes cached for this table.
+        """
+        overrides = self.settings.get("tables", dict()).get(table, dict())
+        cache = TableCache(
+            table=table,
+            loader=loader or self.make_loader(table),
+            max_entries=max_entries
+            or overrides.get("max_entries", self.settings.get("max_entries", 10000)),
+            max_bytes=max_bytes
+            or overrides.get(
+                "max_bytes", self.settings.get("max_bytes", 32 * 1024 * 1024)
+            ),
+        )
+        if (old := self.tables.get(table, None)) is not None:
+            old.clear()
+        else:
+            muforge.LISTENERS_TABLE[table].append(self)
+        self.tables[table] = cache
+        self.bind_metrics(cache)
+        return cache
+
+    def bind_metrics(self, cache: TableCache):
+        for name, metric in self._metrics.items():
+            child = metric.labels(cache.table)
+            match name:
+                case "entries":
+                    child.set_function(lambda c=cache: len(c.entries))
+                case "hit_ratio":
+                    child.set_function(lambda c=cache: c.hit_ratio)
+                case "hits" | "misses" | "evictions":
+                    # Counted as they happen. The child outlives a re-registered table's cache, so the
+                    # series keeps rising; anything counted before metrics were set up is added once.
+                    child.inc(getattr(cache, name))
+                    cache.counters[name] = child
+                case _:
+                    child.set_function(lambda c=cache, n=name: getattr(c, n))
+
+    def make_loader(self, table: str) -> Loader:
+        quoted = table.replace('"', '""')
+        query = f'SELECT * FROM "{quoted}" WHERE id = $1'
+
+        async def loader(id):
+            async with self.app.db.connection() as conn:
+                row = await conn.fetchrow(query, id)
+            return dict(row) if row is not None else None
+
+        return loader
+
+    async def get(self, table: str, id, loader: typing.Optional[Loader] = None):
+        """
+        Returns the cached entity, loading it on a miss.
+
+        Args:
+            table (str): The table the entity lives in.
+            id: The entity's id.
+            loader (callable): Overrides the table's loader for this call.
+        """
+        cache = self.tables.get(table, None) or self.register(table)
+        key = str(id)
+        while True:
+            if (found := cache.entries.get(key, _missing)) is not _missing:
+                cache.entries.move_to_end(key)
+                cache.hits += 1
+                if (counter := cache.counters.get("hits", None)) is not None:
+                    counter.inc()
+                return found[0]
+
+            if (load := self.loading.get((table, key), None)) is not None:
+                cache.coalesced += 1
+                try:
+                    return await asyncio.shield(load.future)
+                except asyncio.CancelledError:
+                    if load.future.cancelled():
+                        # The caller doing the load was cancelled; try again.
+                        continue
+                    raise
+
+            cache.misses += 1
+            if (counter := cache.counters.get("misses", None)) is not None:
+                counter.inc()
+            load = _Load(asyncio.get_running_loop().create_future())
+            self.loading[(table, key)] = load
+            try:
+                value = await (loader or cache.loader)(id)
+            except asyncio.CancelledError:
+                load.future.cancel()
+                raise
+            except BaseException as e:
+                load.future.set_exception(e)
+                # Mark it retrieved; the exception is raised to this caller below.
+                load.future.exception()
+                raise
+            finally:
+                self.loading.pop((table, key), None)
+
+            if not load.stale and (value is not None or self.cache_missing):
+                cache.store(key, value)
+            load.future.set_result(value)
+            return value
+
+    def peek(self, table: str, id) -> typing.Any:
+        """
+        Returns the cached entity without loading it, or None.
+        """
+        if (cache := self.tables.get(table, None)) is None:
+            return None
+        found = cache.entries.get(str(id), None)
+        return found[0] if found else None
+
+    def invalidate(self, table: str, id):
+        if (cache := self.tables.get(table, None)) is None:
+            return
+        key = str(id)
+        if cache.discard(key):
+            cache.invalidations += 1
+        if (load := self.loading.get((table, key), None)) is not None:
+            load.stale = True
+
+    def clear(self, table: typing.Optional[str] = None):
+        for name, cache in self.tables.items():
+            if table is None or name == table:
+                cache.clear()
+        for (name, _), load in self.loading.items():
+            if table is None or name == table:
+                load.stale = True
+
+    def stats(self) -> dict[str, dict[str, typing.Any]]:
+        return {
+            name: {
+                "entries": len(c.entries),
+                "bytes": c.bytes,
+                "hits": c.hits,
+                "misses": c.misses,
+                "coalesced": c.coalesced,
+                "hit_ratio": c.hit_ratio,
+                "evictions": c.evictions,
+                "invalidations": c.invalidations,
+            }
+            for name, c in self.tables.items()
+        }
+
+    async def on_update(self, table: str, id):
+        self.invalidate(table, id)
+
+    async def on_insert(self, table: str, id):
+        self.invalidate(table, id)
+
+    async def on_delete(self, table: str, id):
+        self.invalidate(table, id)
+
+    async def on_batch(self, changes):
+        for change in changes:
+            self.invalidate(change.table, change.id)
+
+    async def on_resync(self):
+        self.clear()
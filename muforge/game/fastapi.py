@@ -1,23 +1,63 @@
-import typing
-import uuid
+import asyncio
 from pathlib import Path
 
 from fastapi import APIRouter, Depends, FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
+from fastapi.openapi.docs import get_redoc_html, get_swagger_ui_html
+from fastapi.responses import FileResponse, HTMLResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from hypercorn import Config
 from loguru import logger
-from starlette.middleware.gzip import GZipMiddleware
 from starlette.middleware.trustedhost import TrustedHostMiddleware
 from uvicorn.middleware.proxy_headers import ProxyHeadersMiddleware
 
 from muforge.utils.misc import callables_from_module, property_from_module
 
+from .caching import ResponseCache
+from .compression import AVAILABLE_ENCODINGS, CompressionMiddleware, CompressionPolicy
+from .middleware import MetricsMiddleware, RequestContextMiddleware
+from .openapi import OpenAPICache
+from .static import AssetCache, CachedStaticFiles
+
+
+def compression_policies(
+    parent, default: CompressionPolicy
+) -> dict[str, CompressionPolicy]:
+    """
+    Collects the compression options plugins announce for their routers, keyed by full route prefix.
+    """
+    policies = dict()
+    for p in parent.plugin_load_order:
+        for k, options in p.game_router_policies_v1().items():
+            match options.get("compression", True):
+                case True:
+                    continue
+                case False:
+                    policies[f"/v1/{k}"] = CompressionPolicy(enabled=False)
+                case dict() as overrides:
+                    policies[f"/v1/{k}"] = CompressionPolicy(
+                        minimum_size=overrides.get("minimum_size", default.minimum_size),
+                        stream=overrides.get("stream", default.stream),
+                    )
+    return policies
+
 
 async def assemble_fastapi(parent, config: Config):
-    app = FastAPI()
+    settings = parent.settings.get("webserver", dict())
+    # The schema and docs routes are added below, served from an OpenAPICache.
+    app = FastAPI(
+        title=parent.complete_settings["MUFORGE"]["name"],
+        openapi_url=None,
+        docs_url=None,
+        redoc_url=None,
+    )
     app.state.application = parent
+    cache_settings = settings.get("response_cache", dict())
+    app.state.response_cache = ResponseCache(
+        parent.metrics,
+        max_entries=cache_settings.get("max_entries", 10000),
+        max_bytes=cache_settings.get("max_bytes", 64 * 1024 * 1024),
+    )
 
     app.add_middleware(
         CORSMiddleware,
@@ -28,63 +68,109 @@ async def assemble_fastapi(parent, config: Config):
     )
 
     # Compression (not enabled by default in FastAPI).
-    app.add_middleware(GZipMiddleware, minimum_size=1024)
+    compression = settings.get("compression", dict())
+    if compression.get("enabled", True):
+        default_policy = CompressionPolicy(
+            minimum_size=compression.get("minimum_size", 1024),
+            stream=compression.get("stream", False),
+        )
+        app.add_middleware(
+            CompressionMiddleware,
+            registry=parent.metrics,
+            default=default_policy,
+            policies=compression_policies(parent, default_policy),
+            encodings=compression.get("encodings", AVAILABLE_ENCODINGS),
+            levels=compression.get("levels", None),
+            cpu_low=compression.get("cpu_low", 0.25),
+            cpu_high=compression.get("cpu_high", 0.75),
+        )
 
     # Proxy headers first so downstream sees real client info.
     app.add_middleware(ProxyHeadersMiddleware, trusted_hosts="127.0.0.1,10.0.0.0/8")
 
-    @app.middleware("http")
-    async def request_id_middleware(
-        request: Request,
-        call_next: typing.Callable[[Request], typing.Awaitable[Response]],
-    ) -> Response:
-        incoming = request.headers.get("X-Request-ID")
-        request_id = incoming or uuid.uuid4().hex
-        request.state.request_id = request_id
-        response = await call_next(request)
-        response.headers.setdefault("X-Request-ID", request_id)
-        return response
-
-    @app.middleware("http")
-    async def security_headers_middleware(
-        request: Request,
-        call_next: typing.Callable[[Request], typing.Awaitable[Response]],
-    ) -> Response:
-        response = await call_next(request)
-        # Add conservative defaults if not already set.
-        response.headers.setdefault("X-Content-Type-Options", "nosniff")
-        response.headers.setdefault(
-            "Referrer-Policy", "strict-origin-when-cross-origin"
-        )
-        response.headers.setdefault("X-Frame-Options", "DENY")
-        response.headers.setdefault(
-            "Permissions-Policy", "camera=(), microphone=(), geolocation=()"
+    # Request IDs and security headers, as a pure ASGI middleware so it never buffers streaming responses.
+    app.add_middleware(RequestContextMiddleware)
+
+    if settings.get("metrics", True):
+        # Added last so it is outermost and measures everything else.
+        app.add_middleware(MetricsMiddleware, registry=parent.metrics)
+
+        @app.get("/metrics", include_in_schema=False)
+        async def metrics():
+            return PlainTextResponse(
+                parent.metrics.render(), media_type="text/plain; version=0.0.4"
+            )
+
+    if settings.get("docs", parent.run_mode != "prod"):
+        cache_dir = settings.get(
+            "openapi_cache", "cache" if parent.run_mode == "prod" else None
         )
-        response.headers.setdefault(
-            "Strict-Transport-Security", "max-age=63072000; includeSubDomains"
+        openapi_cache = OpenAPICache(
+            app, parent, Path(cache_dir) if cache_dir else None
         )
-        return response
+        app.state.openapi_cache = openapi_cache
+
+        @app.get("/openapi.json", include_in_schema=False)
+        async def openapi_json():
+            return Response(await openapi_cache.get(), media_type="application/json")
+
+        @app.get("/docs", include_in_schema=False)
+        async def swagger_docs():
+            return get_swagger_ui_html(openapi_url="/openapi.json", title=app.title)
+
+        @app.get("/redoc", include_in_schema=False)
+        async def redoc_docs():
+            return get_redoc_html(openapi_url="/openapi.json", title=app.title)
 
     webdir = Path.cwd() / "webserver"
     static_dir = webdir / "static"
-    app.mount("/static", StaticFiles(directory=str(static_dir)), name="static")
+    cache_settings = settings.get("static_cache", dict())
+    asset_cache = AssetCache(
+        max_file_size=cache_settings.get("max_file_size", 16 * 1024 * 1024),
+        precompress=cache_settings.get("precompress", True),
+        min_compress_size=cache_settings.get("min_compress_size", 1024),
+    )
+    app.state.asset_cache = asset_cache
+    static_cache_control = cache_settings.get("cache_control", "no-cache")
+    static_cache_enabled = cache_settings.get("enabled", True)
+    if static_cache_enabled:
+        if static_dir.is_dir():
+            await asyncio.to_thread(asset_cache.warm, static_dir)
+        static_files = CachedStaticFiles(
+            directory=str(static_dir),
+            cache=asset_cache,
+            cache_control=static_cache_control,
+        )
+    else:
+        static_files = StaticFiles(directory=str(static_dir))
+    app.mount("/static", static_files, name="static")
 
-    def render_index() -> HTMLResponse:
+    async def render_index(request: Request) -> Response:
         index_path = webdir / "root" / "index.html"
-        if not index_path.exists():
+        if static_cache_enabled:
+            entry, st = await asset_cache.lookup(index_path)
+        else:
+            entry = None
+            try:
+                st = await asyncio.to_thread(index_path.stat)
+            except (FileNotFoundError, NotADirectoryError):
+                st = None
+        if st is None:
             return HTMLResponse(
                 "<h1>Muforge Web UI</h1><p>Put index.html in muforge/</p>",
                 status_code=404,
             )
-        return HTMLResponse(index_path.read_text(encoding="utf-8"))
+        if entry is not None and asset_cache.handles(request.headers):
+            return asset_cache.response(entry, request.headers)
+        return FileResponse(index_path, stat_result=st, media_type="text/html")
 
     @app.get("/", response_class=HTMLResponse)
-    async def root():
-        return render_index()
+    async def root(request: Request):
+        return await render_index(request)
 
     @app.get("/index.html", response_class=HTMLResponse)
-    async def index_html():
-        return render_index()
+    async def index_html(request: Request):
+        return await render_index(request)
 
     v1 = APIRouter()
     routers = dict()
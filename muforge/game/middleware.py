@@ -0,0 +1,133 @@
+import time
+import uuid
+
+from muforge.utils.metrics import SIZE_BUCKETS, MetricsRegistry
+
+
+# Conservative defaults, added to every response that doesn't already set them.
+SECURITY_HEADERS = (
+    (b"x-content-type-options", b"nosniff"),
+    (b"referrer-policy", b"strict-origin-when-cross-origin"),
+    (b"x-frame-options", b"DENY"),
+    (b"permissions-policy", b"camera=(), microphone=(), geolocation=()"),
+    (b"strict-transport-security", b"max-age=63072000; includeSubDomains"),
+)
+
+
+def route_template(scope) -> str:
+    """
+    Returns the path template of the route that handled a request, e.g. /v1/characters/{character_id}.
+    Raw paths are never used so that metric labels stay bounded. Only valid once routing has happened.
+    """
+    # Newer FastAPI resolves included routers lazily and records the effective (fully prefixed) route here,
+    # while scope["route"] holds the route as declared on the plugin's router.
+    fastapi_scope = scope.get("fastapi", None)
+    if fastapi_scope and (context := fastapi_scope.get("effective_route_context", None)):
+        if template := getattr(context, "path_format", None):
+            return template
+    if (route := scope.get("route", None)) is not None:
+        return getattr(route, "path_format", None) or getattr(route, "path", "")
+    if "app_root_path" in scope:
+        # A mounted sub-application, such as /static.
+        return f"{scope['root_path'][len(scope['app_root_path']):]}/{{path}}"
+    return "<unmatched>"
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording per-route request counts, status codes, latency, response sizes and the
+    number of requests in flight.
+    """
+
+    def __init__(self, app, registry: MetricsRegistry):
+        self.app = app
+        self.requests = registry.counter(
+            "muforge_http_requests",
+            "HTTP requests handled.",
+            ("method", "route", "status"),
+        )
+        self.latency = registry.histogram(
+            "muforge_http_request_duration_seconds",
+            "Time from receiving a request to sending the last byte of its response.",
+            ("method", "route"),
+        )
+        self.sizes = registry.histogram(
+            "muforge_http_response_size_bytes",
+            "Size of response bodies as sent.",
+            ("method", "route"),
+            buckets=SIZE_BUCKETS,
+        )
+        self.in_flight = registry.gauge(
+            "muforge_http_requests_in_flight", "HTTP requests currently being handled."
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        start = time.perf_counter()
+        self.in_flight.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.in_flight.dec()
+            method = scope["method"]
+            route = route_template(scope)
+            self.requests.labels(method, route, status).inc()
+            self.latency.labels(method, route).observe(time.perf_counter() - start)
+            self.sizes.labels(method, route).observe(size)
+
+
+class RequestContextMiddleware:
+    """
+    Pure ASGI middleware that gives each request an ID and adds default headers to its response.
+
+    The ID is taken from an incoming X-Request-ID header or generated, and stored on request.state.request_id.
+    It and the security headers are injected at http.response.start unless the response already sets them.
+    Unlike @app.middleware("http"), this never wraps the response body, so streaming and SSE responses pass
+    straight through.
+    """
+
+    def __init__(self, app, headers: tuple[tuple[bytes, bytes], ...] = SECURITY_HEADERS):
+        self.app = app
+        self.headers = tuple((k.lower(), v) for k, v in headers)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for k, v in scope["headers"]:
+            if k == b"x-request-id":
+                request_id = v
+                break
+        if not request_id:
+            request_id = uuid.uuid4().hex.encode("latin-1")
+        scope.setdefault("state", dict())["request_id"] = request_id.decode("latin-1")
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", ()))
+                present = {k.lower() for k, _ in headers}
+                if b"x-request-id" not in present:
+                    headers.append((b"x-request-id", request_id))
+                for k, v in self.headers:
+                    if k not in present:
+                        headers.append((k, v))
+                message["headers"] = headers
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,165 @@
+import asyncio
+import time
+import typing
+from dataclasses import dataclass
+
+from loguru import logger
+
+import muforge
+from muforge.application import Service
+
+
+@dataclass(slots=True, frozen=True)
+class TableChange:
+    table: str
+    id: typing.Any
+    # INSERT, UPDATE or DELETE
+    operation: str
+
+
+class NotificationDispatcher(Service):
+    """
+    Buffers table-change notifications and delivers them to listeners in batches.
+
+    Notifications are collected for a short window. A change that repeats the previous pending change for the
+    same row (same table, id and operation) is coalesced into it; anything else is kept, in arrival order, so
+    INSERT, DELETE, INSERT on one row is delivered as all three. Each batch is then split per listener (using
+    muforge.LISTENERS_TABLE) and listeners run concurrently, up to a bound. A listener that defines
+    on_batch(changes) receives its whole share of the batch in one call; otherwise its
+    on_update/on_insert/on_delete are awaited for each change, in order.
+
+    Configured from GAME.notifications:
+        enabled (bool): Default true. When disabled, notifications are dispatched one by one as they arrive.
+        window (float): Seconds to collect notifications before dispatching. Default 0.05.
+        max_batch (int): Dispatch before the window ends once this many distinct changes are pending.
+            Default 5000.
+        concurrency (int): Listeners running at once. Default 8.
+    """
+
+    load_priority = -40
+    start_priority = -40
+
+    def __init__(self, app, plugin):
+        super().__init__(app, plugin)
+        settings = app.settings.get("notifications", dict())
+        self.enabled = settings.get("enabled", True)
+        self.window = settings.get("window", 0.05)
+        self.max_batch = settings.get("max_batch", 5000)
+        self.concurrency = settings.get("concurrency", 8)
+        # (change, arrival time) in arrival order, so the first entry is always the oldest.
+        self.pending: list[tuple[TableChange, float]] = list()
+        # The most recent pending change for each (table, id), to coalesce back-to-back repeats.
+        self.latest: dict[tuple[str, typing.Any], TableChange] = dict()
+        self.wakeup = asyncio.Event()
+        self.full = asyncio.Event()
+        self.semaphore = asyncio.Semaphore(self.concurrency)
+        self.last_lag = 0.0
+
+    def is_valid(self) -> bool:
+        return self.enabled
+
+    async def setup(self):
+        metrics = self.app.metrics
+        self.received = metrics.counter(
+            "muforge_notifications_received", "Table-change notifications received."
+        )
+        self.coalesced = metrics.counter(
+            "muforge_notifications_coalesced",
+            "Notifications dropped as repeats of one already pending.",
+        )
+        self.batch_sizes = metrics.histogram(
+            "muforge_notifications_batch_size",
+            "Distinct changes per dispatched batch.",
+            buckets=(1, 10, 100, 1000, 10000),
+        )
+        self.listener_seconds = metrics.histogram(
+            "muforge_notifications_listener_seconds",
+            "Time a listener spent handling its share of a batch.",
+        )
+        metrics.gauge(
+            "muforge_notifications_queue_depth", "Distinct changes waiting for dispatch."
+        ).set_function(lambda: len(self.pending))
+        metrics.gauge(
+            "muforge_notifications_oldest_pending_seconds",
+            "Age of the oldest change waiting for dispatch.",
+        ).set_function(self.oldest_pending)
+        metrics.gauge(
+            "muforge_notifications_lag_seconds",
+            "Age of the oldest change in the most recently dispatched batch.",
+        ).set_function(lambda: self.last_lag)
+
+    def oldest_pending(self) -> float:
+        if not self.pending:
+            return 0.0
+        return time.monotonic() - self.pending[0][1]
+
+    def submit(self, change: TableChange):
+        self.received.inc()
+        row = (change.table, change.id)
+        if self.latest.get(row, None) == change:
+            self.coalesced.inc()
+            return
+        self.latest[row] = change
+        self.pending.append((change, time.monotonic()))
+        if len(self.pending) == 1:
+            self.wakeup.set()
+        if len(self.pending) >= self.max_batch:
+            self.full.set()
+
+    async def run(self):
+        while True:
+            await self.wakeup.wait()
+            try:
+                await asyncio.wait_for(self.full.wait(), self.window)
+            except TimeoutError:
+                pass
+            self.wakeup.clear()
+            self.full.clear()
+            batch = self.take()
+            if batch:
+                await self.dispatch(batch)
+
+    def take(self) -> list[tuple[TableChange, float]]:
+        batch, self.pending = self.pending, list()
+        self.latest.clear()
+        return batch
+
+    async def dispatch(self, batch: list[tuple[TableChange, float]]):
+        self.last_lag = time.monotonic() - batch[0][1]
+        self.batch_sizes.observe(len(batch))
+        shares: dict[int, tuple[typing.Any, list[TableChange]]] = dict()
+        for change, _arrived in batch:
+            for listener in muforge.LISTENERS_TABLE.get(change.table, ()):
+                shares.setdefault(id(listener), (listener, list()))[1].append(change)
+        async with asyncio.TaskGroup() as tg:
+            for listener, changes in shares.values():
+                tg.create_task(self.deliver(listener, changes))
+
+    async def deliver(self, listener, changes: list[TableChange]):
+        async with self.semaphore:
+            started = time.perf_counter()
+            try:
+                if on_batch := getattr(listener, "on_batch", None):
+                    await on_batch(changes)
+                else:
+                    for change in changes:
+                        await dispatch_change(listener, change)
+            except Exception as e:
+                logger.error(f"Listener {listener} failed handling table changes: {e}")
+            finally:
+                self.listener_seconds.observe(time.perf_counter() - started)
+
+    async def shutdown(self):
+        # Deliver whatever is still buffered.
+        if self.pending:
+            await self.dispatch(self.take())
+
+
+async def dispatch_change(listener, change: TableChange):
+    match change.operation:
+        case "UPDATE":
+            await listener.on_update(change.table, change.id)
+        case "INSERT":
+            await listener.on_insert(change.table, change.id)
+        case "DELETE":
+            await listener.on_delete(change.table, change.id)
@@ -0,0 +1,75 @@
+import asyncio
+import hashlib
+import importlib.metadata
+import json
+import typing
+from pathlib import Path
+
+from fastapi import FastAPI
+from loguru import logger
+
+
+def schema_key(parent) -> str:
+    """
+    A short hash identifying the set of loaded plugins and their versions, plus the MuForge version.
+    The OpenAPI schema is assumed to only change when one of these does.
+    """
+    try:
+        muforge_version = importlib.metadata.version("muforge")
+    except importlib.metadata.PackageNotFoundError:
+        muforge_version = "unknown"
+    parts = [f"muforge={muforge_version}"]
+    parts.extend(f"{p.slug()}={p.version()}" for p in parent.plugin_load_order)
+    return hashlib.sha256("\n".join(parts).encode()).hexdigest()[:16]
+
+
+class OpenAPICache:
+    """
+    Holds the serialized OpenAPI schema for the game's FastAPI app.
+
+    The schema is generated lazily, off the event loop, the first time it is needed: either by warm() in the
+    background after startup, or by the first request for it. When a cache directory is given, the result is
+    also written to disk keyed by schema_key(), and later startups with the same plugin versions load it
+    instead of generating it.
+    """
+
+    def __init__(self, app: FastAPI, parent, directory: typing.Optional[Path] = None):
+        self.app = app
+        self.key = schema_key(parent)
+        self.path = directory / f"openapi-{self.key}.json" if directory else None
+        self.body: typing.Optional[bytes] = None
+        self._lock = asyncio.Lock()
+
+    def load(self) -> bool:
+        if self.path is None or not self.path.exists():
+            return False
+        self.body = self.path.read_bytes()
+        logger.info(f"Loaded OpenAPI schema from {self.path}.")
+        return True
+
+    def build(self) -> bytes:
+        body = json.dumps(self.app.openapi(), separators=(",", ":")).encode()
+        if self.path is not None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            temp = self.path.with_suffix(".tmp")
+            temp.write_bytes(body)
+            temp.replace(self.path)
+            logger.info(f"Saved OpenAPI schema to {self.path}.")
+        return body
+
+    async def get(self) -> bytes:
+        if self.body is None:
+            async with self._lock:
+                if self.body is None and not await asyncio.to_thread(self.load):
+                    self.body = await asyncio.to_thread(self.build)
+        return self.body
+
+    async def warm(self):
+        """
+        Builds or loads the schema in the background. Failures are logged, not raised, so they can't take down
+        the application's TaskGroup.
+        """
+        try:
+            await self.get()
+        except Exception as e:
+            logger.error(f"Failed to build OpenAPI schema: {e}")
@@ -0,0 +1,260 @@
+import asyncio
+import gzip
+import hashlib
+import mimetypes
+import os
+import stat
+import typing
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from fastapi import Response
+from fastapi.staticfiles import StaticFiles
+from loguru import logger
+from starlette.datastructures import Headers
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Encodings we can serve, in order of preference, with the suffix of their precompressed files on disk.
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/javascript",
+    "application/json",
+    "application/xml",
+    "application/wasm",
+    "image/svg+xml",
+)
+
+
+def is_compressible(media_type: str) -> bool:
+    return media_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def parse_accept_encoding(value: str) -> dict[str, float]:
+    """
+    Parses an Accept-Encoding header into {coding: q}.
+    """
+    out = dict()
+    for part in value.split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        out[coding.strip().lower()] = q
+    return out
+
+
+@dataclass(slots=True)
+class CachedAsset:
+    path: Path
+    mtime_ns: int
+    size: int
+    media_type: str
+    body: bytes
+    etag: str
+    # encoding -> compressed body
+    variants: dict[str, bytes] = field(default_factory=dict)
+
+    def etag_for(self, encoding: typing.Optional[str]) -> str:
+        # Each representation gets its own strong ETag.
+        return f'"{self.etag}-{encoding}"' if encoding else f'"{self.etag}"'
+
+
+class AssetCache:
+    """
+    An in-memory cache of files served by the webserver.
+
+    Entries are validated against the file's mtime and size on every lookup, so edits on disk are picked up
+    without a restart. A changed file is reloaded in a worker thread; until that finishes, peek() and lookup()
+    report a miss so the caller serves the file from disk. Compressed variants come from .br/.gz files next to
+    the original (generated at build time) or are generated when the file is loaded.
+    """
+
+    def __init__(
+        self,
+        max_file_size: int = 16 * 1024 * 1024,
+        precompress: bool = True,
+        min_compress_size: int = 1024,
+    ):
+        self.max_file_size = max_file_size
+        self.precompress = precompress
+        self.min_compress_size = min_compress_size
+        self.entries: dict[Path, CachedAsset] = dict()
+        # Reloads running in worker threads, by path.
+        self.reloading: dict[Path, asyncio.Task] = dict()
+
+    @staticmethod
+    def handles(headers: Headers) -> bool:
+        """
+        Whether a request can be answered from the cache. Range requests and If-Modified-Since (without an
+        If-None-Match, which takes precedence) are left to Starlette's FileResponse.
+        """
+        if "range" in headers:
+            return False
+        return "if-modified-since" not in headers or "if-none-match" in headers
+
+    def cacheable(self, st: os.stat_result) -> bool:
+        return stat.S_ISREG(st.st_mode) and st.st_size <= self.max_file_size
+
+    def peek(self, path: Path, st: os.stat_result) -> typing.Optional[CachedAsset]:
+        """
+        Returns the cached asset for path if it is current for st, without blocking. If it is missing or stale,
+        starts reloading it in a worker thread and returns None. Must be called from the event loop.
+        """
+        entry = self.entries.get(path, None)
+        if entry and entry.mtime_ns == st.st_mtime_ns and entry.size == st.st_size:
+            return entry
+        if self.cacheable(st) and path not in self.reloading:
+            task = asyncio.get_running_loop().create_task(asyncio.to_thread(self.get, path))
+            self.reloading[path] = task
+            task.add_done_callback(lambda t: self.reloaded(path, t))
+        return None
+
+    def reloaded(self, path: Path, task: asyncio.Task):
+        self.reloading.pop(path, None)
+        if not task.cancelled() and (e := task.exception()) is not None:
+            logger.error(f"Error caching static asset {path}: {e}")
+
+    async def lookup(
+        self, path: Path
+    ) -> tuple[typing.Optional[CachedAsset], typing.Optional[os.stat_result]]:
+        """
+        Stats path in a worker thread, then peek()s it.
+
+        Returns:
+            (entry or None, stat result or None if the file doesn't exist)
+        """
+        try:
+            st = await asyncio.to_thread(path.stat)
+        except (FileNotFoundError, NotADirectoryError):
+            self.entries.pop(path, None)
+            return None, None
+        return self.peek(path, st), st
+
+    def get(self, path: Path) -> typing.Optional[CachedAsset]:
+        """
+        Returns the cached asset for path, (re)loading it if it changed. Returns None if the file doesn't exist
+        or is too large to cache. This reads and compresses files, so call it from a worker thread.
+        """
+        try:
+            st = path.stat()
+        except (FileNotFoundError, NotADirectoryError):
+            self.entries.pop(path, None)
+            return None
+        if not self.cacheable(st):
+            return None
+        entry = self.entries.get(path, None)
+        if entry and entry.mtime_ns == st.st_mtime_ns and entry.size == st.st_size:
+            return entry
+        entry = self.load(path, st)
+        self.entries[path] = entry
+        return entry
+
+    def load(self, path: Path, st: os.stat_result) -> CachedAsset:
+        body = path.read_bytes()
+        media_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+        entry = CachedAsset(
+            path=path,
+            mtime_ns=st.st_mtime_ns,
+            size=st.st_size,
+            media_type=media_type,
+            body=body,
+            etag=hashlib.blake2b(body, digest_size=16).hexdigest(),
+        )
+        for encoding, suffix in ENCODINGS:
+            sibling = path.with_name(f"{path.name}{suffix}")
+            try:
+                if sibling.stat().st_mtime_ns >= st.st_mtime_ns:
+                    entry.variants[encoding] = sibling.read_bytes()
+            except FileNotFoundError:
+                pass
+        if (
+            self.precompress
+            and is_compressible(media_type)
+            and len(body) >= self.min_compress_size
+        ):
+            if "gzip" not in entry.variants:
+                entry.variants["gzip"] = gzip.compress(body, compresslevel=9, mtime=0)
+            if brotli is not None and "br" not in entry.variants:
+                entry.variants["br"] = brotli.compress(body)
+        # Only keep variants that are actually smaller.
+        entry.variants = {k: v for k, v in entry.variants.items() if len(v) < len(body)}
+        return entry
+
+    def warm(self, directory: Path):
+        """
+        Loads (and compresses) every file under directory. Meant to be run at startup, off the event loop.
+        """
+        suffixes = tuple(suffix for _, suffix in ENCODINGS)
+        count = 0
+        for root, _, files in os.walk(directory):
+            for name in files:
+                if name.endswith(suffixes):
+                    continue
+                if self.get(Path(root) / name) is not None:
+                    count += 1
+        logger.info(f"Cached {count} static assets from {directory}.")
+
+    def response(
+        self, entry: CachedAsset, headers: Headers, cache_control: str = "no-cache"
+    ) -> Response:
+        """
+        Builds the response for a cached asset, negotiating a precompressed variant and answering 304 when the
+        client's If-None-Match already matches.
+        """
+        accepted = parse_accept_encoding(headers.get("accept-encoding", ""))
+        encoding = None
+        for name, _ in ENCODINGS:
+            if name in entry.variants and accepted.get(name, 0.0) > 0.0:
+                encoding = name
+                break
+        etag = entry.etag_for(encoding)
+        out_headers = {
+            "ETag": etag,
+            "Cache-Control": cache_control,
+            "Vary": "Accept-Encoding",
+        }
+        if if_none_match := headers.get("if-none-match", None):
+            tags = {t.strip() for t in if_none_match.split(",")}
+            if etag in tags or "*" in tags:
+                return Response(status_code=304, headers=out_headers)
+        if encoding:
+            out_headers["Content-Encoding"] = encoding
+            body = entry.variants[encoding]
+        else:
+            body = entry.body
+        return Response(body, media_type=entry.media_type, headers=out_headers)
+
+
+class CachedStaticFiles(StaticFiles):
+    """
+    StaticFiles that serves regular files from an AssetCache, falling back to StaticFiles' own streaming
+    responses for anything the cache won't hold, hasn't loaded yet, or can't answer (see AssetCache.handles).
+
+    Only file_response is overridden, so path lookup keeps StaticFiles' worker thread and error handling.
+    """
+
+    def __init__(self, *args, cache: AssetCache, cache_control: str = "no-cache", **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache = cache
+        self.cache_control = cache_control
+
+    def file_response(
+        self, full_path, stat_result: os.stat_result, scope, status_code: int = 200
+    ) -> Response:
+        headers = Headers(scope=scope)
+        if status_code == 200 and self.cache.handles(headers):
+            if (entry := self.cache.peek(Path(full_path), stat_result)) is not None:
+                return self.cache.response(entry, headers, self.cache_control)
+        return super().file_response(full_path, stat_result, scope, status_code)
@@ -0,0 +1,360 @@
+import asyncio
+import os
+import time
+import typing
+from pathlib import Path
+
+import asyncpg
+import orjson
+from loguru import logger
+
+from muforge.application import Service
+from muforge.utils.misc import utcnow
+
+# Server errors that say nothing about the row being written, so the row may succeed if retried later.
+TRANSIENT_ERRORS = (
+    asyncpg.exceptions.PostgresConnectionError,
+    asyncpg.exceptions.InsufficientResourcesError,
+    asyncpg.exceptions.OperatorInterventionError,
+    asyncpg.exceptions.TransactionRollbackError,
+)
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def is_data_error(e: Exception) -> bool:
+    """
+    Whether e was caused by the statement or its values (a missing column, a bad value, a violated
+    constraint), so that retrying the same row can never succeed. Connection and resource errors are not.
+    """
+    return isinstance(e, asyncpg.PostgresError) and not isinstance(e, TRANSIENT_ERRORS)
+
+
+class WriteBehindService(Service):
+    """
+    Buffers small, frequent row updates in memory and writes them to the database in batches.
+
+        self.app.writes.mark("characters", character_id, hp=hp, last_seen=now)
+
+    Repeated marks of the same row are merged, later values winning, so a row updated many times between
+    flushes costs one UPDATE. Pending rows are written on an interval, as soon as max_pending rows are dirty,
+    and on shutdown. Each flush groups rows updating the same set of columns into one executemany inside a
+    single transaction. If a flush fails because the database is unreachable or busy, its rows are put back
+    (behind anything marked since) and retried. If it fails because of the data, each group is retried in its
+    own transaction and then each row in a group that still fails; rows that fail on their own are appended
+    to the dead-letter file with the error and logged, so one bad row or column can't stop all persistence.
+
+    Only UPDATEs of existing rows are buffered. Anything that must be visible to other queries immediately, or
+    that inserts or deletes rows, should still be written directly.
+
+    With a journal path configured, every mark is also appended to a local JSON-lines journal before it is
+    buffered. The journal is rotated at the start of each flush, and older segments are deleted once a flush
+    commits; segments left behind by a crash are replayed on the next startup. Journaled ids and values must
+    survive an orjson round trip, so datetimes and the like come back as strings and rely on Postgres to cast
+    them.
+
+    Configured from GAME.write_behind:
+        enabled (bool): Default true.
+        interval (float): Seconds between flushes. Default 1.0.
+        max_pending (int): Flush early once this many rows are dirty. Default 1000.
+        key (str): The primary key column. Default "id".
+        journal (str): Path of the crash-safety journal. Default none (disabled).
+        fsync (bool): fsync the journal after every mark. Default false.
+        dead_letter (str): JSON-lines file for rows that could not be written. Default
+            "<journal>.dead" if a journal is configured, else "logs/write_behind.dead".
+    """
+
+    load_priority = -45
+    start_priority = -45
+
+    def __init__(self, app, plugin):
+        super().__init__(app, plugin)
+        settings = app.settings.get("write_behind", dict())
+        self.enabled = settings.get("enabled", True)
+        self.interval = settings.get("interval", 1.0)
+        self.max_pending = settings.get("max_pending", 1000)
+        self.key = settings.get("key", "id")
+        self.fsync = settings.get("fsync", False)
+        journal = settings.get("journal", None)
+        self.journal_path = Path(journal) if journal else None
+        dead_letter = settings.get("dead_letter", f"{journal}.dead" if journal else None)
+        self.dead_letter_path = Path(dead_letter or "logs/write_behind.dead")
+        self.journal = None
+        self.segment = 0
+        # Segments whose rows have not been committed yet.
+        self.retired: list[Path] = list()
+        # (table, id) -> {column: value}
+        self.dirty: dict[tuple[str, typing.Any], dict[str, typing.Any]] = dict()
+        self.wakeup = asyncio.Event()
+        self.lock = asyncio.Lock()
+        self.closing = False
+
+    def is_valid(self) -> bool:
+        return self.enabled and self.app.db is not None
+
+    async def setup(self):
+        metrics = self.app.metrics
+        self.marks = metrics.counter(
+            "muforge_write_behind_marks", "Row updates buffered for write-behind."
+        )
+        self.merged = metrics.counter(
+            "muforge_write_behind_merged",
+            "Buffered row updates merged into one already pending.",
+        )
+        self.rows_written = metrics.counter(
+            "muforge_write_behind_rows", "Rows written by write-behind flushes."
+        )
+        self.statements = metrics.counter(
+            "muforge_write_behind_statements",
+            "Batched UPDATE statements executed by write-behind flushes.",
+        )
+        self.failures = metrics.counter(
+            "muforge_write_behind_failures", "Write-behind flushes that failed."
+        )
+        self.dead_letters = metrics.counter(
+            "muforge_write_behind_dead_letters",
+            "Rows that failed on their own and were moved to the dead-letter file.",
+        )
+        self.flush_seconds = metrics.histogram(
+            "muforge_write_behind_flush_seconds", "Time spent in a write-behind flush."
+        )
+        metrics.gauge(
+            "muforge_write_behind_pending", "Rows waiting to be written."
+        ).set_function(lambda: len(self.dirty))
+
+        if self.journal_path is not None:
+            self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+            await self.replay()
+            self.open_journal()
+
+    def journal_segments(self) -> list[Path]:
+        segments = self.journal_path.parent.glob(f"{self.journal_path.name}.*")
+        found = list()
+        for path in segments:
+            if path.suffix[1:].isdigit():
+                found.append(path)
+        return sorted(found, key=lambda p: int(p.suffix[1:]))
+
+    async def replay(self):
+        """
+        Re-applies journal segments left behind by an unclean shutdown, then deletes them. Rows that fail
+        because of their data are dead-lettered as in any flush; startup only fails if the database can't be
+        written at all.
+        """
+        if not (segments := self.journal_segments()):
+            return
+        count = 0
+        for path in segments:
+            for line in path.read_bytes().splitlines():
+                try:
+                    entry = orjson.loads(line)
+                except orjson.JSONDecodeError:
+                    # A torn final line from a crash mid-write.
+                    logger.warning(f"Skipping corrupt write-behind journal line in {path}.")
+                    continue
+                self.merge(entry["t"], entry["i"], entry["f"])
+                count += 1
+        logger.info(
+            f"Replaying {count} journaled writes ({len(self.dirty)} rows) from {len(segments)} segment(s)."
+        )
+        await self.flush()
+        if self.dirty:
+            raise RuntimeError("Could not apply the write-behind journal.")
+        for path in segments:
+            path.unlink()
+        self.segment = int(segments[-1].suffix[1:])
+
+    def open_journal(self):
+        self.segment += 1
+        path = self.journal_path.with_name(f"{self.journal_path.name}.{self.segment}")
+        self.journal = open(path, "ab", buffering=0)
+
+    def rotate_journal(self):
+        """
+        Starts a new journal segment. The previous one is kept until a flush commits its rows.
+        """
+        if self.journal is None:
+            return
+        self.retired.append(Path(self.journal.name))
+        self.journal.close()
+        self.open_journal()
+
+    def merge(self, table: str, id, fields: dict[str, typing.Any]):
+        if (pending := self.dirty.get((table, id), None)) is not None:
+            pending.update(fields)
+            return True
+        self.dirty[(table, id)] = dict(fields)
+        return False
+
+    def mark(self, table: str, id, **fields):
+        """
+        Buffers an update of the given columns of one row.
+
+        Args:
+            table (str): The table to update.
+            id: The row's primary key.
+            **fields: Column values to set.
+        """
+        if not fields:
+            return
+        if self.closing:
+            raise RuntimeError("Write-behind is shutting down; write directly instead.")
+        if self.journal is not None:
+            self.journal.write(
+                orjson.dumps({"t": table, "i": id, "f": fields}) + b"\n"
+            )
+            if self.fsync:
+                os.fsync(self.journal.fileno())
+        self.marks.inc()
+        if self.merge(table, id, fields):
+            self.merged.inc()
+        if len(self.dirty) >= self.max_pending:
+            self.wakeup.set()
+
+    def dead_letter(self, table: str, id, fields: dict[str, typing.Any], error: Exception):
+        logger.error(
+            f"Write-behind could not write {table} row {id}, moving it to {self.dead_letter_path}: {error}"
+        )
+        self.dead_letters.inc()
+        entry = {
+            "t": table,
+            "i": id,
+            "f": fields,
+            "error": f"{type(error).__name__}: {error}",
+            "at": utcnow(),
+        }
+        self.dead_letter_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.dead_letter_path, "ab") as f:
+            f.write(orjson.dumps(entry, default=str) + b"\n")
+
+    def statement(self, table: str, columns: tuple[str, ...]) -> str:
+        assignments = ", ".join(f"{_quote(c)} = ${i}" for i, c in enumerate(columns, 2))
+        return f"UPDATE {_quote(table)} SET {assignments} WHERE {_quote(self.key)} = $1"
+
+    async def salvage(
+        self,
+        batch: dict[tuple[str, typing.Any], dict[str, typing.Any]],
+        groups: dict[tuple[str, tuple[str, ...]], list[tuple]],
+    ) -> tuple[int, dict[tuple[str, typing.Any], dict[str, typing.Any]]]:
+        """
+        Retries a batch that failed on its data, group by group, then row by row within failing groups. Rows
+        that fail on their own because of their data are dead-lettered.
+
+        Returns:
+            (rows written, rows to requeue after transient errors)
+        """
+        written = 0
+        requeue = dict()
+        for (table, columns), rows in groups.items():
+            sql = self.statement(table, columns)
+            try:
+                async with self.app.db.transaction() as conn:
+                    await conn.executemany(sql, rows)
+            except Exception as e:
+                if not is_data_error(e):
+                    for row in rows:
+                        requeue[(table, row[0])] = batch[(table, row[0])]
+                    continue
+            else:
+                written += len(rows)
+                continue
+            for row in rows:
+                key = (table, row[0])
+                try:
+                    async with self.app.db.transaction() as conn:
+                        await conn.execute(sql, *row)
+                except Exception as e:
+                    if is_data_error(e):
+                        self.dead_letter(table, row[0], batch[key], e)
+                    else:
+                        requeue[key] = batch[key]
+                else:
+                    written += 1
+        return written, requeue
+
+    def pending(self, table: str, id) -> typing.Optional[dict[str, typing.Any]]:
+        """
+        Returns the not-yet-written column values for a row, if any.
+        """
+        return self.dirty.get((table, id), None)
+
+    async def flush(self) -> int:
+        """
+        Writes every pending row. Returns the number of rows written.
+        """
+        async with self.lock:
+            if not self.dirty:
+                return 0
+            batch, self.dirty = self.dirty, dict()
+            self.rotate_journal()
+
+            # Group rows that set the same columns so each group is one prepared statement.
+            groups: dict[tuple[str, tuple[str, ...]], list[tuple]] = dict()
+            for (table, id), fields in batch.items():
+                columns = tuple(sorted(fields))
+                groups.setdefault((table, columns), list()).append(
+                    (id, *(fields[c] for c in columns))
+                )
+
+            started = time.perf_counter()
+            requeue = dict()
+            try:
+                async with self.app.db.transaction() as conn:
+                    for (table, columns), rows in groups.items():
+                        await conn.executemany(self.statement(table, columns), rows)
+                written = len(batch)
+            except Exception as e:
+                self.failures.inc()
+                logger.error(f"Write-behind flush of {len(batch)} rows failed: {e}")
+                if is_data_error(e):
+                    written, requeue = await self.salvage(batch, groups)
+                else:
+                    written, requeue = 0, batch
+            finally:
+                self.flush_seconds.observe(time.perf_counter() - started)
+
+            if requeue:
+                # Put the rows back without clobbering anything marked during the flush. Their journal
+                # segments stay until a later flush commits them.
+                for key, fields in self.dirty.items():
+                    if key in requeue:
+                        requeue[key].update(fields)
+                    else:
+                        requeue[key] = fields
+                self.dirty = requeue
+            else:
+                for path in self.retired:
+                    path.unlink(missing_ok=True)
+                self.retired.clear()
+            self.rows_written.inc(written)
+            self.statements.inc(len(groups))
+            return written
+
+    async def run(self):
+        while not self.closing:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), self.interval)
+            except TimeoutError:
+                pass
+            self.wakeup.clear()
+            await self.flush()
+
+    async def shutdown(self):
+        self.closing = True
+        await self.flush()
+        if self.dirty:
+            logger.error(
+                f"{len(self.dirty)} rows could not be written on shutdown"
+                + (
+                    "; they remain in the journal."
+                    if self.journal is not None
+                    else " and are lost."
+                )
+            )
+        if self.journal is not None:
+            empty = self.journal.tell() == 0
+            self.journal.close()
+            if empty:
+                Path(self.journal.name).unlink(missing_ok=True)
@@ -51,6 +51,16 @@ class BasePlugin:
         """
         return dict()
 
+    def game_router_policies_v1(self) -> dict[str, dict[str, typing.Any]]:
+        """
+        Announces per-router options for this plugin's routers.
+        The dictionary is in [prefix, options] format, using the same prefixes as game_routers_v1.
+        Supported options:
+            compression: False to never compress the router's responses, or a dict of CompressionPolicy
+                fields (minimum_size, stream) to override the defaults.
+        """
+        return dict()
+
     def game_static(self) -> str | None:
         """
         used by FastAPI's StaticFiles to serve static files for the game server.
@@ -1,5 +1,8 @@
 from muforge.application import BaseApplication
 
+from .idle import IdleService
+from .registry import ConnectionRegistry
+
 
 class Application(BaseApplication):
     name = "portal"
@@ -7,6 +10,26 @@ class Application(BaseApplication):
     def __init__(self, settings):
         super().__init__(settings)
         self.parsers: dict[str, type] = dict()
+        rendering = self.settings.get("rendering", dict())
+        # Rich output above these sizes is rendered in a worker thread. See BaseConnection.send_rich.
+        self.render_offload = rendering.get("offload", True)
+        self.render_table_rows = rendering.get("table_rows", 50)
+        self.render_text_length = rendering.get("text_length", 4000)
+        self.render_seconds = self.metrics.histogram(
+            "muforge_portal_render_seconds",
+            "Time spent rendering Rich output, by where it was rendered.",
+            ("mode",),
+        )
+
+    @property
+    def connections(self) -> ConnectionRegistry:
+        return self.services.get("connections", None)
+
+    def core_services(self) -> dict[str, type]:
+        services = super().core_services()
+        services["connections"] = ConnectionRegistry
+        services["idle"] = IdleService
+        return services
 
     async def setup_parsers(self):
         for p in self.plugin_load_order:
@@ -14,4 +37,5 @@ class Application(BaseApplication):
 
     async def setup(self):
         await super().setup()
-        await self.setup_parsers()
+        with self.timeline.phase("parsers"):
+            await self.setup_parsers()
@@ -5,7 +5,7 @@ import typing
 from dataclasses import dataclass, field
 from datetime import datetime
 
-from httpx import AsyncClient, HTTPStatusError, Limits
+from httpx import AsyncClient, HTTPStatusError, Limits, ReadError, StreamClosed
 from httpx_sse import aconnect_sse
 from loguru import logger
 from rich.box import ASCII2
@@ -13,6 +13,9 @@ from rich.console import Console
 from rich.errors import MarkupError
 from rich.markup import escape
 from rich.table import Table
+from rich.text import Text
+
+from muforge.utils.aio import SlimEvent
 
 from .link import (
     ConnectionLink,
@@ -24,29 +27,91 @@ from .link import (
 _re_event = re.compile(r"event: (.+)\ndata: (.+)\n\n", re.MULTILINE)
 
 
+class _NullFile:
+    """
+    A file for Consoles that only record; output is collected with export_text().
+    """
+
+    def write(self, data):
+        pass
+
+    def flush(self):
+        pass
+
+
+def print_kwargs(kwargs: dict) -> dict:
+    new_kwargs = {"highlight": False}
+    new_kwargs.update(kwargs)
+    new_kwargs["end"] = "\r\n"
+    new_kwargs["crop"] = False
+    return new_kwargs
+
+
+def render_rich(options: dict, args: tuple, kwargs: dict) -> str:
+    """
+    Renders Rich output on a throwaway Console built from a snapshot of a connection's console settings.
+    Safe to call from a worker thread, since it touches nothing the connection owns.
+    """
+    console = Console(
+        color_system="standard",
+        file=_NullFile(),
+        record=True,
+        width=options["width"],
+        height=options["height"],
+        emoji=options["emoji"],
+    )
+    console._color_system = options["color_system"]
+    console.print(*args, **print_kwargs(kwargs))
+    return console.export_text(clear=True, styles=True)
+
+
 class BaseConnection:
     """
     This represents a single player connection, mapping a protocol like telnet to an HTTPX client connection.
+
+    A portal holds one of these per player, so it is kept small: attributes are slotted, and the Rich console
+    and HTTP client are only created when first used. benchmarks/portal_scale.py measures the cost.
     """
 
+    __slots__ = (
+        "service",
+        "link",
+        "task_group",
+        "_console",
+        "parser_stack",
+        "_client",
+        "streams",
+        "hibernating",
+        "last_active_at",
+        "shutdown_event",
+        "shutdown_cause",
+        "output_lock",
+        "hibernate_lock",
+        "account_id",
+        "character_id",
+        "__weakref__",
+    )
+
     def __init__(self, service, link: ConnectionLink):
         self.service = service
         self.link = link
         self.task_group = None
-        self.console = Console(
-            color_system="standard",
-            file=self,
-            record=True,
-            width=self.link.info.width,
-            height=self.link.info.height,
-            emoji=False,
-        )
-        self.console._color_system = self.link.info.color
+        self._console = None
         self.parser_stack = list()
-        self.client = None
+        self._client = None
+        # Open SSE responses from api_stream(), closed when the connection hibernates. Created on first use.
+        self.streams: typing.Optional[set] = None
+        self.hibernating = False
         self.last_active_at = datetime.now()
-        self.shutdown_event = asyncio.Event()
+        self.shutdown_event = SlimEvent()
         self.shutdown_cause = None
+        # Held while output is rendered and queued, so messages leave in the order they were sent.
+        self.output_lock = asyncio.Lock()
+        # Serializes hibernate() and wake(), so input arriving mid-hibernation wakes the connection only after
+        # hibernation has finished closing things.
+        self.hibernate_lock = asyncio.Lock()
+        self.account_id = None
+        self.character_id = None
 
     @property
     def plugin(self):
@@ -56,6 +121,42 @@ class BaseConnection:
     def app(self):
         return self.service.app
 
+    @property
+    def console(self) -> Console:
+        """
+        The connection's Rich console, created on first use and dropped while hibernating.
+        """
+        if self._console is None:
+            info = self.link.info
+            console = Console(
+                color_system="standard",
+                file=self,
+                record=True,
+                width=info.width,
+                height=info.height,
+                emoji=False,
+            )
+            console._color_system = info.color
+            self._console = console
+        return self._console
+
+    @property
+    def client(self) -> AsyncClient:
+        """
+        The HTTP client for the game's API, created on first use and closed while hibernating.
+        """
+        if self._client is None:
+            self._client = self.create_client()
+        return self._client
+
+    @property
+    def connection_id(self):
+        return self.link.info.connection_id
+
+    @property
+    def registry(self):
+        return self.app.services.get("connections", None)
+
     def get_headers(self) -> dict[str, str]:
         out = dict()
         out["X-Forwarded-For"] = self.link.info.client_address
@@ -75,13 +176,67 @@ class BaseConnection:
         """
         A thin wrapper around Rich.Console's print. Returns the exported data.
         """
-        new_kwargs = {"highlight": False}
-        new_kwargs.update(kwargs)
-        new_kwargs["end"] = "\r\n"
-        new_kwargs["crop"] = False
-        self.console.print(*args, **new_kwargs)
+        self.console.print(*args, **print_kwargs(kwargs))
         return self.console.export_text(clear=True, styles=True)
 
+    def console_options(self) -> dict:
+        """
+        A snapshot of the console settings, for render_rich(). Taken from link.info, the same defaults the
+        console is built from, unless the console already exists and may carry changes of its own; the
+        console itself is never created just to be copied.
+        """
+        if (console := self._console) is None:
+            info = self.link.info
+            return {
+                "width": info.width,
+                "height": info.height,
+                "emoji": False,
+                "color_system": info.color,
+            }
+        return {
+            "width": console.width,
+            "height": console.height,
+            "emoji": console._emoji,
+            "color_system": console._color_system,
+        }
+
+    def is_expensive(self, *args) -> bool:
+        """
+        Guesses whether rendering these renderables would hold up the event loop: big tables and long text.
+        """
+        app = self.app
+        for arg in args:
+            match arg:
+                case Table():
+                    if arg.row_count >= app.render_table_rows:
+                        return True
+                case str() | Text():
+                    if len(arg) >= app.render_text_length:
+                        return True
+        return False
+
+    async def render(self, *args, offload: typing.Optional[bool] = None, **kwargs) -> str:
+        """
+        Renders Rich output to text. Expensive output, or anything when offload=True, is rendered in a
+        worker thread so other connections aren't stalled; offload=False always renders inline.
+        """
+        if offload is None:
+            offload = self.app.render_offload and self.is_expensive(*args)
+        started = time.perf_counter()
+        if not offload:
+            out = self.print(*args, **kwargs)
+            self.app.render_seconds.labels("inline").observe(
+                time.perf_counter() - started
+            )
+            return out
+        options = self.console_options()
+        if (offloader := self.app.offload) is not None:
+            out = await offloader.submit(render_rich, options, args, kwargs)
+        else:
+            out = await asyncio.to_thread(render_rich, options, args, kwargs)
+        self.app.render_seconds.labels("offload").observe(time.perf_counter() - started)
+        return out
+
     def make_table(self, *args, **kwargs) -> Table:
         base_kwargs = {
             "border_style": "magenta",
@@ -103,15 +258,36 @@ class BaseConnection:
         tg.create_task(self.run_link())
 
     async def run(self):
-        async with asyncio.TaskGroup() as tg:
-            self.task_group = tg
-            self.start_tasks(tg)
+        if (registry := self.registry) is not None:
+            registry.add(self)
+        try:
+            async with asyncio.TaskGroup() as tg:
+                self.task_group = tg
+                self.start_tasks(tg)
+
+                await self.shutdown_event.wait()
+                logger.info(
+                    f"Connection {self.connection_id} shutting down: {self.shutdown_cause}"
+                )
+                raise asyncio.CancelledError()
+        finally:
+            if registry is not None:
+                registry.remove(self)
+
+    async def at_login(self, account_id, character_id=None):
+        """
+        Called by parsers once the connection has authenticated, and again when it picks a character.
+        """
+        self.account_id = account_id
+        self.character_id = character_id
+        if (registry := self.registry) is not None:
+            registry.update(self)
 
-            await self.shutdown_event.wait()
-            logger.info(
-                f"Connection {self.session_name} shutting down: {self.shutdown_cause}"
-            )
-            raise asyncio.CancelledError()
+    async def at_logout(self):
+        self.account_id = None
+        self.character_id = None
+        if (registry := self.registry) is not None:
+            registry.update(self)
 
     async def at_capability_change(self, capability: str, value):
         match capability:
@@ -120,37 +296,54 @@ class BaseConnection:
             case _:
                 await self.send_line(f"Capability change: {capability} -> {value}")
 
-        match capability:
-            case "color":
-                self.console._color_system = value
-            case "encoding":
-                if value == "utf-8":
-                    self.console._emoji = True
-                elif value == "ascii":
-                    self.console._emoji = False
-            case "height":
-                self.console.height = value
-            case "width":
-                self.console.width = value
+        # link.info is what a console created later (e.g. after hibernating), render_rich snapshots and the
+        # registry's render profiles read, so it must hold the negotiated value.
+        if hasattr(info := self.link.info, capability):
+            setattr(info, capability, value)
+
+        if (console := self._console) is not None:
+            match capability:
+                case "color":
+                    console._color_system = value
+                case "encoding":
+                    if value == "utf-8":
+                        console._emoji = True
+                    elif value == "ascii":
+                        console._emoji = False
+                case "height":
+                    console.height = value
+                case "width":
+                    console.width = value
+
+        if (registry := self.registry) is not None:
+            registry.update(self)
+
+    async def queue_text(self, text: str):
+        await self.link.outgoing_queue.put(LinkData(package="Text.ANSI", data=text))
 
     async def send_text(self, text: str):
-        await self.link.outgoing_queue.put(LinkData(package="Text.ANSI", data=text))
+        async with self.output_lock:
+            await self.queue_text(text)
 
-    async def send_rich(self, *args, **kwargs):
+    async def send_rich(self, *args, offload: typing.Optional[bool] = None, **kwargs):
         """
-        Sends a Rich message to the client.
+        Sends a Rich message to the client. See render() for offload.
         """
-        out = self.print(*args, **kwargs)
-        await self.send_text(out)
+        async with self.output_lock:
+            out = await self.render(*args, offload=offload, **kwargs)
+            await self.queue_text(out)
 
-    async def send_rich_line(self, *args, **kwargs):
+    async def send_rich_line(
+        self, *args, offload: typing.Optional[bool] = None, **kwargs
+    ):
         """
         Sends a Rich message to the client, ensuring it ends with a newline.
         """
-        out = self.print(*args, **kwargs)
-        if not out.endswith("\r\n"):
-            out += "\r\n"
-        await self.send_text(out)
+        async with self.output_lock:
+            out = await self.render(*args, offload=offload, **kwargs)
+            if not out.endswith("\r\n"):
+                out += "\r\n"
+            await self.queue_text(out)
 
     async def send_line(self, text: str):
         if not text.endswith("\r\n"):
@@ -187,7 +380,7 @@ class BaseConnection:
             return
         parser = self.parser_stack[-1]
         try:
-            await parser.handle_command(text)
+            await parser.handle_command(cmd)
         except MarkupError as e:
             await self.send_rich(f"[bold red]Error parsing markup:[/] {escape(str(e))}")
         except Exception as e:
@@ -203,9 +396,49 @@ class BaseConnection:
         parser = self.parser_stack[-1]
         await parser.handle_incoming_data(package, data)
 
+    async def hibernate(self):
+        """
+        Releases the connection's heavy resources while it is idle: parsers get on_hibernate(), then open
+        streams and the HTTP client are closed and the console is dropped. They come back on the next input.
+        """
+        async with self.hibernate_lock:
+            if self.hibernating:
+                return
+            self.hibernating = True
+            for parser in reversed(self.parser_stack):
+                try:
+                    await parser.on_hibernate()
+                except Exception as e:
+                    logger.error(f"Error hibernating parser {parser}: {e}")
+            streams, self.streams = self.streams, None
+            for response in streams or ():
+                await response.aclose()
+            if self._client is not None:
+                client, self._client = self._client, None
+                await client.aclose()
+            self._console = None
+
+    async def wake(self):
+        """
+        Called on the first input after hibernate(). The console and client are rebuilt lazily; parsers get
+        on_wake() to reopen anything they need.
+        """
+        async with self.hibernate_lock:
+            if not self.hibernating:
+                return
+            self.hibernating = False
+            for parser in self.parser_stack:
+                try:
+                    await parser.on_wake()
+                except Exception as e:
+                    logger.error(f"Error waking parser {parser}: {e}")
+
     async def handle_incoming_event(self, data):
         match data:
             case LinkData(package=package, data=data):
+                self.last_active_at = datetime.now()
+                if self.hibernating:
+                    await self.wake()
                 await self.at_receive_data(package, data)
             case LinkUpdate():
                 for k, v in data.info.items():
@@ -231,8 +464,7 @@ class BaseConnection:
     async def run_link(self):
         parser_class = self.get_start_parser()
 
-        async with self.create_client() as client:
-            self.client = client
+        try:
             await self.push_parser(parser_class())
 
             while True:
@@ -243,6 +475,10 @@ class BaseConnection:
                     return
                 except Exception as e:
                     logger.error(e)
+        finally:
+            if self._client is not None:
+                client, self._client = self._client, None
+                await client.aclose()
 
     async def api_call(
         self,
@@ -313,9 +549,20 @@ class BaseConnection:
                 headers=use_headers,
                 timeout=None,
             ) as event_source:
-                # Raise an exception for non-2xx status codes.
-                async for event in event_source.aiter_sse():
-                    yield event.event, event.json()
+                if self.streams is None:
+                    self.streams = set()
+                self.streams.add(event_source.response)
+                try:
+                    # Raise an exception for non-2xx status codes.
+                    async for event in event_source.aiter_sse():
+                        yield event.event, event.json()
+                finally:
+                    if self.streams is not None:
+                        self.streams.discard(event_source.response)
+        except (StreamClosed, ReadError):
+            # Closed by hibernate(); the parser reopens it in on_wake().
+            if not self.hibernating:
+                raise
         except HTTPStatusError as exc:
             # Log or handle errors as needed
             logger.error(
@@ -1,10 +1,11 @@
-import asyncio
 import typing
 from dataclasses import dataclass, field
 from uuid import UUID
 
 from rich.color import ColorType
 
+from muforge.utils.aio import SlimQueue
+
 
 @dataclass(slots=True)
 class ClientInfo:
@@ -47,9 +48,16 @@ class LinkData:
 class ConnectionLink:
     """
     A ConnectionLink
+
+    Args:
+        info (ClientInfo): The client's capabilities.
+        maxsize (int): Bounds both queues, so a stalled client applies backpressure instead of buffering
+            without limit. 0 (the default) means unbounded.
     """
 
-    def __init__(self, info: ClientInfo):
+    __slots__ = ("info", "incoming_queue", "outgoing_queue")
+
+    def __init__(self, info: ClientInfo, maxsize: int = 0):
         self.info = info
-        self.incoming_queue = asyncio.Queue()
-        self.outgoing_queue = asyncio.Queue()
+        self.incoming_queue = SlimQueue(maxsize)
+        self.outgoing_queue = SlimQueue(maxsize)
@@ -1,8 +1,12 @@
+import typing
+
 from rich.errors import MarkupError
 from rich.markup import escape
 
 
 class BaseParser:
+    __slots__ = ("connection", "index")
+
     def __init__(self):
         self.connection: "BaseConnection" = None
         self.index: int = 0
@@ -28,6 +32,19 @@ class BaseParser:
     async def on_resume(self):
         await self.on_start()
 
+    async def on_hibernate(self):
+        """
+        Called when the connection goes idle and releases its resources. Streams opened with api_stream are
+        closed right after this.
+        """
+        pass
+
+    async def on_wake(self):
+        """
+        Called on the first input after hibernating. Reopen any streams closed by hibernation here.
+        """
+        pass
+
     async def handle_incoming_data(self, package: str, data: typing.Any):
         match package:
             case "Text.Command":
@@ -0,0 +1,75 @@
+import asyncio
+from datetime import datetime
+
+from loguru import logger
+
+from muforge.application import Service
+
+
+class IdleService(Service):
+    """
+    Frees the resources of connections nobody is typing into.
+
+    A connection with no input for hibernate_after seconds is hibernated (see BaseConnection.hibernate): its
+    SSE streams and HTTP client are closed and its Rich console is dropped. All of them are rebuilt on the
+    next input. A connection idle for disconnect_after seconds is closed with shutdown_cause "idle".
+
+    Configured from PORTAL.idle:
+        enabled (bool): Default true.
+        hibernate_after (float): Seconds idle before hibernating. 0 disables. Default 900.
+        disconnect_after (float): Seconds idle before disconnecting. 0 disables. Default 0.
+        check_interval (float): Seconds between sweeps. Default 30.
+    """
+
+    def __init__(self, app, plugin):
+        super().__init__(app, plugin)
+        settings = app.settings.get("idle", dict())
+        self.enabled = settings.get("enabled", True)
+        self.hibernate_after = settings.get("hibernate_after", 900.0)
+        self.disconnect_after = settings.get("disconnect_after", 0.0)
+        self.check_interval = settings.get("check_interval", 30.0)
+
+    def is_valid(self) -> bool:
+        return self.enabled and (self.hibernate_after or self.disconnect_after)
+
+    async def setup(self):
+        metrics = self.app.metrics
+        self.hibernations = metrics.counter(
+            "muforge_portal_hibernations", "Idle connections hibernated."
+        )
+        self.disconnects = metrics.counter(
+            "muforge_portal_idle_disconnects", "Connections closed for being idle."
+        )
+        metrics.gauge(
+            "muforge_portal_hibernating", "Connections currently hibernating."
+        ).set_function(self.count_hibernating)
+
+    def count_hibernating(self) -> int:
+        if (registry := self.app.connections) is None:
+            return 0
+        return sum(1 for c in registry if c.hibernating)
+
+    async def sweep(self):
+        if (registry := self.app.connections) is None:
+            return
+        now = datetime.now()
+        for conn in registry:
+            idle = (now - conn.last_active_at).total_seconds()
+            if self.disconnect_after and idle >= self.disconnect_after:
+                if not conn.shutdown_event.is_set():
+                    conn.shutdown_cause = "idle"
+                    conn.shutdown_event.set()
+                    self.disconnects.inc()
+            elif self.hibernate_after and idle >= self.hibernate_after:
+                if not conn.hibernating:
+                    try:
+                        await conn.hibernate()
+                    except Exception as e:
+                        logger.error(f"Error hibernating connection {conn.connection_id}: {e}")
+                    else:
+                        self.hibernations.inc()
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.check_interval)
+            await self.sweep()
@@ -0,0 +1,190 @@
+import typing
+from uuid import UUID
+
+from muforge.application import Service
+
+from .connections import BaseConnection
+
+# The ClientInfo fields that change how Rich output renders. Connections sharing them render identically.
+PROFILE_FIELDS = ("width", "height", "color", "encoding", "screen_reader")
+
+
+def render_profile(connection: BaseConnection) -> tuple:
+    info = connection.link.info
+    return tuple(getattr(info, f) for f in PROFILE_FIELDS)
+
+
+class ConnectionRegistry(Service):
+    """
+    Indexes the portal's live connections by connection id, account, character, client address and render
+    profile, so finding "everyone on account X" or "all screen-reader users" doesn't scan every connection.
+
+        for conn in self.app.connections.for_account(account_id):
+            ...
+        await self.app.connections.send_rich(self.app.connections.matching(screen_reader=True), message)
+
+    BaseConnection adds itself when it starts running, removes itself when it stops, and calls update() after
+    at_login(), at_logout() and at_capability_change().
+
+    The bulk send methods group recipients by render profile (width, height, color system, encoding, screen
+    reader), render once per group, and queue the result on every connection in it.
+    """
+
+    load_priority = -60
+
+    def __init__(self, app, plugin):
+        super().__init__(app, plugin)
+        self.by_id: dict[UUID, BaseConnection] = dict()
+        self.by_account: dict[typing.Any, set[BaseConnection]] = dict()
+        self.by_character: dict[typing.Any, set[BaseConnection]] = dict()
+        self.by_address: dict[str, set[BaseConnection]] = dict()
+        self.by_profile: dict[tuple, set[BaseConnection]] = dict()
+        # The keys each connection is currently indexed under, so update() can move it.
+        self.keys: dict[BaseConnection, tuple] = dict()
+
+    async def setup(self):
+        metrics = self.app.metrics
+        metrics.gauge(
+            "muforge_portal_connections", "Live portal connections."
+        ).set_function(lambda: len(self.by_id))
+        metrics.gauge(
+            "muforge_portal_accounts", "Distinct accounts logged in."
+        ).set_function(lambda: len(self.by_account))
+        metrics.gauge(
+            "muforge_portal_render_profiles", "Distinct render profiles in use."
+        ).set_function(lambda: len(self.by_profile))
+
+    def __len__(self) -> int:
+        return len(self.by_id)
+
+    def __iter__(self) -> typing.Iterator[BaseConnection]:
+        return iter(list(self.by_id.values()))
+
+    def __contains__(self, connection) -> bool:
+        return connection in self.keys
+
+    @staticmethod
+    def _add(index: dict, key, connection):
+        if key is not None:
+            index.setdefault(key, set()).add(connection)
+
+    @staticmethod
+    def _discard(index: dict, key, connection):
+        if key is None or (found := index.get(key, None)) is None:
+            return
+        found.discard(connection)
+        if not found:
+            del index[key]
+
+    def _index_keys(self, connection: BaseConnection) -> tuple:
+        return (
+            connection.account_id,
+            connection.character_id,
+            connection.link.info.client_address,
+            render_profile(connection),
+        )
+
+    def _indexes(self) -> tuple[dict, ...]:
+        return self.by_account, self.by_character, self.by_address, self.by_profile
+
+    def add(self, connection: BaseConnection):
+        self.by_id[connection.link.info.connection_id] = connection
+        self.update(connection)
+
+    def remove(self, connection: BaseConnection):
+        self.by_id.pop(connection.link.info.connection_id, None)
+        if (old := self.keys.pop(connection, None)) is not None:
+            for index, key in zip(self._indexes(), old):
+                self._discard(index, key, connection)
+
+    def update(self, connection: BaseConnection):
+        """
+        Re-indexes a connection after its login state or capabilities changed.
+        """
+        if connection.link.info.connection_id not in self.by_id:
+            return
+        new = self._index_keys(connection)
+        old = self.keys.get(connection, (None,) * len(new))
+        if old == new:
+            return
+        for index, old_key, new_key in zip(self._indexes(), old, new):
+            if old_key != new_key:
+                self._discard(index, old_key, connection)
+                self._add(index, new_key, connection)
+        self.keys[connection] = new
+
+    def get(self, connection_id: UUID) -> typing.Optional[BaseConnection]:
+        return self.by_id.get(connection_id, None)
+
+    def for_account(self, account_id) -> set[BaseConnection]:
+        return set(self.by_account.get(account_id, ()))
+
+    def for_character(self, character_id) -> set[BaseConnection]:
+        return set(self.by_character.get(character_id, ()))
+
+    def for_address(self, address: str) -> set[BaseConnection]:
+        return set(self.by_address.get(address, ()))
+
+    def logged_in(self) -> set[BaseConnection]:
+        return set().union(*self.by_account.values())
+
+    def matching(self, **fields) -> set[BaseConnection]:
+        """
+        Connections whose render profile has the given values, e.g. matching(screen_reader=True). Only the
+        distinct profiles are examined, not every connection.
+        """
+        for name in fields:
+            if name not in PROFILE_FIELDS:
+                raise ValueError(f"{name} is not a render profile field.")
+        out = set()
+        for profile, connections in self.by_profile.items():
+            values = dict(zip(PROFILE_FIELDS, profile))
+            if all(values[k] == v for k, v in fields.items()):
+                out.update(connections)
+        return out
+
+    @staticmethod
+    def group_by_profile(
+        connections: typing.Iterable[BaseConnection],
+    ) -> dict[tuple, list[BaseConnection]]:
+        groups = dict()
+        for conn in connections:
+            groups.setdefault(render_profile(conn), list()).append(conn)
+        return groups
+
+    async def send_text(self, connections: typing.Iterable[BaseConnection], text: str):
+        for conn in connections:
+            await conn.send_text(text)
+
+    async def send_line(self, connections: typing.Iterable[BaseConnection], text: str):
+        if not text.endswith("\r\n"):
+            text += "\r\n"
+        await self.send_text(connections, text)
+
+    async def send_rich(
+        self,
+        connections: typing.Iterable[BaseConnection],
+        *args,
+        factory: typing.Optional[typing.Callable[[BaseConnection], typing.Any]] = None,
+        line: bool = False,
+        **kwargs,
+    ):
+        """
+        Sends Rich output to many connections, rendering it once per render profile.
+
+        Args:
+            connections: The recipients.
+            *args: Renderables, as for BaseConnection.send_rich.
+            factory (callable): Instead of args, called with one connection of each profile group to build the
+                renderable, for output that depends on the connection, like make_table().
+            line (bool): Ensure the output ends with a newline, like send_rich_line.
+            **kwargs: Passed on to the console's print.
+        """
+        for group in self.group_by_profile(connections).values():
+            first = group[0]
+            renderables = (factory(first),) if factory is not None else args
+            out = await first.render(*renderables, **kwargs)
+            if line and not out.endswith("\r\n"):
+                out += "\r\n"
+            for conn in group:
+                await conn.send_text(out)
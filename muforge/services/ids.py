@@ -0,0 +1,203 @@
+import itertools
+import os
+import time
+import typing
+import uuid
+from collections.abc import Container
+from pathlib import Path
+
+import orjson
+from loguru import logger
+
+from muforge.application import Service
+
+_COUNTER_BITS = 42
+_COUNTER_MAX = (1 << _COUNTER_BITS) - 1
+
+
+class UUID7Generator:
+    """
+    Generates RFC 9562 version 7 UUIDs: a 48-bit Unix millisecond timestamp, a 42-bit counter and 32 random
+    bits. The counter starts at a random point each millisecond and increments for every ID in that
+    millisecond, so IDs from one generator are strictly increasing and sort by creation time.
+    """
+
+    __slots__ = ("last_ms", "counter")
+
+    def __init__(self):
+        self.last_ms = 0
+        self.counter = 0
+
+    def _reseed(self) -> int:
+        # Leave the counter's top bit clear so it has room to increment within the millisecond.
+        return int.from_bytes(os.urandom(6)) & (_COUNTER_MAX >> 1)
+
+    def _advance(self) -> tuple[int, int]:
+        ms = time.time_ns() // 1_000_000
+        if ms > self.last_ms:
+            self.last_ms = ms
+            self.counter = self._reseed()
+        else:
+            # Same millisecond, or the clock went backwards: keep counting from the last timestamp.
+            self.counter += 1
+            if self.counter > _COUNTER_MAX:
+                self.last_ms += 1
+                self.counter = self._reseed()
+        return self.last_ms, self.counter
+
+    @staticmethod
+    def _build(ms: int, counter: int, tail: int) -> uuid.UUID:
+        value = (ms & 0xFFFF_FFFF_FFFF) << 80
+        value |= 0x7 << 76  # version
+        value |= (counter >> 30) << 64  # rand_a: top 12 counter bits
+        value |= 0b10 << 62  # variant
+        value |= (counter & 0x3FFF_FFFF) << 32
+        value |= tail
+        return uuid.UUID(int=value)
+
+    def __call__(self) -> uuid.UUID:
+        ms, counter = self._advance()
+        return self._build(ms, counter, int.from_bytes(os.urandom(4)))
+
+    def many(self, count: int) -> list[uuid.UUID]:
+        """
+        Generates count IDs, drawing all their randomness in one call.
+        """
+        tails = os.urandom(4 * count)
+        out = list()
+        for i in range(count):
+            ms, counter = self._advance()
+            out.append(
+                self._build(ms, counter, int.from_bytes(tails[4 * i : 4 * i + 4]))
+            )
+        return out
+
+
+class IdAllocator(Service):
+    """
+    Hands out unique IDs and readable names without scanning existing objects.
+
+        character_id = self.app.ids.new_id()
+        mob_ids = self.app.ids.allocate(10000, check=self.app.mobs)
+        name = self.app.ids.name("goblin")  # goblin_1, goblin_2, ...
+
+    IDs are time-ordered UUIDv7s, so they also index well as Postgres primary keys. A collision is already
+    astronomically unlikely; pass check, any container with O(1) membership such as a dict of live objects
+    keyed by ID, to rule it out anyway. Containers can also be registered by name with register() and
+    referred to by that name.
+
+    Names come from a counter per prefix. Counters start at 1 each run unless they were seeded with seed(),
+    or persisted; pass check to skip names that are already taken.
+
+    Configured from the application's settings under `ids`:
+        counters (str): Path of a JSON file the per-prefix counters are saved to on shutdown and loaded from
+            at setup. Default none (not persisted).
+    """
+
+    load_priority = -95
+
+    def __init__(self, app, plugin):
+        super().__init__(app, plugin)
+        settings = app.settings.get("ids", dict())
+        counters = settings.get("counters", None)
+        self.counters_path = Path(counters) if counters else None
+        self.generator = UUID7Generator()
+        self.counters: dict[str, itertools.count] = dict()
+        self.last: dict[str, int] = dict()
+        self.registries: dict[str, Container] = dict()
+
+    async def setup(self):
+        if self.counters_path is not None and self.counters_path.exists():
+            for prefix, value in orjson.loads(self.counters_path.read_bytes()).items():
+                self.seed(prefix, value)
+            logger.info(
+                f"Loaded {len(self.last)} name counters from {self.counters_path}."
+            )
+
+    def register(self, name: str, registry: Container):
+        """
+        Registers a live container of IDs or names so check= can refer to it by name.
+        """
+        self.registries[name] = registry
+
+    def unregister(self, name: str):
+        self.registries.pop(name, None)
+
+    def resolve_check(
+        self, check: typing.Optional[Container | str]
+    ) -> typing.Optional[Container]:
+        if isinstance(check, str):
+            return self.registries[check]
+        return check
+
+    def new_id(self, check: typing.Optional[Container | str] = None) -> uuid.UUID:
+        """
+        Returns a fresh UUIDv7.
+
+        Args:
+            check: A container, or the name of a registered one, the ID must not be in.
+        """
+        fresh = self.generator()
+        if (check := self.resolve_check(check)) is not None:
+            while fresh in check:
+                fresh = self.generator()
+        return fresh
+
+    def allocate(
+        self, count: int, check: typing.Optional[Container | str] = None
+    ) -> list[uuid.UUID]:
+        """
+        Returns count fresh UUIDv7s, in increasing order.
+
+        Args:
+            count (int): How many.
+            check: A container, or the name of a registered one, the IDs must not be in.
+        """
+        out = self.generator.many(count)
+        if (check := self.resolve_check(check)) is not None:
+            replaced = False
+            for i, fresh in enumerate(out):
+                while fresh in check:
+                    fresh = self.generator()
+                    replaced = True
+                out[i] = fresh
+            if replaced:
+                # Replacements come from later in the sequence than the rest of the batch.
+                out.sort()
+        return out
+
+    def seed(self, prefix: str, last: int):
+        """
+        Makes the next name for prefix use last + 1, e.g. from the highest number already saved.
+        """
+        self.counters[prefix] = itertools.count(last + 1)
+        self.last[prefix] = last
+
+    def name(self, prefix: str, check: typing.Optional[Container | str] = None) -> str:
+        """
+        Returns the next readable name for prefix, like prefix_42.
+
+        Args:
+            prefix (str): The name's prefix.
+            check: A container, or the name of a registered one, the name must not be in.
+        """
+        if (counter := self.counters.get(prefix, None)) is None:
+            counter = self.counters[prefix] = itertools.count(1)
+        check = self.resolve_check(check)
+        while True:
+            number = next(counter)
+            candidate = f"{prefix}_{number}"
+            if check is None or candidate not in check:
+                self.last[prefix] = number
+                return candidate
+
+    def shutdown(self):
+        if self.counters_path is None:
+            return
+        try:
+            self.counters_path.parent.mkdir(parents=True, exist_ok=True)
+            temp = self.counters_path.with_suffix(".tmp")
+            temp.write_bytes(orjson.dumps(self.last))
+            temp.replace(self.counters_path)
+        except OSError as e:
+            logger.error(f"Could not save name counters: {e}")
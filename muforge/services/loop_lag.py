@@ -0,0 +1,124 @@
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+
+from loguru import logger
+
+from muforge.application import Service
+from muforge.utils.profiling import percentiles
+
+
+class LoopLagMonitor(Service):
+    """
+    Watches the event loop for scheduling delay.
+
+    A sampling task measures how late the loop wakes it up. A watchdog thread notices when the loop has not
+    checked in for longer than the stall threshold and logs the stack the loop thread is stuck in, which is
+    the code that is blocking everything else.
+
+    Configured from the application's settings under `loop_lag`:
+        enabled (bool): Default true.
+        interval (float): Seconds between samples. Default 0.25.
+        stall_threshold (float): Seconds of lag that count as a stall. Default 0.5.
+        report_interval (float): Seconds between percentile log lines. 0 disables. Default 300.
+        window (int): How many recent samples percentiles are computed over. Default 2400.
+    """
+
+    load_priority = -100
+    start_priority = -100
+
+    def __init__(self, app, plugin):
+        super().__init__(app, plugin)
+        settings = app.settings.get("loop_lag", dict())
+        self.enabled = settings.get("enabled", True)
+        self.interval = settings.get("interval", 0.25)
+        self.stall_threshold = settings.get("stall_threshold", 0.5)
+        self.report_interval = settings.get("report_interval", 300.0)
+        self.samples: deque[float] = deque(maxlen=settings.get("window", 2400))
+        self.max_lag = 0.0
+        self.stalls = 0
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id = None
+        self._stop = threading.Event()
+        self._watchdog = None
+
+    def is_valid(self) -> bool:
+        return self.enabled
+
+    async def setup(self):
+        self._loop_thread_id = threading.get_ident()
+        lag = self.app.metrics.gauge(
+            "muforge_event_loop_lag_seconds",
+            "Event loop scheduling delay over the recent sample window.",
+            ("quantile",),
+        )
+        for q in (50, 90, 99):
+            lag.labels(q / 100).set_function(lambda q=q: self.percentiles((q,))[q])
+        self.app.metrics.gauge(
+            "muforge_event_loop_lag_max_seconds", "Largest event loop lag seen."
+        ).set_function(lambda: self.max_lag)
+        self.app.metrics.gauge(
+            "muforge_event_loop_stalls", "Event loop stalls past the threshold."
+        ).set_function(lambda: self.stalls)
+
+    def percentiles(self, quantiles=(50, 90, 99)) -> dict[float, float]:
+        """
+        Returns lag percentiles (in seconds) over the recent sample window.
+        """
+        return percentiles(self.samples, quantiles)
+
+    def report(self):
+        p = self.percentiles()
+        logger.info(
+            f"Event loop lag: p50={p[50] * 1000:.2f}ms p90={p[90] * 1000:.2f}ms "
+            f"p99={p[99] * 1000:.2f}ms max={self.max_lag * 1000:.2f}ms stalls={self.stalls}"
+        )
+
+    async def run(self):
+        self._heartbeat = time.monotonic()
+        self._stop.clear()
+        self._watchdog = threading.Thread(
+            target=self._watch, name=f"{self.app.name}-loop-watchdog", daemon=True
+        )
+        self._watchdog.start()
+        last_report = time.monotonic()
+        try:
+            while True:
+                expected = time.monotonic() + self.interval
+                await asyncio.sleep(self.interval)
+                now = time.monotonic()
+                lag = max(0.0, now - expected)
+                self._heartbeat = now
+                self.samples.append(lag)
+                if lag > self.max_lag:
+                    self.max_lag = lag
+                if self.report_interval and now - last_report >= self.report_interval:
+                    last_report = now
+                    self.report()
+        finally:
+            self.shutdown()
+
+    def shutdown(self):
+        self._stop.set()
+
+    def _watch(self):
+        """
+        Runs in the watchdog thread. Logs each stall once, while it is still happening.
+        """
+        reported = None
+        limit = self.interval + self.stall_threshold
+        while not self._stop.wait(self.stall_threshold / 2):
+            beat = self._heartbeat
+            stalled = time.monotonic() - beat
+            if stalled < limit or reported == beat:
+                continue
+            reported = beat
+            self.stalls += 1
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame else "<unavailable>"
+            logger.warning(
+                f"Event loop stalled for {stalled - self.interval:.3f}s. Loop thread stack:\n{stack}"
+            )
@@ -0,0 +1,241 @@
+import asyncio
+import functools
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+import typing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from loguru import logger
+
+from muforge.application import Service
+
+
+@dataclass(order=True, slots=True)
+class _Job:
+    priority: int
+    sequence: int
+    call: typing.Callable = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+    queued_at: float = field(compare=False)
+
+
+class _Pool:
+    """
+    An executor fed from a priority queue by as many dispatchers as the executor has workers, so queued work
+    waits here, in priority order, rather than in the executor's own FIFO.
+    """
+
+    def __init__(self, name: str, executor: Executor, workers: int):
+        self.name = name
+        self.executor = executor
+        self.workers = workers
+        self.queue: asyncio.PriorityQueue[_Job] = asyncio.PriorityQueue()
+        self.running = 0
+
+
+def _rendezvous(barrier, timeout: float):
+    # Holding every worker here until all have arrived means no worker can finish early and take a second job.
+    barrier.wait(timeout)
+    return os.getpid()
+
+
+class OffloadService(Service):
+    """
+    Runs blocking or CPU-heavy work (pathfinding, map generation, big renders, reports) off the event loop.
+
+        path = await self.app.offload.submit(find_path, start, goal, priority=-1, timeout=2.0)
+        image = await self.app.offload.submit(render_map, area, pool="process")
+
+    There is a thread pool, good for code that releases the GIL or blocks on I/O, and optionally a process
+    pool for pure-Python CPU work; functions and arguments sent to it must be picklable. Work waits in a
+    per-pool priority queue (lower numbers run first, ties in submission order) and each pool only runs as
+    many jobs as it has workers.
+
+    Cancelling the awaiting task, or hitting its timeout, drops a job that hasn't started. A job that has
+    already started can't be interrupted; it runs to completion in its worker and the result is discarded.
+
+    Configured from the application's settings under `offload`:
+        enabled (bool): Default true.
+        threads (int): Thread pool workers. Default min(32, cpu count + 4).
+        processes (int): Process pool workers. Default 0, disabling the process pool.
+        warmup (bool): Start every worker during setup rather than on first use. Default true.
+        timeout (float): Default per-job timeout in seconds. Default none.
+    """
+
+    load_priority = -80
+    start_priority = -80
+
+    def __init__(self, app, plugin):
+        super().__init__(app, plugin)
+        settings = app.settings.get("offload", dict())
+        self.enabled = settings.get("enabled", True)
+        self.threads = settings.get("threads", min(32, (os.cpu_count() or 1) + 4))
+        self.processes = settings.get("processes", 0)
+        self.warmup = settings.get("warmup", True)
+        self.timeout = settings.get("timeout", None)
+        self.pools: dict[str, _Pool] = dict()
+        self.sequence = itertools.count()
+        self.closing = False
+
+    def is_valid(self) -> bool:
+        return self.enabled
+
+    async def setup(self):
+        self.pools["thread"] = _Pool(
+            "thread",
+            ThreadPoolExecutor(self.threads, thread_name_prefix="muforge-offload"),
+            self.threads,
+        )
+        if self.processes:
+            self.pools["process"] = _Pool(
+                "process", ProcessPoolExecutor(self.processes), self.processes
+            )
+
+        metrics = self.app.metrics
+        labels = ("pool",)
+        depth = metrics.gauge(
+            "muforge_offload_queue_depth", "Jobs waiting for a worker.", labels
+        )
+        running = metrics.gauge(
+            "muforge_offload_running", "Jobs currently running.", labels
+        )
+        for pool in self.pools.values():
+            depth.labels(pool.name).set_function(lambda p=pool: p.queue.qsize())
+            running.labels(pool.name).set_function(lambda p=pool: p.running)
+        self.wait_seconds = metrics.histogram(
+            "muforge_offload_wait_seconds", "Time jobs spent queued.", labels
+        )
+        self.run_seconds = metrics.histogram(
+            "muforge_offload_run_seconds", "Time jobs spent running.", labels
+        )
+        self.outcomes = metrics.counter(
+            "muforge_offload_jobs",
+            "Jobs by outcome: ok, error, timeout, or dropped (cancelled before it started).",
+            ("pool", "outcome"),
+        )
+
+        if self.warmup:
+            for pool in self.pools.values():
+                await self.warm(pool)
+
+    async def warm(self, pool: _Pool, timeout: float = 30.0):
+        """
+        Starts every worker in a pool. One job per worker waits on a barrier until all of them are running, so
+        the executor has to start a new thread or process for each. Process workers share the barrier through
+        a short-lived multiprocessing manager.
+        """
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        manager = None
+        if isinstance(pool.executor, ProcessPoolExecutor):
+            manager = await asyncio.to_thread(multiprocessing.Manager)
+            barrier = manager.Barrier(pool.workers)
+        else:
+            barrier = threading.Barrier(pool.workers)
+        try:
+            await asyncio.gather(
+                *(
+                    loop.run_in_executor(pool.executor, _rendezvous, barrier, timeout)
+                    for _ in range(pool.workers)
+                )
+            )
+        except threading.BrokenBarrierError:
+            logger.warning(
+                f"Not every {pool.name} worker started within {timeout:.0f}s; the rest start on first use."
+            )
+        else:
+            logger.info(
+                f"Warmed up {pool.workers} {pool.name} workers in {time.perf_counter() - started:.3f}s."
+            )
+        finally:
+            if manager is not None:
+                await asyncio.to_thread(manager.shutdown)
+
+    async def submit(
+        self,
+        func: typing.Callable,
+        *args,
+        priority: int = 0,
+        timeout: typing.Optional[float] = None,
+        pool: str = "thread",
+        **kwargs,
+    ):
+        """
+        Runs func(*args, **kwargs) in a worker and returns its result.
+
+        Args:
+            func (callable): A plain (not async) callable.
+            priority (int): Lower runs first.
+            timeout (float): Seconds to wait, including time queued. Defaults to the service's timeout.
+            pool (str): "thread" or "process".
+
+        Raises:
+            TimeoutError: If the timeout expired first.
+        """
+        if self.closing:
+            raise RuntimeError("The offload service is shutting down.")
+        if (target := self.pools.get(pool, None)) is None:
+            raise ValueError(f"No offload pool named {pool!r}.")
+        loop = asyncio.get_running_loop()
+        job = _Job(
+            priority,
+            next(self.sequence),
+            functools.partial(func, *args, **kwargs),
+            loop.create_future(),
+            time.perf_counter(),
+        )
+        target.queue.put_nowait(job)
+        if timeout is None:
+            timeout = self.timeout
+        try:
+            async with asyncio.timeout(timeout):
+                return await job.future
+        except TimeoutError:
+            self.outcomes.labels(pool, "timeout").inc()
+            raise
+        finally:
+            # A job that never started is skipped by the dispatcher.
+            job.future.cancel()
+
+    async def dispatch(self, pool: _Pool):
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await pool.queue.get()
+            if job.future.done():
+                self.outcomes.labels(pool.name, "dropped").inc()
+                continue
+            started = time.perf_counter()
+            self.wait_seconds.labels(pool.name).observe(started - job.queued_at)
+            pool.running += 1
+            try:
+                result = await loop.run_in_executor(pool.executor, job.call)
+            except Exception as e:
+                self.outcomes.labels(pool.name, "error").inc()
+                if not job.future.done():
+                    job.future.set_exception(e)
+            else:
+                self.outcomes.labels(pool.name, "ok").inc()
+                if not job.future.done():
+                    job.future.set_result(result)
+            finally:
+                pool.running -= 1
+                self.run_seconds.labels(pool.name).observe(
+                    time.perf_counter() - started
+                )
+
+    async def run(self):
+        async with asyncio.TaskGroup() as tg:
+            for pool in self.pools.values():
+                for _ in range(pool.workers):
+                    tg.create_task(self.dispatch(pool))
+
+    def shutdown(self):
+        self.closing = True
+        for pool in self.pools.values():
+            while not pool.queue.empty():
+                pool.queue.get_nowait().future.cancel()
+            pool.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,406 @@
+import asyncio
+import inspect
+import random
+import time
+import typing
+from pathlib import Path
+
+import orjson
+from loguru import logger
+
+from muforge.application import Service
+from muforge.utils.misc import property_from_module
+
+# Each wheel level has 2**SLOT_BITS slots.
+SLOT_BITS = 6
+SLOTS = 1 << SLOT_BITS
+SLOT_MASK = SLOTS - 1
+
+
+class Timer:
+    """
+    A handle to a scheduled callback. Returned by Scheduler.call_later()/call_every(); use cancel() to stop it.
+    """
+
+    __slots__ = (
+        "scheduler",
+        "due",
+        "callback",
+        "args",
+        "interval",
+        "jitter",
+        "key",
+        "persist",
+        "slot",
+        "cancelled",
+    )
+
+    def __init__(
+        self, scheduler, due, callback, args, interval, jitter, key, persist
+    ):
+        self.scheduler = scheduler
+        # The tick this timer fires on.
+        self.due: int = due
+        self.callback = callback
+        self.args = args
+        self.interval: typing.Optional[float] = interval
+        self.jitter: float = jitter
+        self.key: typing.Optional[str] = key
+        self.persist: typing.Optional[str] = persist
+        # The wheel slot currently holding this timer, so it can be removed in O(1).
+        self.slot: typing.Optional[dict] = None
+        self.cancelled = False
+
+    @property
+    def when(self) -> float:
+        """
+        The event loop time this timer is due.
+        """
+        return self.scheduler.tick_time(self.due)
+
+    def cancel(self):
+        self.scheduler.cancel(self)
+
+    def __repr__(self):
+        return f"<Timer {self.key or self.callback!r} due={self.when:.3f}>"
+
+
+def callback_path(callback) -> str:
+    """
+    Returns the module:name path of a module-level function, so a persisted timer can find it again.
+    """
+    if isinstance(callback, str):
+        return callback
+    module = getattr(callback, "__module__", None)
+    name = getattr(callback, "__qualname__", "")
+    if not module or not name or "." in name or "<" in name:
+        raise ValueError(
+            f"Persistent timers need a module-level function or a module:name path, got {callback!r}."
+        )
+    return f"{module}:{name}"
+
+
+class Scheduler(Service):
+    """
+    Runs callbacks after a delay or on a repeating interval, using a hierarchical timer wheel.
+
+        timer = self.app.scheduler.call_later(5.0, send_message, character_id, "The door creaks shut.")
+        regen = self.app.scheduler.call_every(10.0, regen_tick, jitter=2.0, key="regen")
+        regen.cancel()
+
+    Time advances in fixed ticks. Each of the wheel's levels has 64 slots, and each level's slot spans 64
+    times more ticks than the level below, so scheduling and cancelling are O(1) however many timers are
+    pending. Once per tick, everything due is run as one batch: plain functions inline, coroutine functions as
+    tasks. Callbacks are never run early; how late they ran is recorded in muforge_scheduler_lateness_seconds.
+
+    A repeating timer is rescheduled after each run, plus a random delay of up to jitter seconds so that many
+    timers created together spread out. Scheduling with a key replaces any pending timer with the same key.
+
+    Timers scheduled with persist=True are saved to disk on shutdown and restored on the next startup, with
+    the time that elapsed in between counted. Their callback must be a module-level function (or a
+    "module:name" path) and their args must be JSON-serializable.
+
+    Configured from the application's settings under `scheduler`:
+        enabled (bool): Default true.
+        tick (float): Seconds per tick, the scheduler's resolution. Default 0.05.
+        levels (int): Wheel levels. Default 4, covering about 9.7 days at the default tick. Timers further
+            out are parked in the top level until they come within range.
+        persist (str): Path of the JSON file persistent timers are saved to. Default none (disabled).
+    """
+
+    load_priority = -90
+    start_priority = -90
+
+    def __init__(self, app, plugin):
+        super().__init__(app, plugin)
+        settings = app.settings.get("scheduler", dict())
+        self.enabled = settings.get("enabled", True)
+        self.tick = settings.get("tick", 0.05)
+        self.levels = settings.get("levels", 4)
+        persist = settings.get("persist", None)
+        self.persist_path = Path(persist) if persist else None
+        self.wheel: list[list[dict[Timer, None]]] = [
+            [dict() for _ in range(SLOTS)] for _ in range(self.levels)
+        ]
+        self.span = SLOTS**self.levels
+        self.now = 0
+        self.origin = None
+        self.count = 0
+        self.keys: dict[str, Timer] = dict()
+        self.tasks: set[asyncio.Task] = set()
+        self.wakeup = asyncio.Event()
+
+    def is_valid(self) -> bool:
+        return self.enabled
+
+    async def setup(self):
+        self.origin = asyncio.get_running_loop().time()
+        metrics = self.app.metrics
+        metrics.gauge("muforge_scheduler_timers", "Pending timers.").set_function(
+            lambda: self.count
+        )
+        metrics.gauge(
+            "muforge_scheduler_running_tasks", "Coroutine callbacks still running."
+        ).set_function(lambda: len(self.tasks))
+        self.fired = metrics.counter("muforge_scheduler_fired", "Timer callbacks run.")
+        self.errors = metrics.counter(
+            "muforge_scheduler_errors", "Timer callbacks that raised."
+        )
+        self.lateness = metrics.histogram(
+            "muforge_scheduler_lateness_seconds",
+            "How long after its due time a timer callback started.",
+            buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+        )
+        self.batch_sizes = metrics.histogram(
+            "muforge_scheduler_batch_size",
+            "Timers run together in one tick.",
+            buckets=(1, 10, 100, 1000, 10000),
+        )
+        if self.persist_path is not None:
+            self.restore()
+
+    def tick_time(self, tick: int) -> float:
+        return self.origin + tick * self.tick
+
+    def place(self, timer: Timer):
+        delta = min(timer.due - self.now, self.span - 1)
+        target = self.now + max(delta, 0)
+        level = 0
+        while delta >= SLOTS ** (level + 1):
+            level += 1
+        slot = self.wheel[level][(target >> (SLOT_BITS * level)) & SLOT_MASK]
+        slot[timer] = None
+        timer.slot = slot
+
+    def schedule(
+        self,
+        delay: float,
+        callback,
+        args: tuple,
+        interval: typing.Optional[float] = None,
+        jitter: float = 0.0,
+        key: typing.Optional[str] = None,
+        persist: bool = False,
+    ) -> Timer:
+        if self.origin is None:
+            raise RuntimeError("The scheduler has not been set up yet.")
+        if persist:
+            persist = callback_path(callback)
+            if isinstance(callback, str):
+                callback = property_from_module(callback)
+        if key is not None and (old := self.keys.get(key, None)) is not None:
+            self.cancel(old)
+        if jitter:
+            delay += random.uniform(0.0, jitter)
+        # Ticks are counted from origin, so round against the loop clock rather than self.now.
+        elapsed = asyncio.get_running_loop().time() - self.origin
+        if not self.count:
+            # The wheel is empty, so the ticks that passed while idle can be skipped outright.
+            self.now = max(self.now, int(elapsed // self.tick))
+        due = max(self.now + 1, int(-(-(elapsed + delay) // self.tick)))
+        timer = Timer(
+            self, due, callback, args, interval, jitter, key, persist or None
+        )
+        self.place(timer)
+        self.count += 1
+        if key is not None:
+            self.keys[key] = timer
+        if self.count == 1:
+            self.wakeup.set()
+        return timer
+
+    def call_later(
+        self,
+        delay: float,
+        callback,
+        *args,
+        key: typing.Optional[str] = None,
+        persist: bool = False,
+    ) -> Timer:
+        """
+        Runs callback(*args) once, delay seconds from now.
+
+        Args:
+            delay (float): Seconds to wait.
+            callback: A function or coroutine function.
+            key (str): Replaces any pending timer with the same key.
+            persist (bool): Save this timer across restarts.
+        """
+        return self.schedule(delay, callback, args, key=key, persist=persist)
+
+    def call_every(
+        self,
+        interval: float,
+        callback,
+        *args,
+        jitter: float = 0.0,
+        delay: typing.Optional[float] = None,
+        key: typing.Optional[str] = None,
+        persist: bool = False,
+    ) -> Timer:
+        """
+        Runs callback(*args) every interval seconds until cancelled.
+
+        Args:
+            interval (float): Seconds between runs.
+            callback: A function or coroutine function.
+            jitter (float): Up to this many random seconds are added to each wait.
+            delay (float): Seconds until the first run. Defaults to interval.
+            key (str): Replaces any pending timer with the same key.
+            persist (bool): Save this timer across restarts.
+        """
+        return self.schedule(
+            interval if delay is None else delay,
+            callback,
+            args,
+            interval=interval,
+            jitter=jitter,
+            key=key,
+            persist=persist,
+        )
+
+    def cancel(self, timer: Timer):
+        if timer.cancelled:
+            return
+        timer.cancelled = True
+        if timer.slot is not None:
+            timer.slot.pop(timer, None)
+            timer.slot = None
+            self.count -= 1
+        if timer.key is not None and self.keys.get(timer.key, None) is timer:
+            del self.keys[timer.key]
+
+    def advance(self) -> dict[Timer, None]:
+        """
+        Moves the wheel forward one tick and returns the timers due on it.
+        """
+        self.now += 1
+        now = self.now
+        # Find the highest level whose slot boundary was crossed, then cascade from the top down so that
+        # timers moved out of a higher level can land in a lower slot that is about to be cascaded too.
+        top = 0
+        while top + 1 < self.levels and not now & ((1 << (SLOT_BITS * (top + 1))) - 1):
+            top += 1
+        for level in range(top, 0, -1):
+            index = (now >> (SLOT_BITS * level)) & SLOT_MASK
+            slot, self.wheel[level][index] = self.wheel[level][index], dict()
+            for timer in slot:
+                self.place(timer)
+        index = now & SLOT_MASK
+        due, self.wheel[0][index] = self.wheel[0][index], dict()
+        return due
+
+    def fire(self, due: dict[Timer, None], loop_time: float, current: int):
+        self.batch_sizes.observe(len(due))
+        # Detach the whole batch first: a callback may cancel or replace (by key) another timer due on this
+        # tick, and cancel() must not reach back into the slot being fired.
+        for timer in due:
+            timer.slot = None
+            self.count -= 1
+        for timer in list(due):
+            if timer.cancelled:
+                continue
+            if timer.key is not None and timer.interval is None:
+                if self.keys.get(timer.key, None) is timer:
+                    del self.keys[timer.key]
+            self.lateness.observe(max(loop_time - self.tick_time(timer.due), 0.0))
+            self.fired.inc()
+            self.run_callback(timer)
+            if timer.interval is not None and not timer.cancelled:
+                delay = timer.interval
+                if timer.jitter:
+                    delay += random.uniform(0.0, timer.jitter)
+                # Count from the real current tick, so a loop that fell behind doesn't fire a burst of repeats.
+                timer.due = max(self.now, current) + max(1, round(delay / self.tick))
+                self.place(timer)
+                self.count += 1
+
+    def run_callback(self, timer: Timer):
+        try:
+            result = timer.callback(*timer.args)
+        except Exception as e:
+            self.errors.inc()
+            logger.error(f"Error in scheduled callback {timer}: {e}")
+            return
+        if inspect.isawaitable(result):
+            task = asyncio.ensure_future(result)
+            self.tasks.add(task)
+            task.add_done_callback(self.task_done)
+
+    def task_done(self, task: asyncio.Task):
+        self.tasks.discard(task)
+        if not task.cancelled() and (e := task.exception()) is not None:
+            self.errors.inc()
+            logger.error(f"Error in scheduled callback: {e}")
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            if not self.count:
+                # Nothing to do: sleep until something is scheduled, then skip the idle ticks.
+                self.wakeup.clear()
+                await self.wakeup.wait()
+            delay = self.tick_time(self.now + 1) - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            loop_time = loop.time()
+            target = int((loop_time - self.origin) // self.tick)
+            while self.now < target and self.count:
+                if due := self.advance():
+                    self.fire(due, loop_time, target)
+
+    def pending(self) -> typing.Iterator[Timer]:
+        for level in self.wheel:
+            for slot in level:
+                yield from slot
+
+    def save(self):
+        loop_time = asyncio.get_running_loop().time()
+        wall = time.time()
+        data = [
+            {
+                "callback": t.persist,
+                "args": list(t.args),
+                "when": wall + max(t.when - loop_time, 0.0),
+                "interval": t.interval,
+                "jitter": t.jitter,
+                "key": t.key,
+            }
+            for t in self.pending()
+            if t.persist
+        ]
+        self.persist_path.parent.mkdir(parents=True, exist_ok=True)
+        temp = self.persist_path.with_suffix(".tmp")
+        temp.write_bytes(orjson.dumps(data))
+        temp.replace(self.persist_path)
+        logger.info(f"Saved {len(data)} persistent timers to {self.persist_path}.")
+
+    def restore(self):
+        if not self.persist_path.exists():
+            return
+        data = orjson.loads(self.persist_path.read_bytes())
+        wall = time.time()
+        restored = 0
+        for entry in data:
+            try:
+                self.schedule(
+                    max(entry["when"] - wall, 0.0),
+                    entry["callback"],
+                    tuple(entry["args"]),
+                    interval=entry["interval"],
+                    jitter=entry["jitter"],
+                    key=entry["key"],
+                    persist=True,
+                )
+            except (ImportError, AttributeError) as e:
+                logger.error(f"Could not restore timer for {entry['callback']}: {e}")
+                continue
+            restored += 1
+        logger.info(f"Restored {restored} persistent timers from {self.persist_path}.")
+
+    def shutdown(self):
+        if self.persist_path is not None:
+            try:
+                self.save()
+            except (OSError, TypeError, orjson.JSONEncodeError) as e:
+                logger.error(f"Could not save persistent timers: {e}")
@@ -0,0 +1,142 @@
+import asyncio
+import typing
+from collections import deque
+
+
+class SlimQueue:
+    """
+    A FIFO queue for coroutines with the commonly used part of asyncio.Queue's interface: put, put_nowait, get,
+    get_nowait, qsize, empty, full and maxsize. There is no task_done()/join().
+
+    An asyncio.Queue allocates four deques up front (items, getters, putters, and one inside its join Event),
+    roughly 3 KB before anything is queued. A server holds two queues per connection, so this one allocates its
+    item buffer on first use and keeps waiters in lists that only exist while someone is waiting.
+    """
+
+    __slots__ = ("maxsize", "_items", "_getters", "_putters")
+
+    def __init__(self, maxsize: int = 0):
+        self.maxsize = maxsize
+        self._items: typing.Optional[deque] = None
+        self._getters: typing.Optional[list[asyncio.Future]] = None
+        self._putters: typing.Optional[list[asyncio.Future]] = None
+
+    def __repr__(self):
+        return f"<SlimQueue maxsize={self.maxsize} qsize={self.qsize()}>"
+
+    def qsize(self) -> int:
+        return len(self._items) if self._items else 0
+
+    def empty(self) -> bool:
+        return not self._items
+
+    def full(self) -> bool:
+        return 0 < self.maxsize <= self.qsize()
+
+    @staticmethod
+    def _wake_next(waiters: typing.Optional[list[asyncio.Future]]):
+        while waiters:
+            waiter = waiters.pop(0)
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+
+    @staticmethod
+    async def _wait(waiters: list[asyncio.Future]):
+        waiter = asyncio.get_running_loop().create_future()
+        waiters.append(waiter)
+        try:
+            await waiter
+        except BaseException:
+            waiter.cancel()
+            try:
+                waiters.remove(waiter)
+            except ValueError:
+                pass
+            raise
+
+    def put_nowait(self, item):
+        if self.full():
+            raise asyncio.QueueFull
+        if self._items is None:
+            self._items = deque()
+        self._items.append(item)
+        self._wake_next(self._getters)
+
+    async def put(self, item):
+        while self.full():
+            if self._putters is None:
+                self._putters = list()
+            try:
+                await self._wait(self._putters)
+            except BaseException:
+                # Pass a wakeup we may have consumed on to the next putter.
+                if not self.full():
+                    self._wake_next(self._putters)
+                raise
+        self.put_nowait(item)
+
+    def get_nowait(self):
+        if not self._items:
+            raise asyncio.QueueEmpty
+        item = self._items.popleft()
+        self._wake_next(self._putters)
+        return item
+
+    async def get(self):
+        while not self._items:
+            if self._getters is None:
+                self._getters = list()
+            try:
+                await self._wait(self._getters)
+            except BaseException:
+                # Pass a wakeup we may have consumed on to the next getter.
+                if self._items:
+                    self._wake_next(self._getters)
+                raise
+        return self.get_nowait()
+
+
+class SlimEvent:
+    """
+    asyncio.Event's interface (set, clear, is_set, wait) without allocating a waiter deque for every instance;
+    waiters are kept in a list that only exists while someone is waiting.
+    """
+
+    __slots__ = ("_value", "_waiters")
+
+    def __init__(self):
+        self._value = False
+        self._waiters: typing.Optional[list[asyncio.Future]] = None
+
+    def __repr__(self):
+        return f"<SlimEvent {'set' if self._value else 'unset'}>"
+
+    def is_set(self) -> bool:
+        return self._value
+
+    def set(self):
+        if self._value:
+            return
+        self._value = True
+        waiters, self._waiters = self._waiters, None
+        for waiter in waiters or ():
+            if not waiter.done():
+                waiter.set_result(True)
+
+    def clear(self):
+        self._value = False
+
+    async def wait(self) -> bool:
+        if self._value:
+            return True
+        waiter = asyncio.get_running_loop().create_future()
+        if self._waiters is None:
+            self._waiters = list()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+            return True
+        finally:
+            if self._waiters is not None and waiter in self._waiters:
+                self._waiters.remove(waiter)
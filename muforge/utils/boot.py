@@ -3,35 +3,79 @@ import os
 import signal
 import ssl
 import sys
+import typing
 from pathlib import Path
 
 from loguru import logger
 
 import muforge
 
+from .logsinks import BatchingSink, RotatingFileWriter, SamplingFilter, StreamWriter
 from .misc import property_from_module
 
 
-def setup_logging(name: str):
+def setup_logging(name: str, settings: dict = None):
+    """
+    Configures loguru with a colorized stdout sink and a serialized JSON file sink.
+
+    Options are read from MUFORGE.logging:
+        mode (str): "sync" writes on the calling thread. "async" queues records for a background thread that
+            writes them in batches. Defaults to "async" when MUFORGE.run_mode is "prod", else "sync".
+        queue_size (int): Records held per sink before new ones are dropped (async mode). Default 10000.
+        batch_size (int): Maximum records per write (async mode). Default 256.
+        flush_interval (float): Seconds the writer waits for records before checking again. Default 0.25.
+        rotation (int | str): Rotate the log file once it grows past this size, in bytes or as a string like
+            "10 MB". Sync mode also accepts loguru's time-based rotations; async mode rejects them at setup.
+            Default: never.
+        sampling (dict): {module_prefix: N} keeps 1 in N records below WARNING from those modules.
+    """
+    muforge_settings = (settings or dict()).get("MUFORGE", dict())
+    log_settings = muforge_settings.get("logging", dict())
+    default_mode = "async" if muforge_settings.get("run_mode", "dev") == "prod" else "sync"
+    mode = log_settings.get("mode", default_mode)
+    rotation = log_settings.get("rotation", None)
 
     logformat = {
         "format": "{time} - {level} - {message}",
         "backtrace": True,
         "diagnose": True,
     }
+    if sampling := log_settings.get("sampling", None):
+        logformat["filter"] = SamplingFilter(sampling)
+
+    match mode:
+        case "sync":
+            file_sink = {"sink": f"logs/{name}.log", "compression": "zip"}
+            if rotation:
+                file_sink["rotation"] = rotation
+            handlers = [
+                {"sink": sys.stdout, "colorize": True, **logformat},
+                {**file_sink, "serialize": True, **logformat},
+            ]
+        case "async":
+            queue_options = {
+                "queue_size": log_settings.get("queue_size", 10000),
+                "batch_size": log_settings.get("batch_size", 256),
+                "flush_interval": log_settings.get("flush_interval", 0.25),
+            }
+            stdout_sink = BatchingSink(
+                StreamWriter(sys.stdout), name=f"{name}-stdout", **queue_options
+            )
+            file_sink = BatchingSink(
+                RotatingFileWriter(
+                    f"logs/{name}.log", rotation=rotation, compression="zip"
+                ),
+                name=f"{name}-file",
+                **queue_options,
+            )
+            handlers = [
+                {"sink": stdout_sink, "colorize": True, **logformat},
+                {"sink": file_sink, "serialize": True, **logformat},
+            ]
+        case _:
+            raise ValueError(f"Unknown logging mode: {mode}")
 
-    config = {
-        "handlers": [
-            {"sink": sys.stdout, "colorize": True, **logformat},
-            {
-                "sink": f"logs/{name}.log",
-                "serialize": True,
-                "compression": "zip",
-                **logformat,
-            },
-        ],
-    }
-    logger.configure(**config)
+    logger.configure(handlers=handlers)
 
 
 def install_signal_handlers(app):
@@ -57,7 +101,7 @@ async def setup_program(program: str, settings: dict):
         raise FileNotFoundError(
             "logs folder not found in current directory! Are you sure you're in the right place?"
         )
-    setup_logging(program)
+    setup_logging(program, settings)
 
 
 async def run_program(program: str, settings: dict):
@@ -86,7 +130,9 @@ async def run_program(program: str, settings: dict):
                 settings[program.upper()].get("class", None)
             )
             app = app_class(settings)
-            await app.setup()
+            with app.timeline.phase("setup"):
+                await app.setup()
+            app.report_startup()
             install_signal_handlers(app)
             try:
                 await app.run()
@@ -125,13 +171,50 @@ def get_config(mode: str) -> dict:
     return d.to_dict()
 
 
-async def main(mode: str):
-    settings = get_config(mode)
+def get_loop_factory(name: str) -> typing.Optional[typing.Callable]:
+    """
+    Returns an event loop factory for asyncio.run.
+
+    Args:
+        name (str): "asyncio" for the stdlib loop, "uvloop" to require uvloop, or "auto" to use uvloop
+            when it is installed.
+
+    Returns:
+        A loop factory, or None for the asyncio default.
+    """
+    match name:
+        case "asyncio" | None:
+            return None
+        case "uvloop" | "auto":
+            try:
+                import uvloop
+            except ImportError:
+                if name == "uvloop":
+                    logger.warning("uvloop requested but not installed, using asyncio.")
+                return None
+            return uvloop.new_event_loop
+        case _:
+            raise ValueError(f"Unknown event loop: {name}")
+
+
+async def main(mode: str, settings: dict = None):
+    if settings is None:
+        settings = get_config(mode)
     await run_program(mode, settings)
 
 
 def startup(mode: str):
-    run = None
-    from asyncio import run
-
-    run(main(mode), debug=True)
+    """
+    Runs a program under the run mode set by MUFORGE.run_mode. "dev" (the default) runs asyncio in debug mode,
+    "prod" does not. MUFORGE.event_loop selects the loop implementation (see get_loop_factory).
+    """
+    settings = get_config(mode)
+    muforge_settings = settings.get("MUFORGE", dict())
+    run_mode = muforge_settings.get("run_mode", "dev")
+    if run_mode not in ("dev", "prod"):
+        raise ValueError(f"Unknown run mode: {run_mode}")
+    loop_factory = get_loop_factory(muforge_settings.get("event_loop", "asyncio"))
+
+    asyncio.run(
+        main(mode, settings), debug=run_mode == "dev", loop_factory=loop_factory
+    )
@@ -0,0 +1,249 @@
+import queue
+import re
+import sys
+import threading
+import typing
+import zipfile
+from collections import defaultdict
+from pathlib import Path
+
+from .misc import utcnow
+
+_STOP = object()
+
+# Every BatchingSink that is currently running, so their drop counters can be reported.
+ACTIVE_SINKS: list["BatchingSink"] = list()
+
+
+RE_SIZE = re.compile(r"^\s*(\d+(?:\.\d*)?)\s*([kmgt]?)(i?)b?\s*$", re.IGNORECASE)
+
+
+def parse_size(value: int | str | None) -> typing.Optional[int]:
+    """
+    Parses a file size the way loguru's rotation option does: an int of bytes, or a string like "500 KB",
+    "10 MB" or "1 GiB". KB/MB/GB/TB are powers of 1000, KiB/MiB/GiB/TiB powers of 1024.
+
+    Raises:
+        ValueError: If value isn't a size, e.g. a time-based rotation like "1 day".
+    """
+    if value is None or isinstance(value, int):
+        return value
+    if isinstance(value, str) and (match := RE_SIZE.match(value)):
+        number, unit, binary = match.groups()
+        base = 1024 if binary else 1000
+        return int(float(number) * base ** " kmgt".index(unit.lower() or " "))
+    raise ValueError(f"Not a file size: {value!r}")
+
+
+def dropped_records() -> int:
+    """
+    Total number of log records dropped because a sink's queue was full.
+    """
+    return sum(s.dropped for s in ACTIVE_SINKS)
+
+
+class StreamWriter:
+    """
+    Writes batches of formatted records to a text stream such as stdout.
+    """
+
+    def __init__(self, stream: typing.TextIO):
+        self.stream = stream
+
+    def write(self, batch: list[str]):
+        self.stream.write("".join(batch))
+        self.stream.flush()
+
+    def close(self):
+        self.stream.flush()
+
+
+class RotatingFileWriter:
+    """
+    Writes batches of formatted records to a file, rotating it once it passes a size limit (bytes, or a size
+    string as accepted by parse_size).
+    Rotated files are renamed with a timestamp and compressed. As with loguru's own file sink, the file is also
+    rotated and compressed when the writer is closed.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        rotation: int | str | None = None,
+        compression: typing.Optional[str] = "zip",
+    ):
+        self.path = Path(path)
+        self.rotation = parse_size(rotation)
+        self.compression = compression
+        self.file = None
+        self.size = 0
+        self.open()
+
+    def open(self):
+        self.file = open(self.path, "a", encoding="utf-8")
+        self.size = self.file.tell()
+
+    def write(self, batch: list[str]):
+        data = "".join(batch)
+        size = len(data.encode("utf-8"))
+        if self.rotation and self.size and self.size + size > self.rotation:
+            self.rotate()
+            self.open()
+        self.file.write(data)
+        self.file.flush()
+        self.size += size
+
+    def rotate(self):
+        self.file.close()
+        self.file = None
+        stamp = utcnow().strftime("%Y-%m-%d_%H-%M-%S_%f")
+        rotated = self.path.with_name(f"{self.path.stem}.{stamp}{self.path.suffix}")
+        self.path.rename(rotated)
+        if self.compression == "zip":
+            with zipfile.ZipFile(
+                rotated.with_name(f"{rotated.name}.zip"), "w", zipfile.ZIP_DEFLATED
+            ) as zf:
+                zf.write(rotated, rotated.name)
+            rotated.unlink()
+
+    def close(self):
+        if self.file is None:
+            return
+        if self.compression:
+            self.rotate()
+        else:
+            self.file.close()
+            self.file = None
+
+
+class BatchingSink:
+    """
+    A loguru sink that hands formatted records to a background thread through a bounded queue.
+
+    The thread writes records in batches, so the event loop thread never blocks on disk or terminal I/O, and
+    any rotation or compression happens off-loop as well. When the queue is full, records are dropped and
+    counted instead of stalling the caller.
+    """
+
+    def __init__(
+        self,
+        writer,
+        name: str = "log",
+        queue_size: int = 10000,
+        batch_size: int = 256,
+        flush_interval: float = 0.25,
+    ):
+        self.writer = writer
+        self.name = name
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._reported_dropped = 0
+        self._stopped = False
+        self._thread = threading.Thread(
+            target=self._run, name=f"{name}-log-writer", daemon=True
+        )
+        self._thread.start()
+        ACTIVE_SINKS.append(self)
+
+    def write(self, message):
+        try:
+            self.queue.put_nowait(str(message))
+        except queue.Full:
+            self.dropped += 1
+
+    def stop(self):
+        """
+        Called by loguru when the handler is removed. Drains the queue and closes the writer.
+        """
+        if self._stopped:
+            return
+        self._stopped = True
+        self.queue.put(_STOP)
+        self._thread.join()
+        if self in ACTIVE_SINKS:
+            ACTIVE_SINKS.remove(self)
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            try:
+                item = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch = list()
+            while item is not _STOP:
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+            else:
+                stopping = True
+            if batch:
+                try:
+                    self.writer.write(batch)
+                except Exception as e:
+                    print(f"Log sink {self.name} failed to write: {e}", file=sys.stderr)
+            if self.dropped != self._reported_dropped:
+                count = self.dropped - self._reported_dropped
+                self._reported_dropped = self.dropped
+                self._report_dropped(count)
+        self.writer.close()
+
+    def _report_dropped(self, count: int):
+        # Written straight to the writer: logging it would put it back into the queue that is already full.
+        notice = f"{utcnow().isoformat()} | WARNING  | Log sink {self.name} dropped {count} records.\n"
+        try:
+            self.writer.write([notice])
+        except Exception:
+            print(notice, end="", file=sys.stderr)
+
+
+class SamplingFilter:
+    """
+    A loguru filter that keeps only 1 in N records from noisy modules.
+
+    Rates are looked up by the longest matching module prefix, e.g. {"muforge.portal": 10}, and can be
+    overridden per call site with logger.bind(sample=N). Warnings and above are never sampled out.
+    The decision is made once per record and remembered on the filter (per thread, since loguru runs filters
+    in the logging thread), so every handler sees the same records and the record itself is left untouched.
+    """
+
+    def __init__(self, rates: dict[str, int]):
+        self.rates = sorted(rates.items(), key=lambda x: len(x[0]), reverse=True)
+        self.counters: dict[str, int] = defaultdict(int)
+        self.sampled = 0
+        self._cache: dict[str, int] = dict()
+        # The last record seen by each thread, and the decision made for it.
+        self._last = threading.local()
+
+    def rate_for(self, name: str) -> int:
+        if (rate := self._cache.get(name, None)) is None:
+            rate = 1
+            for prefix, r in self.rates:
+                if name == prefix or name.startswith(f"{prefix}."):
+                    rate = r
+                    break
+            self._cache[name] = rate
+        return rate
+
+    def __call__(self, record) -> bool:
+        last = self._last
+        if getattr(last, "record", None) is record:
+            return last.decision
+        decision = True
+        if record["level"].no < 30:
+            name = record["name"] or ""
+            rate = record["extra"].get("sample", None) or self.rate_for(name)
+            if rate > 1:
+                count = self.counters[name]
+                self.counters[name] = count + 1
+                if count % rate:
+                    decision = False
+                    self.sampled += 1
+        last.record, last.decision = record, decision
+        return decision
@@ -0,0 +1,305 @@
+import abc
+import bisect
+import math
+import typing
+
+# Latency buckets in seconds.
+DEFAULT_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+# Size buckets in bytes.
+SIZE_BUCKETS = (
+    128,
+    512,
+    2048,
+    8192,
+    32768,
+    131072,
+    524288,
+    2097152,
+    8388608,
+)
+
+OVERFLOW_LABEL = "__overflow__"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    inner = ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels.items())
+    return f"{{{inner}}}"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class Metric(abc.ABC):
+    """
+    Base class for all metric kinds. A metric with label names keeps one child per distinct set of label values.
+    The number of children is capped at max_series; label sets beyond that are folded into a single overflow
+    child so a bad label can't grow memory without bound.
+    """
+
+    kind: str = None
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: typing.Iterable[str] = (),
+        max_series: int = 1000,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.max_series = max_series
+        self._children: dict[tuple, typing.Any] = dict()
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+
+    @abc.abstractmethod
+    def _new_child(self):
+        """
+        Creates the object holding one label set's value.
+        """
+
+    def labels(self, *values, **kwargs):
+        """
+        Returns the child for the given label values, creating it if needed.
+        """
+        if kwargs:
+            values = tuple(str(kwargs[k]) for k in self.labelnames)
+        else:
+            values = tuple(str(v) for v in values)
+        if len(values) != len(self.labelnames):
+            raise ValueError(
+                f"Metric {self.name} expects labels {self.labelnames}, got {values}."
+            )
+        if (child := self._children.get(values, None)) is not None:
+            return child
+        if len(self._children) >= self.max_series:
+            values = (OVERFLOW_LABEL,) * len(self.labelnames)
+            if (child := self._children.get(values, None)) is not None:
+                return child
+        return self._children.setdefault(values, self._new_child())
+
+    def _default(self):
+        if self.labelnames:
+            raise ValueError(f"Metric {self.name} has labels; use .labels() first.")
+        return self._children[()]
+
+    def samples(self) -> typing.Iterator[tuple[str, dict[str, str], float]]:
+        """
+        Yields (name, labels, value) for every sample of this metric.
+        """
+        for values, child in list(self._children.items()):
+            labels = dict(zip(self.labelnames, values))
+            for suffix, extra, value in child.samples():
+                yield f"{self.name}{suffix}", {**labels, **extra}, value
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {_escape(self.documentation)}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        for name, labels, value in self.samples():
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        if amount < 0:
+            raise ValueError("Counters can only increase.")
+        self.value += amount
+
+    def samples(self):
+        yield "_total", {}, self.value
+
+
+class Counter(Metric):
+    """
+    A value that only goes up. Rendered with a _total suffix, so name it without one.
+    """
+
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self._default().inc(amount)
+
+
+class _GaugeChild:
+    __slots__ = ("value", "function")
+
+    def __init__(self):
+        self.value = 0.0
+        self.function = None
+
+    def set(self, value: float):
+        self.value = value
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.value -= amount
+
+    def set_function(self, function: typing.Callable[[], float]):
+        """
+        Read the value from function() at scrape time instead of storing it.
+        """
+        self.function = function
+
+    def samples(self):
+        yield "", {}, self.function() if self.function else self.value
+
+
+class Gauge(Metric):
+    """
+    A value that can go up and down, or be computed on demand with set_function.
+    """
+
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float):
+        self._default().set(value)
+
+    def inc(self, amount: float = 1.0):
+        self._default().inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self._default().dec(amount)
+
+    def set_function(self, function: typing.Callable[[], float]):
+        self._default().set_function(function)
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self):
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            yield "_bucket", {"le": _format_value(float(bound))}, total
+        yield "_bucket", {"le": "+Inf"}, self.count
+        yield "_sum", {}, self.sum
+        yield "_count", {}, self.count
+
+
+class Histogram(Metric):
+    """
+    Counts observations into cumulative buckets, plus their sum and count.
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: typing.Iterable[str] = (),
+        buckets: typing.Iterable[float] = DEFAULT_BUCKETS,
+        max_series: int = 1000,
+    ):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, max_series)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self._default().observe(value)
+
+
+class MetricsRegistry:
+    """
+    Holds every metric of an application and renders them in the Prometheus text exposition format.
+
+    Plugins and services should get their metrics through counter(), gauge() and histogram(), which return the
+    already-registered metric if one of the same name and kind exists.
+    """
+
+    def __init__(self):
+        self.metrics: dict[str, Metric] = dict()
+
+    def register(self, metric: Metric) -> Metric:
+        if (existing := self.metrics.get(metric.name, None)) is not None:
+            if existing.kind != metric.kind or existing.labelnames != metric.labelnames:
+                raise ValueError(
+                    f"Metric {metric.name} is already registered as a {existing.kind} "
+                    f"with labels {existing.labelnames}."
+                )
+            return existing
+        self.metrics[metric.name] = metric
+        return metric
+
+    def unregister(self, name: str):
+        self.metrics.pop(name, None)
+
+    def get(self, name: str) -> typing.Optional[Metric]:
+        return self.metrics.get(name, None)
+
+    def counter(
+        self, name: str, documentation: str, labelnames: typing.Iterable[str] = (), **kwargs
+    ) -> Counter:
+        return self.register(Counter(name, documentation, labelnames, **kwargs))
+
+    def gauge(
+        self, name: str, documentation: str, labelnames: typing.Iterable[str] = (), **kwargs
+    ) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames, **kwargs))
+
+    def histogram(
+        self, name: str, documentation: str, labelnames: typing.Iterable[str] = (), **kwargs
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, **kwargs))
+
+    def render(self) -> str:
+        return "\n".join(m.render() for m in list(self.metrics.values())) + "\n"
@@ -11,12 +11,15 @@ import traceback
 import types
 import typing
 import uuid
+from collections.abc import Container
 from contextlib import asynccontextmanager
 from datetime import datetime, timezone
 from inspect import getmembers, getmodule, getmro, ismodule, trace
 
 from loguru import logger
 
+from .prefix import PrefixIndex
+
 
 def utcnow():
     return datetime.now(timezone.utc)
@@ -284,8 +287,12 @@ def fresh_uuid4(existing) -> uuid:
     Given a list of UUID4s, generate a new one that's not already used.
     Yes, I know this is silly. UUIDs are meant to be unique by sheer statistic unlikelihood of a conflict.
     I'm just that afraid of collisions.
+
+    existing is checked in place if it supports membership tests, so pass a set or dict to keep this O(1).
+    For many IDs, use the application's ids service (muforge.services.ids.IdAllocator) instead.
     """
-    existing = set(existing)
+    if not isinstance(existing, Container):
+        existing = set(existing)
     fresh_uuid = uuid.uuid4()
     while fresh_uuid in existing:
         fresh_uuid = uuid.uuid4()
@@ -306,6 +313,8 @@ def partial_match(
     Args:
         match_text (str): The string being searched for.
         candidates (list of obj): A list of any kind of object that key can turn into a string to search.
+            A muforge.utils.prefix.PrefixIndex can be passed instead, which avoids sorting the candidates on
+            every call; its own key is used.
         key (callable): A callable that must return a string, used to do the search. this 'converts' the objects in the
             candidate list to strings.
         exact (bool): If True, only exact matches are returned.
@@ -315,6 +324,9 @@ def partial_match(
     Returns:
         Any or None, or a list[Any]
     """
+    if isinstance(candidates, PrefixIndex):
+        return candidates.match(match_text, exact=exact, many_results=many_results)
+
     mlow = match_text.lower()
     out = list()
 
@@ -335,11 +347,19 @@ def partial_match(
 
 
 def generate_name(prefix: str, existing, gen_length: int = 20) -> str:
+    """
+    Generates a random name like prefix_XXXX that isn't in existing. As with fresh_uuid4, pass a set or dict
+    to keep the check O(1). For readable sequential names, use the ids service's name() instead.
+    """
+
     def gen():
         return f"{prefix}_{''.join(random.choices(string.ascii_letters + string.digits, k=gen_length))}"
 
-    while (u := gen()) not in existing:
-        return u
+    if not isinstance(existing, Container):
+        existing = set(existing)
+    while (u := gen()) in existing:
+        pass
+    return u
 
 
 def get_server_pid() -> typing.Optional[int]:
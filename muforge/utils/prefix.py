@@ -0,0 +1,149 @@
+import difflib
+import typing
+from bisect import bisect_left, bisect_right
+
+
+class PrefixIndex:
+    """
+    A case-insensitive index of objects by name, for resolving what a player typed against inventories, rooms,
+    online players and the like.
+
+    Names are kept lowercased in a sorted list, so an exact or prefix lookup is a binary search plus a walk
+    over the k matches: O(log n + k), instead of lowercasing and sorting every candidate on every call as
+    partial_match() does with a plain iterable. Build an index once per candidate set and add()/remove()
+    objects as the set changes. Pass it to partial_match() in place of the candidate list, or call match().
+
+    If an object's name changes, remove it (passing its old name) before the change and add it afterwards.
+
+        index = PrefixIndex(room.contents, key=lambda obj: obj.name)
+        sword = index.match("swo")
+        index.remove(sword)
+
+    Args:
+        items (iterable): Objects to index.
+        key (callable): Returns the string an object is matched by.
+    """
+
+    __slots__ = ("key", "names", "items")
+
+    def __init__(self, items: typing.Iterable[typing.Any] = (), key: callable = str):
+        self.key = key
+        pairs = sorted(((key(i).lower(), i) for i in items), key=lambda p: p[0])
+        self.names: list[str] = [p[0] for p in pairs]
+        self.items: list[typing.Any] = [p[1] for p in pairs]
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def __iter__(self) -> typing.Iterator[typing.Any]:
+        return iter(self.items)
+
+    def __contains__(self, item) -> bool:
+        return self._find(item, self.key(item).lower()) is not None
+
+    def _find(self, item, name: str) -> typing.Optional[int]:
+        lo = bisect_left(self.names, name)
+        hi = bisect_right(self.names, name, lo)
+        for i in range(lo, hi):
+            if self.items[i] is item or self.items[i] == item:
+                return i
+        return None
+
+    def add(self, item, name: typing.Optional[str] = None):
+        """
+        Adds an object. Objects with the same name are kept in insertion order.
+        """
+        name = (self.key(item) if name is None else name).lower()
+        i = bisect_right(self.names, name)
+        self.names.insert(i, name)
+        self.items.insert(i, item)
+
+    def remove(self, item, name: typing.Optional[str] = None):
+        """
+        Removes an object. Pass name if the object's name has changed since it was added.
+
+        Raises:
+            KeyError: If the object isn't in the index.
+        """
+        name = (self.key(item) if name is None else name).lower()
+        if (i := self._find(item, name)) is None:
+            raise KeyError(item)
+        del self.names[i]
+        del self.items[i]
+
+    def discard(self, item, name: typing.Optional[str] = None):
+        try:
+            self.remove(item, name)
+        except KeyError:
+            pass
+
+    def clear(self):
+        self.names.clear()
+        self.items.clear()
+
+    def exact(self, text: str) -> list[typing.Any]:
+        """
+        Returns every object whose name equals text, ignoring case.
+        """
+        text = text.lower()
+        lo = bisect_left(self.names, text)
+        return self.items[lo : bisect_right(self.names, text, lo)]
+
+    def prefixed(self, text: str) -> typing.Iterator[typing.Any]:
+        """
+        Yields every object whose name starts with text, ignoring case, in name order. Exact matches come
+        first, since a name sorts before any longer name it is a prefix of.
+        """
+        text = text.lower()
+        names = self.names
+        for i in range(bisect_left(names, text), len(names)):
+            if not names[i].startswith(text):
+                return
+            yield self.items[i]
+
+    def fuzzy(
+        self, text: str, limit: int = 5, cutoff: float = 0.6
+    ) -> list[typing.Any]:
+        """
+        Returns up to limit objects whose names are close to text, best first, to catch typos. This compares
+        against every distinct name, so it is O(n); use it as a fallback when match() finds nothing.
+        """
+        text = text.lower()
+        out = list()
+        for name in difflib.get_close_matches(
+            text, dict.fromkeys(self.names), n=limit, cutoff=cutoff
+        ):
+            out.extend(self.exact(name))
+        return out[:limit]
+
+    def match(
+        self,
+        match_text: str,
+        exact: bool = False,
+        many_results: bool = False,
+        fuzzy: bool = False,
+    ) -> typing.Optional[typing.Any]:
+        """
+        Same results as partial_match(): exact matches preferred, then prefix matches.
+
+        Args:
+            match_text (str): The string being searched for.
+            exact (bool): If True, only exact matches are returned.
+            many_results (bool): If True, returns a list of all matches. If False, returns the first match.
+            fuzzy (bool): If nothing matches, fall back to the closest names by fuzzy() ranking.
+
+        Returns:
+            Any or None, or a list[Any]
+        """
+        if exact:
+            found = self.exact(match_text)
+        elif many_results:
+            found = list(self.prefixed(match_text))
+        else:
+            found = next(self.prefixed(match_text), None)
+            found = [found] if found is not None else []
+        if not found and fuzzy:
+            found = self.fuzzy(match_text)
+        if many_results:
+            return found
+        return found[0] if found else None
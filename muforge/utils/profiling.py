@@ -0,0 +1,111 @@
+import json
+import time
+import typing
+from contextlib import contextmanager
+from pathlib import Path
+
+from loguru import logger
+
+from .misc import utcnow
+
+
+def percentiles(
+    values: typing.Iterable[float], quantiles: typing.Iterable[float] = (50, 90, 99)
+) -> dict[float, float]:
+    """
+    Nearest-rank percentiles of a collection of samples.
+
+    Args:
+        values: The samples. Need not be sorted.
+        quantiles: The percentiles to compute, from 0 to 100.
+
+    Returns:
+        A dict of {quantile: value}. Values are 0.0 if there are no samples.
+    """
+    ordered = sorted(values)
+    if not ordered:
+        return {q: 0.0 for q in quantiles}
+    last = len(ordered) - 1
+    return {q: ordered[min(last, max(0, round(q / 100 * last)))] for q in quantiles}
+
+
+class StartupTimeline:
+    """
+    Records how long each phase of application startup takes.
+
+    Phases nest: a phase opened while another is still running is recorded as its child. The result is a flat,
+    ordered list of entries that can be logged as an indented tree or saved as JSON for comparison across releases.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started_at = utcnow()
+        self.origin = time.perf_counter()
+        self.entries: list[dict[str, typing.Any]] = list()
+        self._stack: list[dict[str, typing.Any]] = list()
+
+    @contextmanager
+    def phase(self, name: str, category: str = "phase", **meta):
+        """
+        Time the enclosed block as a startup phase.
+
+        Args:
+            name (str): The name of the phase, e.g. "plugins" or "core.pre_setup".
+            category (str): What kind of phase this is (phase, plugin, service, fastapi...).
+            **meta: Extra JSON-serializable details to store with the entry.
+        """
+        entry = {
+            "name": name,
+            "category": category,
+            "parent": self._stack[-1]["name"] if self._stack else None,
+            "depth": len(self._stack),
+            "start": time.perf_counter() - self.origin,
+            "duration": None,
+            "ok": True,
+        }
+        if meta:
+            entry["meta"] = meta
+        self.entries.append(entry)
+        self._stack.append(entry)
+        try:
+            yield entry
+        except BaseException:
+            entry["ok"] = False
+            raise
+        finally:
+            entry["duration"] = time.perf_counter() - self.origin - entry["start"]
+            self._stack.pop()
+
+    @property
+    def total(self) -> float:
+        """
+        The wall time covered by all top-level phases.
+        """
+        return sum(e["duration"] or 0.0 for e in self.entries if e["depth"] == 0)
+
+    def to_dict(self, **extra) -> dict[str, typing.Any]:
+        out = {
+            "name": self.name,
+            "started_at": self.started_at.isoformat(),
+            "total": self.total,
+            "phases": self.entries,
+        }
+        out.update(extra)
+        return out
+
+    def log(self, level: str = "INFO"):
+        logger.log(level, f"Startup timeline for {self.name} ({self.total:.6f}s):")
+        for e in self.entries:
+            duration = e["duration"] if e["duration"] is not None else 0.0
+            label = f"{'  ' * e['depth']}{e['name']}"
+            status = "" if e["ok"] else " (failed)"
+            logger.log(
+                level,
+                f"  {label:<48} {duration:>10.6f}s  [{e['category']}]{status}",
+            )
+
+    def save(self, path: str | Path, **extra):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.to_dict(**extra), f, indent=2, default=str)
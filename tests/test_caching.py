@@ -0,0 +1,156 @@
+import asyncio
+
+import httpx
+import pydantic
+import pytest
+from fastapi import APIRouter, FastAPI, Request
+
+import muforge
+from muforge.game.caching import ResponseCache, cached_response
+from muforge.game.compression import CompressionMiddleware, CompressionPolicy
+from muforge.utils.metrics import MetricsRegistry
+
+
+@pytest.fixture(autouse=True)
+def restore_listeners():
+    # Each ResponseCache registers itself in the global listener table; don't leak them into other tests.
+    saved = {table: list(listeners) for table, listeners in muforge.LISTENERS_TABLE.items()}
+    yield
+    muforge.LISTENERS_TABLE.clear()
+    muforge.LISTENERS_TABLE.update(saved)
+
+
+class Account(pydantic.BaseModel):
+    name: str
+
+
+def make_app(router: APIRouter) -> tuple[FastAPI, ResponseCache]:
+    app = FastAPI()
+    cache = ResponseCache(MetricsRegistry())
+    app.state.response_cache = cache
+    app.include_router(router, prefix="/v1")
+    return app, cache
+
+
+def client(app: FastAPI) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+def test_response_model_filters_cached_responses():
+    router = APIRouter()
+
+    @router.get("/account", response_model=Account)
+    @cached_response(tables=("accounts",))
+    async def account():
+        return {"name": "Alice", "password": "hunter2"}
+
+    async def scenario():
+        app, _cache = make_app(router)
+        async with client(app) as c:
+            for _ in range(2):
+                assert (await c.get("/v1/account")).json() == {"name": "Alice"}
+
+    asyncio.run(scenario())
+
+
+def test_cookie_sessions_do_not_share_entries():
+    router = APIRouter()
+
+    @router.get("/me")
+    @cached_response(tables=("accounts",))
+    async def me(request: Request):
+        return {"session": request.cookies.get("session")}
+
+    async def scenario():
+        app, _cache = make_app(router)
+        async with client(app) as c:
+            for session in ("alice", "bob"):
+                c.cookies.set("session", session)
+                assert (await c.get("/v1/me")).json() == {"session": session}
+
+    asyncio.run(scenario())
+
+
+def test_identity_dependency_keys_entries():
+    router = APIRouter()
+    calls = list()
+
+    def current_user(request: Request) -> str:
+        return request.headers.get("x-user", "anonymous")
+
+    @router.get("/inventory")
+    @cached_response(tables=("items",), identity=current_user)
+    async def inventory(request: Request):
+        calls.append(request.headers.get("x-user"))
+        return {"owner": request.headers.get("x-user")}
+
+    async def scenario():
+        app, _cache = make_app(router)
+        async with client(app) as c:
+            for user in ("alice", "bob", "alice"):
+                response = await c.get("/v1/inventory", headers={"X-User": user})
+                assert response.json() == {"owner": user}
+        assert calls == ["alice", "bob"]
+
+    asyncio.run(scenario())
+
+
+def test_invalidation_during_render_is_not_lost():
+    router = APIRouter()
+    started = asyncio.Event()
+    release = asyncio.Event()
+    version = {"value": 1}
+    calls = list()
+
+    @router.get("/room")
+    @cached_response(tables=("rooms",))
+    async def room():
+        calls.append(version["value"])
+        value = version["value"]
+        started.set()
+        await release.wait()
+        return {"version": value}
+
+    async def scenario():
+        app, cache = make_app(router)
+        async with client(app) as c:
+            first = asyncio.create_task(c.get("/v1/room"))
+            await started.wait()
+            version["value"] = 2
+            await cache.on_update("rooms", 7)
+            release.set()
+            assert (await first).json() == {"version": 1}
+            assert (await c.get("/v1/room")).json() == {"version": 2}
+        assert calls == [1, 2]
+
+    asyncio.run(scenario())
+
+
+def test_compressed_cached_responses_get_a_weak_etag():
+    router = APIRouter()
+
+    @router.get("/rooms")
+    @cached_response(tables=("rooms",))
+    async def rooms():
+        return {"rooms": ["A wide square paved with old stone."] * 100}
+
+    async def scenario():
+        app, _cache = make_app(router)
+        compressed = CompressionMiddleware(
+            app,
+            MetricsRegistry(),
+            default=CompressionPolicy(minimum_size=100),
+            encodings=("gzip",),
+        )
+        async with client(compressed) as c:
+            plain = await c.get("/v1/rooms", headers={"Accept-Encoding": "identity"})
+            gzipped = await c.get("/v1/rooms", headers={"Accept-Encoding": "gzip"})
+            assert gzipped.headers["content-encoding"] == "gzip"
+            assert gzipped.headers["etag"] == f"W/{plain.headers['etag']}"
+            again = await c.get(
+                "/v1/rooms",
+                headers={"Accept-Encoding": "gzip", "If-None-Match": gzipped.headers["etag"]},
+            )
+            assert again.status_code == 304
+
+    asyncio.run(scenario())
@@ -0,0 +1,40 @@
+import asyncio
+
+from muforge.game import Application
+from muforge.game.commands import CommandRegistry
+
+
+class Look:
+    aliases = ("l",)
+
+
+class List:
+    pass
+
+
+def make_registry() -> CommandRegistry:
+    async def build():
+        return CommandRegistry(Application({"GAME": {}}), None)
+
+    return asyncio.run(build())
+
+
+def test_remove_and_readd_command_whose_alias_prefixes_its_name():
+    registry = make_registry()
+    registry.add("look", Look)
+    registry.add("look", Look)
+    assert registry.resolve("l").command is Look
+    registry.remove("look")
+    assert registry.resolve("l") is None
+    assert registry.root.children == dict()
+    registry.add("look", Look)
+    assert registry.resolve("lo").command is Look
+
+
+def test_remove_keeps_other_commands_sharing_a_prefix():
+    registry = make_registry()
+    registry.add("look", Look)
+    registry.add("list", List)
+    registry.remove("look")
+    assert registry.resolve("l").command is List
+    assert registry.resolve("look") is None
@@ -0,0 +1,91 @@
+"""
+Runs against a real Postgres, so it is skipped unless MUFORGE_TEST_DSN is set, e.g.
+
+    MUFORGE_TEST_DSN=postgresql://muforge@localhost/muforge_test python -m pytest tests/test_database.py
+
+The tests create and drop their own table; nothing else in the database is touched.
+"""
+
+import asyncio
+import os
+
+import asyncpg
+import pytest
+
+from muforge.game import Application
+from muforge.game.database import DatabaseService
+from muforge.game.writebehind import WriteBehindService
+
+DSN = os.environ.get("MUFORGE_TEST_DSN", None)
+
+pytestmark = pytest.mark.skipif(not DSN, reason="MUFORGE_TEST_DSN is not set")
+
+TABLE = f"muforge_test_{os.getpid()}"
+
+
+async def make_app(**settings) -> Application:
+    app = Application(
+        {"GAME": {"database": {"dsn": DSN, "min_size": 1, "max_size": 2}, **settings}}
+    )
+    db = DatabaseService(app, None)
+    app.services["db"] = db
+    await db.setup()
+    return app
+
+
+def test_connections_are_released_to_the_pool():
+    async def scenario():
+        app = await make_app()
+        db = app.db
+        try:
+            assert db.healthy
+            # More borrows than max_size only succeed if every one was given back.
+            for _ in range(5):
+                async with db.connection(timeout=5.0) as conn:
+                    assert await conn.fetchval("SELECT 1") == 1
+            for _ in range(5):
+                async with db.transaction() as conn:
+                    assert await conn.fetchval("SELECT $1::jsonb", {"a": [1, 2]}) == {
+                        "a": [1, 2]
+                    }
+            with pytest.raises(ZeroDivisionError):
+                async with db.transaction() as conn:
+                    assert conn.is_in_transaction()
+                    1 / 0
+            assert db.pool.get_idle_size() == db.pool.get_size()
+        finally:
+            await app.shutdown_services()
+        assert db.pool.is_closing()
+
+    asyncio.run(scenario())
+
+
+def test_shutdown_flushes_write_behind_before_closing_the_pool(tmp_path):
+    async def scenario():
+        app = await make_app(write_behind={"journal": str(tmp_path / "writes.journal")})
+        async with app.db.connection() as conn:
+            await conn.execute(f"CREATE TABLE {TABLE} (id int PRIMARY KEY, hp int)")
+            await conn.execute(f"INSERT INTO {TABLE} VALUES (1, 10)")
+        try:
+            writes = WriteBehindService(app, None)
+            app.services["writes"] = writes
+            await writes.setup()
+            writes.mark(TABLE, 1, hp=42)
+
+            await app.shutdown_services()
+            assert app.db.pool.is_closing()
+            assert not writes.dirty
+
+            conn = await asyncpg.connect(DSN)
+            try:
+                assert await conn.fetchval(f"SELECT hp FROM {TABLE} WHERE id = 1") == 42
+            finally:
+                await conn.close()
+        finally:
+            conn = await asyncpg.connect(DSN)
+            try:
+                await conn.execute(f"DROP TABLE IF EXISTS {TABLE}")
+            finally:
+                await conn.close()
+
+    asyncio.run(scenario())
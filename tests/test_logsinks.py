@@ -0,0 +1,78 @@
+import threading
+
+import pytest
+
+from muforge.utils.logsinks import (
+    BatchingSink,
+    RotatingFileWriter,
+    SamplingFilter,
+    parse_size,
+)
+
+
+def test_parse_size_accepts_loguru_style_sizes():
+    assert parse_size(None) is None
+    assert parse_size(2048) == 2048
+    assert parse_size("10 MB") == 10_000_000
+    assert parse_size("1 GiB") == 1024**3
+    assert parse_size("500kb") == 500_000
+
+
+def test_parse_size_rejects_time_rotations():
+    with pytest.raises(ValueError):
+        parse_size("1 day")
+
+
+def test_rotation_counts_bytes(tmp_path):
+    path = tmp_path / "game.log"
+    writer = RotatingFileWriter(path, rotation="1 KB", compression=None)
+    # 300 characters, 600 bytes in UTF-8: two writes pass 1 KB.
+    writer.write(["é" * 300])
+    writer.write(["é" * 300])
+    writer.close()
+    assert len(list(tmp_path.glob("game.*.log"))) == 1
+    assert path.stat().st_size == 600
+
+
+class BlockingWriter:
+    def __init__(self):
+        self.release = threading.Event()
+        self.written = list()
+
+    def write(self, batch):
+        self.release.wait(5)
+        self.written.extend(batch)
+
+    def close(self):
+        pass
+
+
+def test_drop_notice_goes_to_the_writer():
+    writer = BlockingWriter()
+    sink = BatchingSink(writer, name="test", queue_size=1, batch_size=1, flush_interval=0.01)
+    for i in range(20):
+        sink.write(f"line {i}\n")
+    writer.release.set()
+    sink.stop()
+    assert sink.dropped
+    notices = [line for line in writer.written if "dropped" in line]
+    assert notices and all("Log sink test dropped" in line for line in notices)
+    assert sum(int(line.split("dropped ")[1].split()[0]) for line in notices) == sink.dropped
+
+
+def test_sampling_filter_leaves_records_untouched():
+    sampler = SamplingFilter({"muforge.portal": 2})
+
+    class Level:
+        no = 20
+
+    records = [{"level": Level, "name": "muforge.portal", "extra": {}} for _ in range(4)]
+    decisions = list()
+    for record in records:
+        # Every handler asks about the same record; the decision must not change or be counted twice.
+        first = sampler(record)
+        assert sampler(record) is first
+        decisions.append(first)
+    assert decisions == [True, False, True, False]
+    assert sampler.sampled == 2
+    assert all(set(record) == {"level", "name", "extra"} for record in records)
@@ -0,0 +1,60 @@
+import asyncio
+
+import muforge
+from muforge.game import Application
+from muforge.game.notifications import NotificationDispatcher, TableChange
+
+
+class RecordingListener:
+    tables = ("rooms",)
+
+    def __init__(self):
+        self.seen = list()
+
+    async def on_insert(self, table, id):
+        self.seen.append(("INSERT", id))
+
+    async def on_update(self, table, id):
+        self.seen.append(("UPDATE", id))
+
+    async def on_delete(self, table, id):
+        self.seen.append(("DELETE", id))
+
+
+async def dispatch(*changes: TableChange) -> list:
+    app = Application({"GAME": {}})
+    dispatcher = NotificationDispatcher(app, None)
+    await dispatcher.setup()
+    listener = RecordingListener()
+    muforge.LISTENERS_TABLE["rooms"].append(listener)
+    try:
+        for change in changes:
+            dispatcher.submit(change)
+        await dispatcher.shutdown()
+    finally:
+        muforge.LISTENERS_TABLE["rooms"].remove(listener)
+    return listener.seen
+
+
+def test_interleaved_changes_are_all_delivered_in_order():
+    seen = asyncio.run(
+        dispatch(
+            TableChange("rooms", 1, "INSERT"),
+            TableChange("rooms", 1, "DELETE"),
+            TableChange("rooms", 1, "INSERT"),
+        )
+    )
+    assert seen == [("INSERT", 1), ("DELETE", 1), ("INSERT", 1)]
+
+
+def test_back_to_back_repeats_are_coalesced():
+    seen = asyncio.run(
+        dispatch(
+            TableChange("rooms", 1, "UPDATE"),
+            TableChange("rooms", 2, "UPDATE"),
+            TableChange("rooms", 1, "UPDATE"),
+            TableChange("rooms", 1, "UPDATE"),
+            TableChange("rooms", 1, "DELETE"),
+        )
+    )
+    assert seen == [("UPDATE", 1), ("UPDATE", 2), ("DELETE", 1)]
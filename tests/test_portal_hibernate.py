@@ -0,0 +1,128 @@
+import asyncio
+import uuid
+
+from muforge.portal import Application
+from muforge.portal.connections import BaseConnection
+from muforge.portal.connections.link import (
+    ClientInfo,
+    ConnectionLink,
+    LinkData,
+    LinkUpdate,
+)
+from muforge.portal.connections.parser import BaseParser
+from muforge.portal.registry import ConnectionRegistry
+
+
+class FakeStream:
+    def __init__(self):
+        self.closed = False
+
+    async def aclose(self):
+        self.closed = True
+
+
+class StreamingParser(BaseParser):
+    """
+    Holds one stream open, like a parser following game events, and pauses in on_hibernate until released.
+    """
+
+    __slots__ = ("release", "stream")
+
+    def __init__(self):
+        super().__init__()
+        self.release = asyncio.Event()
+        self.stream = None
+
+    def open_stream(self):
+        self.stream = FakeStream()
+        if self.connection.streams is None:
+            self.connection.streams = set()
+        self.connection.streams.add(self.stream)
+
+    async def on_start(self):
+        self.open_stream()
+
+    async def on_hibernate(self):
+        await self.release.wait()
+
+    async def on_wake(self):
+        self.open_stream()
+
+
+class StubService:
+    def __init__(self, app):
+        self.app = app
+        self.plugin = None
+
+
+def test_input_during_hibernate_wakes_after_hibernation_finishes():
+    async def scenario():
+        app = Application({"PORTAL": {"game_url": "http://127.0.0.1:1"}})
+        conn = BaseConnection(
+            StubService(app), ConnectionLink(ClientInfo(connection_id=uuid.uuid4()))
+        )
+        parser = StreamingParser()
+        await conn.push_parser(parser)
+        first = parser.stream
+
+        hibernating = asyncio.create_task(conn.hibernate())
+        await asyncio.sleep(0)
+        assert conn.hibernating
+        # Input arrives while on_hibernate is still running.
+        waking = asyncio.create_task(
+            conn.handle_incoming_event(LinkData("Text.Command", "look"))
+        )
+        await asyncio.sleep(0)
+        parser.release.set()
+        await asyncio.gather(hibernating, waking)
+
+        assert first.closed
+        assert not conn.hibernating
+        assert parser.stream is not first
+        assert not parser.stream.closed
+        assert conn.streams == {parser.stream}
+
+    asyncio.run(scenario())
+
+
+def test_capability_changes_survive_hibernation():
+    async def scenario():
+        app = Application({"PORTAL": {"game_url": "http://127.0.0.1:1"}})
+        registry = ConnectionRegistry(app, None)
+        app.services["connections"] = registry
+        conn = BaseConnection(
+            StubService(app), ConnectionLink(ClientInfo(connection_id=uuid.uuid4()))
+        )
+        registry.add(conn)
+        parser = StreamingParser()
+        await conn.push_parser(parser)
+        assert conn.console.width == 78
+
+        await conn.handle_incoming_event(
+            LinkUpdate({"width": 120, "height": 50, "encoding": "utf-8"})
+        )
+        assert conn.console.width == 120
+        assert registry.matching(width=120, height=50, encoding="utf-8") == {conn}
+
+        parser.release.set()
+        await conn.hibernate()
+        await conn.wake()
+        # The console is rebuilt from link.info after waking.
+        assert conn.console.width == 120
+        assert conn.console.height == 50
+
+    asyncio.run(scenario())
+
+
+def test_offloaded_render_leaves_the_console_uncreated():
+    async def scenario():
+        app = Application({"PORTAL": {"game_url": "http://127.0.0.1:1"}})
+        conn = BaseConnection(
+            StubService(app),
+            ConnectionLink(ClientInfo(connection_id=uuid.uuid4(), width=40)),
+        )
+        out = await conn.render("word " * 20, offload=True)
+        assert conn._console is None
+        assert max(len(line) for line in out.splitlines()) <= 40
+
+    asyncio.run(scenario())
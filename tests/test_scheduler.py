@@ -0,0 +1,41 @@
+import asyncio
+
+from muforge.game import Application
+from muforge.services.scheduler import Scheduler
+
+
+async def make_scheduler() -> Scheduler:
+    app = Application({"GAME": {"scheduler": {"tick": 0.01}}})
+    scheduler = Scheduler(app, None)
+    await scheduler.setup()
+    return scheduler
+
+
+def test_callback_can_cancel_or_replace_timers_due_on_the_same_tick():
+    async def scenario():
+        scheduler = await make_scheduler()
+        runner = asyncio.create_task(scheduler.run())
+        fired = list()
+        timers = dict()
+
+        def first():
+            fired.append("first")
+            timers["second"].cancel()
+            scheduler.call_later(0.05, fired.append, "replacement", key="third")
+
+        timers["first"] = scheduler.call_later(0.03, first)
+        timers["second"] = scheduler.call_later(0.03, fired.append, "second")
+        timers["third"] = scheduler.call_later(0.03, fired.append, "third", key="third")
+        await asyncio.sleep(0.2)
+
+        assert not runner.done()
+        assert fired == ["first", "replacement"]
+        assert scheduler.count == 0
+        assert not scheduler.keys
+
+        scheduler.call_later(0.01, fired.append, "later")
+        await asyncio.sleep(0.1)
+        assert fired[-1] == "later"
+        runner.cancel()
+
+    asyncio.run(scenario())
@@ -0,0 +1,108 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import asyncpg
+import orjson
+
+from muforge.game import Application
+from muforge.game.writebehind import WriteBehindService
+
+POISON = "not a number"
+
+
+class FakeConnection:
+    def __init__(self, db):
+        self.db = db
+
+    def check(self, row):
+        if self.db.down:
+            raise asyncpg.exceptions.CannotConnectNowError("starting up")
+        if POISON in row:
+            raise asyncpg.exceptions.InvalidTextRepresentationError("invalid input")
+
+    async def executemany(self, sql, rows):
+        for row in rows:
+            self.check(row)
+        self.db.pending.extend(rows)
+
+    async def execute(self, sql, *row):
+        await self.executemany(sql, [row])
+
+
+class FakeDatabase:
+    """
+    Commits rows on a clean transaction exit; rejects POISON values and everything while down.
+    """
+
+    def __init__(self):
+        self.down = False
+        self.pending = list()
+        self.committed = list()
+
+    @asynccontextmanager
+    async def transaction(self):
+        self.pending = list()
+        yield FakeConnection(self)
+        self.committed.extend(self.pending)
+
+
+async def make_service(tmp_path, db) -> WriteBehindService:
+    app = Application(
+        {"GAME": {"write_behind": {"journal": str(tmp_path / "writes.journal")}}}
+    )
+    app.services["db"] = db
+    service = WriteBehindService(app, None)
+    await service.setup()
+    return service
+
+
+def test_bad_row_is_dead_lettered_and_the_rest_written(tmp_path):
+    async def scenario():
+        db = FakeDatabase()
+        service = await make_service(tmp_path, db)
+        service.mark("characters", 1, hp=10)
+        service.mark("characters", 2, hp=POISON)
+        service.mark("characters", 3, hp=30)
+        service.mark("rooms", 4, name="Plaza")
+        assert await service.flush() == 3
+        assert sorted(row[0] for row in db.committed) == [1, 3, 4]
+        assert not service.dirty
+        dead = [orjson.loads(line) for line in service.dead_letter_path.read_bytes().splitlines()]
+        assert [(d["t"], d["i"], d["f"]) for d in dead] == [("characters", 2, {"hp": POISON})]
+        # Later flushes aren't blocked by the bad row.
+        service.mark("characters", 1, hp=11)
+        assert await service.flush() == 1
+
+    asyncio.run(scenario())
+
+
+def test_transient_failure_requeues_everything(tmp_path):
+    async def scenario():
+        db = FakeDatabase()
+        service = await make_service(tmp_path, db)
+        service.mark("characters", 1, hp=10)
+        db.down = True
+        assert await service.flush() == 0
+        assert service.pending("characters", 1) == {"hp": 10}
+        assert not service.dead_letter_path.exists()
+        db.down = False
+        assert await service.flush() == 1
+
+    asyncio.run(scenario())
+
+
+def test_poisoned_journal_does_not_block_startup(tmp_path):
+    async def scenario():
+        (tmp_path / "writes.journal.1").write_bytes(
+            orjson.dumps({"t": "characters", "i": 1, "f": {"hp": POISON}})
+            + b"\n"
+            + orjson.dumps({"t": "characters", "i": 2, "f": {"hp": 20}})
+            + b"\n"
+        )
+        db = FakeDatabase()
+        service = await make_service(tmp_path, db)
+        assert [row[0] for row in db.committed] == [2]
+        assert not (tmp_path / "writes.journal.1").exists()
+        assert service.dead_letter_path.exists()
+
+    asyncio.run(scenario())